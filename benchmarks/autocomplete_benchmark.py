@@ -0,0 +1,60 @@
+"""
+Compares the autocomplete index against filtering and sorting the whole catalogue on every
+keystroke, like the autocompletes used to, for catalogues of growing size.
+
+Usage: python benchmarks/autocomplete_benchmark.py [--sizes N N ...] [--queries N]
+"""
+
+import argparse
+import random
+import string
+import time
+
+from loader import load_module
+
+autocomplete = load_module("utils", "autocomplete.py")
+
+
+def random_name(generator):
+    return "".join(generator.choice(string.ascii_lowercase + "-") for _ in range(generator.randint(4, 20)))
+
+
+def linear_search(names, current):
+    names = sorted(names)
+    return [name for name in names if current.lower() in name.lower()][:25]
+
+
+def main(args):
+    generator = random.Random(1)
+    for size in args.sizes:
+        names = list({random_name(generator) for _ in range(size)})
+        # what users type: prefixes of existing names, one keystroke at a time
+        queries = []
+        while len(queries) < args.queries:
+            name = generator.choice(names)
+            queries.extend(name[:i] for i in range(len(name) + 1))
+
+        start = time.perf_counter()
+        index = autocomplete.AutocompleteIndex((name, name, (name,)) for name in names)
+        build_time = time.perf_counter() - start
+
+        start = time.perf_counter()
+        for query in queries:
+            linear_search(names, query)
+        linear_time = (time.perf_counter() - start) / len(queries)
+
+        start = time.perf_counter()
+        for query in queries:
+            index.search(query)
+        index_time = (time.perf_counter() - start) / len(queries)
+
+        mismatches = sum(index.search(query) != [(name, name) for name in linear_search(names, query)] for query in queries[:200])
+        print(f"{len(names):7d} candidates | build {build_time * 1e3:7.1f}ms | linear {linear_time * 1e6:9.1f}us | "
+              f"index {index_time * 1e6:6.1f}us per keystroke | {mismatches} mismatches")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--sizes", type=int, nargs="+", default=[100, 1000, 10000, 100000])
+    parser.add_argument("--queries", type=int, default=2000)
+    main(parser.parse_args())
@@ -0,0 +1,92 @@
+"""
+Compares the compiled (Aho-Corasick) filter against the old per-word loop of
+find_triggered_filters at 1k, 10k and 50k filter words, and checks that both
+return the same words.
+
+Usage: python benchmarks/filter_benchmark.py [--messages N]
+"""
+
+import argparse
+import random
+import string
+import time
+
+from loader import load_module
+
+aho_corasick = load_module("utils", "framework", "aho_corasick.py")
+
+
+class Word:
+    def __init__(self, word, false_positive):
+        self.word = word
+        self.false_positive = false_positive
+
+
+def random_word(rng):
+    word = "".join(rng.choice(string.ascii_lowercase) for _ in range(rng.randint(4, 12)))
+    if rng.random() < 0.1:
+        word = word[:len(word) // 2] + " " + word[len(word) // 2:]
+    return word
+
+
+def random_message(rng, words):
+    parts = []
+    for _ in range(rng.randint(5, 40)):
+        if rng.random() < 0.02:
+            parts.append(rng.choice(words).word.upper())
+        else:
+            parts.append(random_word(rng))
+    return " ".join(parts) + rng.choice(["", "!", "?", "..."])
+
+
+def normalize(message):
+    text = message.lower()
+    without_spaces = "".join(text.split())
+    return text, without_spaces, without_spaces.translate(str.maketrans('', '', string.punctuation))
+
+
+def naive(words, text, without_spaces, stripped):
+    # the matching part of the previous find_triggered_filters loop
+    found = []
+    for word in words:
+        filter_word_without_spaces = "".join(word.word.lower().split())
+        if (word.word.lower() in text) or \
+            (not word.false_positive and word.word.lower() in without_spaces) or \
+                (not word.false_positive and word.word.lower() in stripped or
+                    (not word.false_positive and filter_word_without_spaces in stripped)):
+            found.append(word)
+    return found
+
+
+def run(size, messages, rng):
+    words = [Word(random_word(rng), rng.random() < 0.1) for _ in range(size)]
+    inputs = [normalize(random_message(rng, words)) for _ in range(messages)]
+
+    start = time.perf_counter()
+    compiled = aho_corasick.CompiledFilter(words)
+    build = time.perf_counter() - start
+
+    start = time.perf_counter()
+    expected = [naive(words, *variants) for variants in inputs]
+    naive_time = time.perf_counter() - start
+
+    start = time.perf_counter()
+    actual = [list(compiled.triggered(*variants)) for variants in inputs]
+    compiled_time = time.perf_counter() - start
+
+    assert actual == expected, f"compiled filter disagrees with the naive loop at {size} words"
+
+    print(f"{size:>6} words | build {build * 1000:8.1f}ms | "
+          f"naive {naive_time / messages * 1e6:9.1f}us/msg | "
+          f"compiled {compiled_time / messages * 1e6:7.1f}us/msg | "
+          f"{naive_time / compiled_time:6.1f}x")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--messages", type=int, default=300)
+    args = parser.parse_args()
+
+    rng = random.Random(1337)
+    for size in (1_000, 10_000, 50_000):
+        run(size, args.messages, rng)
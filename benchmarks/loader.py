@@ -0,0 +1,19 @@
+"""
+Loads a single module of the bot by its path, without importing its package, so that
+benchmarks of modules that don't need Discord run without the bot's config and database.
+"""
+
+import importlib.util
+import os
+
+ROOT = os.path.join(os.path.dirname(__file__), "..")
+
+
+def load_module(*path: str):
+    """Load the module at `path`, relative to the repository root (like "utils", "autocomplete.py")."""
+
+    name = os.path.splitext(path[-1])[0]
+    spec = importlib.util.spec_from_file_location(name, os.path.join(ROOT, *path))
+    module = importlib.util.module_from_spec(spec)
+    spec.loader.exec_module(module)
+    return module
@@ -0,0 +1,163 @@
+"""
+Measures the time it takes to clear a simulated join raid, comparing the old
+one-at-a-time raid_ban against AntiRaidMonitor's ban queue (a block of case IDs,
+bounded concurrent bans, one bulk case write and public logs in groups of 10 embeds).
+
+The batched run calls the real AntiRaidMonitor.raid_ban and process_raid_bans, so it
+needs the bot's dependencies and config (.env) like the bot itself. Discord and the
+database are replaced by fake objects with fixed latencies, nothing is sent or written.
+
+Usage: python benchmarks/raid_ban_benchmark.py [--raiders N ...] [--db-latency MS] [--api-latency MS]
+"""
+
+import argparse
+import asyncio
+import os
+import sys
+import time
+from types import SimpleNamespace
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), ".."))
+
+from cogs.monitors.mod import antiraid  # noqa: E402
+from utils.cache import BanCache  # noqa: E402
+from utils.framework import BatchQueue  # noqa: E402
+
+
+class SimulatedBackend:
+    """Stands in for the database services and the Discord API, counting the API requests."""
+
+    def __init__(self, db_latency, api_latency):
+        self.db_latency = db_latency
+        self.api_latency = api_latency
+        self.case_id = 0
+        self.cases = 0
+        self.requests = 0
+        self.banned = set()
+
+    async def db(self):
+        await asyncio.sleep(self.db_latency)
+
+    async def api(self):
+        self.requests += 1
+        await asyncio.sleep(self.api_latency)
+
+    # async_guild_service / async_user_service
+
+    async def reserve_case_ids(self, count):
+        await self.db()
+        first = self.case_id
+        self.case_id += count
+        return first
+
+    async def bulk_add_cases(self, cases):
+        await self.db()
+        self.cases += len(cases)
+
+
+class FakeChannel:
+    def __init__(self, backend):
+        self.backend = backend
+
+    async def send(self, *args, **kwargs):
+        await self.backend.api()
+
+
+class FakeGuild:
+    name = "r/Jailbreak"
+
+    def __init__(self, backend):
+        self.backend = backend
+        self.public_logs = FakeChannel(backend)
+
+    async def ban(self, user, reason=None):
+        await self.backend.api()
+        self.backend.banned.add(user.id)
+
+    def get_channel(self, _id):
+        return self.public_logs
+
+
+class FakeMember:
+    def __init__(self, _id, guild):
+        self.id = _id
+        self.guild = guild
+        self.mention = f"<@{_id}>"
+        self.display_avatar = f"https://cdn.discordapp.com/embed/avatars/{_id % 5}.png"
+
+    def __str__(self):
+        return f"raider{self.id}"
+
+    async def send(self, *args, **kwargs):
+        await self.guild.backend.api()
+
+
+async def serial(backend, raiders):
+    # the previous raid_ban, called once per raider under one lock
+    lock = asyncio.Lock()
+
+    async def raid_ban(user):
+        async with lock:
+            await backend.reserve_case_ids(1)
+            await backend.db()  # add_case
+            await backend.api()  # ban
+            backend.banned.add(user)
+            await backend.api()  # public log
+
+    for user in raiders:
+        await raid_ban(user)
+
+
+async def batched(backend, raiders):
+    # AntiRaidMonitor.raid_ban and process_raid_bans only use the bot and the ban queue, so they're run
+    # on a stand-in for the cog instead of setting up a real bot
+    antiraid.async_guild_service = backend
+    antiraid.async_user_service = backend
+
+    guild = FakeGuild(backend)
+    bot = SimpleNamespace(user=FakeMember(0, guild))
+    bot.ban_cache = BanCache(bot)
+    monitor = SimpleNamespace(bot=bot)
+    monitor.ban_queue = BatchQueue(lambda bans: antiraid.AntiRaidMonitor.process_raid_bans(monitor, bans),
+                                   max_size=antiraid.RAID_BAN_BATCH_SIZE, max_delay=antiraid.RAID_BAN_BATCH_DELAY)
+
+    for user in raiders:
+        await antiraid.AntiRaidMonitor.raid_ban(monitor, FakeMember(user, guild))
+    await monitor.ban_queue.close()
+
+    assert backend.cases == len(raiders), "batched didn't add a case for every raider"
+
+
+async def measure(name, coro, backend, raiders):
+    start = time.perf_counter()
+    await coro
+    elapsed = time.perf_counter() - start
+    assert backend.banned == set(raiders), f"{name} didn't ban every raider"
+    print(f"  {name:<26} {elapsed:7.2f}s to clear | {backend.requests:4} API requests")
+    return elapsed
+
+
+async def main(args):
+    db_latency = args.db_latency / 1000
+    api_latency = args.api_latency / 1000
+
+    for count in args.raiders:
+        # IDs start at 1, the fake bot user is 0
+        raiders = list(range(1, count + 1))
+        print(f"{count} raiders:")
+
+        backend = SimulatedBackend(db_latency, api_latency)
+        baseline = await measure("serial", serial(backend, raiders), backend, raiders)
+
+        backend = SimulatedBackend(db_latency, api_latency)
+        pooled = await measure(f"batched, {antiraid.RAID_BAN_CONCURRENCY} concurrent bans", batched(backend, raiders), backend, raiders)
+
+        print(f"  speedup: {baseline / pooled:.1f}x")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--raiders", type=int, nargs="+", default=[10, 100])
+    parser.add_argument("--db-latency", type=float, default=5, help="simulated database round trip in ms")
+    parser.add_argument("--api-latency", type=float, default=50, help="simulated Discord API round trip in ms")
+    asyncio.run(main(parser.parse_args()))
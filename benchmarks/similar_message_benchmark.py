@@ -0,0 +1,76 @@
+"""
+Measures the cost of adding a message to the near-duplicate index used by AntiRaidMonitor,
+and checks that a coordinated raid of slightly varied scam messages from different accounts
+is caught among ordinary chat while the chat itself isn't flagged.
+
+Usage: python benchmarks/similar_message_benchmark.py [--messages N] [--raiders N] [--threshold T]
+"""
+
+import argparse
+import random
+import time
+
+from loader import load_module
+
+similarity = load_module("utils", "framework", "similarity.py")
+
+WORDS = ("jailbreak tweak ios iphone ipad update respring safe mode palera1n dopamine unc0ver checkra1n "
+         "does anyone know how to fix my device after installing the latest beta it keeps crashing when "
+         "i open settings and the battery drains really fast since yesterday thanks for the help").split()
+
+SCAM = "hey everyone free discord nitro for the first 100 people, claim yours at https://dlscord-gift.com/{code} now"
+
+
+def chat_message(generator):
+    return " ".join(generator.choice(WORDS) for _ in range(generator.randint(4, 25)))
+
+
+def scam_message(generator):
+    text = SCAM.format(code="".join(generator.choice("abcdefghijk0123456789") for _ in range(8)))
+    # raiders usually vary the text a little to get past exact matching
+    if generator.random() < 0.5:
+        text = text.replace("everyone", generator.choice(["every1", "everybody", "all"]))
+    if generator.random() < 0.5:
+        text += generator.choice([" !!", " :)", " hurry", ""])
+    return text
+
+
+def main(args):
+    generator = random.Random(1)
+    index = similarity.NearDuplicateIndex(threshold=args.threshold, per=60.0)
+    print(f"threshold {args.threshold}: {index.bands} bands of {index.rows} rows")
+
+    # raiders post among the chat within half a minute of each other, halfway through the run
+    raid_start = args.messages // 2
+    raid_positions = set(generator.sample(range(raid_start, raid_start + 600), args.raiders))
+    flagged_chat = 0
+    largest_raid_cluster = 0
+    elapsed = 0.0
+
+    for i in range(args.messages):
+        current = i * 0.05
+        if i in raid_positions:
+            author, text = f"raider{i}", scam_message(generator)
+        else:
+            author, text = f"member{generator.randrange(200)}", chat_message(generator)
+
+        start = time.perf_counter()
+        cluster = index.add(author, text, current, author)
+        elapsed += time.perf_counter() - start
+
+        if i in raid_positions:
+            largest_raid_cluster = max(largest_raid_cluster, len(cluster))
+        elif cluster:
+            flagged_chat += 1
+
+    print(f"  {elapsed / args.messages * 1e6:7.1f}us per message | {len(index)} messages in the window")
+    print(f"  largest raid cluster: {largest_raid_cluster} of {args.raiders} raiders")
+    print(f"  chat messages flagged as near-duplicates: {flagged_chat}")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--messages", type=int, default=20000)
+    parser.add_argument("--raiders", type=int, default=20)
+    parser.add_argument("--threshold", type=float, default=0.7)
+    main(parser.parse_args())
@@ -5,12 +5,12 @@ from math import floor
 
 import discord
 import psutil
-from data.services import user_service
+from data.services import user_service, xp_accumulator
 from discord import app_commands
 from discord.ext import commands
 from discord.utils import format_dt
-from utils import GIRContext, cfg, transform_context, format_number
-from utils.framework import mod_and_up, whisper
+from utils import GIRContext, cfg, fetch_caches, format_number, http_client, invite_cache, transform_context
+from utils.framework import message_pipeline, mod_and_up, whisper
 
 
 class Stats(commands.Cog):
@@ -69,6 +69,21 @@ class Stats(commands.Cog):
         embed.add_field(name="Memory Usage",
                         value=f"{floor(process.memory_info().rss/1000/1000)} MB")
         embed.add_field(name="Python Version", value=platform.python_version())
+        user_cache = user_service.cache
+        embed.add_field(name="User Cache",
+                        value=f"{user_cache.hits} hits, {user_cache.misses} misses, {user_cache.evictions} evictions ({user_cache.hit_rate:.0%} hit rate, {len(user_cache)} cached)")
+        embed.add_field(name="XP Flush Latency",
+                        value=f"{xp_accumulator.last_flush_latency*1000:.1f}ms last, {xp_accumulator.average_flush_latency*1000:.1f}ms avg, {xp_accumulator.max_flush_latency*1000:.1f}ms max ({xp_accumulator.pending_count} pending)")
+        embed.add_field(name="Invite Cache",
+                        value=f"{invite_cache.hits} hits, {invite_cache.negative_hits} negative hits, {invite_cache.coalesced} coalesced, {invite_cache.misses} lookups ({invite_cache.calls_saved} requests saved)")
+        slowest = sorted(message_pipeline.stages, key=lambda stage: stage.average_time, reverse=True)[:3]
+        embed.add_field(name="Slowest Message Stages",
+                        value="\n".join(f"{stage.name}: {stage.average_time*1000:.1f}ms avg, {stage.max_time*1000:.1f}ms max" for stage in slowest) or "None")
+        fetcher_ages = [(name, age) for name, cache in fetch_caches.items() for (args, _), age in cache.ages().items() if not args]
+        embed.add_field(name="Fetcher Cache Ages",
+                        value="\n".join(f"{name}: {age/60:.0f}m" for name, age in fetcher_ages) or "None")
+        embed.add_field(name="Slowest HTTP Hosts",
+                        value="\n".join(f"{host}: {stats.average_time*1000:.0f}ms avg, {stats.max_time*1000:.0f}ms max ({stats.requests} requests, {stats.errors} errors)" for host, stats in http_client.slowest_hosts(3)) or "None")
 
         await ctx.respond(embed=embed, ephemeral=ctx.whisper)
 
@@ -90,7 +105,7 @@ class Stats(commands.Cog):
             guild.channels) + len(guild.voice_channels), inline=True)
         embed.add_field(name="Roles", value=len(guild.roles), inline=True)
         embed.add_field(name="Bans", value=len(
-            self.bot.ban_cache.cache), inline=True)
+            self.bot.ban_cache), inline=True)
         embed.add_field(name="Emojis", value=len(guild.emojis), inline=True)
         embed.add_field(name="Boost Tier",
                         value=guild.premium_tier, inline=True)
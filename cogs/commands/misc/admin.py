@@ -1,3 +1,4 @@
+import time
 import traceback
 import discord
 from discord import app_commands
@@ -6,6 +7,7 @@ from data.services import guild_service
 from utils import GIRContext, cfg, transform_context, logger
 from utils.framework import admin_and_up, guild_owner_and_up
 from utils.framework.transformers import ImageAttachment
+from utils.views import command_index
 
 
 class Admin(commands.Cog):
@@ -27,11 +29,20 @@ class Admin(commands.Cog):
     @app_commands.describe(mode="Set mode on or off")
     @transform_context
     async def sabbath(self, ctx: GIRContext, mode: bool = None):
-        g = guild_service.get_guild()
-        g.sabbath_mode = mode if mode is not None else not g.sabbath_mode
-        g.save()
+        mode = mode if mode is not None else not guild_service.snapshot.sabbath_mode
+        guild_service.set_sabbath_mode(mode)
 
-        await ctx.send_success(f"Set sabbath mode to {'on' if g.sabbath_mode else 'off'}!")
+        await ctx.send_success(f"Set sabbath mode to {'on' if mode else 'off'}!")
+
+    @admin_and_up()
+    @app_commands.guilds(cfg.guild_id)
+    @app_commands.command(description="Reload the ban list from Discord")
+    @transform_context
+    async def refreshbans(self, ctx: GIRContext):
+        await ctx.defer(ephemeral=True)
+        start = time.perf_counter()
+        await self.bot.ban_cache.fetch_ban_cache(force=True)
+        await ctx.send_success(f"Loaded {len(self.bot.ban_cache)} bans in {time.perf_counter() - start:.1f}s!")
 
     @commands.command()
     @commands.is_owner()
@@ -42,6 +53,7 @@ class Admin(commands.Cog):
         try:
             async with ctx.typing():
                 await self.bot.tree.sync(guild=discord.Object(id=cfg.guild_id))
+            command_index.invalidate()
         except Exception as e:
             await ctx.send(f"An error occured\n```{e}```")
             logger.error(traceback.format_exc())
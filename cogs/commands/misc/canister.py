@@ -6,7 +6,10 @@ from discord import app_commands
 from discord.ext import commands
 from utils import GIRContext, canister_search_package, cfg, transform_context
 from utils.fetchers import canister_fetch_repos
-from utils.framework import gatekeeper, whisper_in_general, find_triggered_filters, find_triggered_raid_phrases
+from utils.framework import (MessageContext, find_triggered_filters,
+                             find_triggered_raid_phrases, gatekeeper,
+                             message_stage, normalize_message,
+                             whisper_in_general)
 from utils.framework.filter import has_only_silent_filtered_words
 from utils.views import TweakDropdown, default_repos, repo_autocomplete
 
@@ -15,15 +18,13 @@ class Canister(commands.Cog):
     def __init__(self, bot):
         self.bot = bot
 
-    @commands.Cog.listener()
-    async def on_message(self, message):
-        if message.guild is None or message.guild.id != cfg.guild_id:
-            return
-
-        author = message.guild.get_member(message.author.id)
+    @message_stage(bots=True)
+    async def on_message(self, context: MessageContext):
+        message = context.message
+        author = context.member
         if author is None:
             return
-        if not gatekeeper.has(message.guild, author, 5) and message.channel.id == cfg.channels.general:
+        if context.level < 5 and message.channel.id == cfg.channels.general:
             return
 
         pattern = re.compile(
@@ -31,7 +32,8 @@ class Canister(commands.Cog):
         if not pattern.match(message.content):
             return
         
-        if filter_words := await find_triggered_filters(message.content, message.author) or await find_triggered_raid_phrases(message.content, message.author):
+        normalized = normalize_message(message)
+        if filter_words := await find_triggered_filters(normalized, message.author) or await find_triggered_raid_phrases(normalized, message.author):
             # if any of the triggered filtered words are not silently filtered, don't show results
             if not has_only_silent_filtered_words(filter_words):
                 return
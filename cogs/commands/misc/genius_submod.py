@@ -5,7 +5,7 @@ import re
 import discord
 from discord import app_commands
 from discord.ext import commands
-from utils import GIRContext, cfg
+from utils import GIRContext, IssueEntry, cfg
 from utils.context import transform_context
 from utils.framework import genius_or_submod_and_up, whisper_in_general, submod_or_admin_and_up, ImageAttachment, gatekeeper
 from utils.views import CommonIssueModal, EditCommonIssue, issue_autocomplete, GenericDescriptionModal
@@ -79,7 +79,9 @@ class Genius(commands.Cog):
 
         embed, f, view = await prepare_issue_response(title, description, ctx.author, buttons, image)
 
-        await channel.send(embed=embed, file=f, view=view)
+        message = await channel.send(embed=embed, file=f, view=view)
+        # index it right away rather than waiting for the event, so the table of contents includes it
+        await self.bot.issue_cache.on_message(message)
         await ctx.send_success("Common issue posted!", delete_after=5, followup=True)
         await self.do_reindex(channel)
 
@@ -99,11 +101,11 @@ class Genius(commands.Cog):
             raise commands.BadArgument(
                 "Issue not found! Title must match one of the embeds exactly, use autocomplete to help!")
 
-        message: discord.Message = self.bot.issue_cache.cache[title]
+        issue: IssueEntry = self.bot.issue_cache.cache[title]
 
         # prompt the user for common issue body
         modal = EditCommonIssue(
-            author=ctx.author, ctx=ctx, title=title, issue_message=message)
+            author=ctx.author, ctx=ctx, title=title, issue=issue)
         await ctx.interaction.response.send_modal(modal)
         await modal.wait()
 
@@ -116,8 +118,10 @@ class Genius(commands.Cog):
         buttons = modal.buttons
 
         embed, f, view = await prepare_issue_response(title, description, ctx.author, buttons, image)
-        embed.set_footer(text=message.embeds[0].footer.text)
-        await message.edit(embed=embed, attachments=[f] if f is not None else [], view=view)
+        embed.set_footer(text=issue.embed.footer.text)
+        message = channel.get_partial_message(issue.message_id)
+        message = await message.edit(embed=embed, attachments=[f] if f is not None else [], view=view)
+        await self.bot.issue_cache.on_message(message)
         await ctx.send_success("Common issue edited!", delete_after=5, followup=True)
         await self.do_reindex(channel)
 
@@ -158,6 +162,8 @@ class Genius(commands.Cog):
             raise commands.BadArgument("common issues channel not found")
 
         await ctx.defer(ephemeral=True)
+        # rebuild the index from the whole channel, in case it missed changes while the bot was offline
+        await self.bot.issue_cache.fetch_issue_cache(force=True)
         res = await self.do_reindex(channel)
 
         if res is None:
@@ -167,44 +173,34 @@ class Genius(commands.Cog):
         await ctx.send_success(f"Indexed {count} issues and posted {page} Table of Contents embeds!")
 
     async def do_reindex(self, channel):
-        contents = {}
-        async for message in channel.history(limit=None, oldest_first=True):
-            if message.author.id != self.bot.user.id:
-                continue
-
-            if not message.embeds:
-                continue
-
-            embed = message.embeds[0]
-            if not embed.footer.text:
-                continue
-
-            if embed.footer.text.startswith("Submitted by"):
-                contents[f"{embed.title}"] = message
-            elif embed.footer.text.startswith("Table of Contents"):
-                await message.delete()
-            else:
-                continue
+        # the issue index already knows every issue and the old table of contents
+        for message_id in self.bot.issue_cache.message_ids("toc"):
+            try:
+                await channel.get_partial_message(message_id).delete()
+            except discord.NotFound:
+                pass
+            await self.bot.issue_cache.on_message_delete(message_id)
+
+        contents = dict(self.bot.issue_cache.cache)
 
         page = 1
         count = 1
         toc_embed = discord.Embed(
             title="Table of Contents", description="Click on a link to jump to the issue!\n", color=discord.Color.gold())
         toc_embed.set_footer(text=f"Table of Contents • Page {page}")
-        for title, message in contents.items():
-            this_line = f"\n{count}. [{title}]({message.jump_url})"
+        for title, issue in contents.items():
+            this_line = f"\n{count}. [{title}]({issue.jump_url})"
             count += 1
             if len(toc_embed.description) + len(this_line) < 4096:
                 toc_embed.description += this_line
             else:
-                await channel.send(embed=toc_embed)
+                await self.bot.issue_cache.on_message(await channel.send(embed=toc_embed))
                 page += 1
                 toc_embed.description = ""
                 toc_embed.title = ""
                 toc_embed.set_footer(text=f"Table of Contents • Page {page}")
 
-        self.bot.issue_cache.cache = contents
-        await channel.send(embed=toc_embed)
+        await self.bot.issue_cache.on_message(await channel.send(embed=toc_embed))
         return count, page
 
     @genius_or_submod_and_up()
@@ -258,17 +254,13 @@ class Genius(commands.Cog):
             raise commands.BadArgument(
                 "Issue not found! Title must match one of the embeds exactly, use autocomplete to help!")
 
-        message: discord.Message = self.bot.issue_cache.cache[title]
-        embed = message.embeds[0]
+        issue: IssueEntry = self.bot.issue_cache.cache[title]
+        embed = issue.embed
         view = discord.ui.View()
-        components = message.components
-        if components:
-            for component in components:
-                if isinstance(component, discord.ActionRow):
-                    for child in component.children:
-                        b = discord.ui.Button(
-                            style=child.style, emoji=child.emoji, label=child.label, url=child.url)
-                        view.add_item(b)
+        for button in issue.buttons:
+            b = discord.ui.Button(
+                style=discord.ButtonStyle.link, emoji=button["emoji"], label=button["label"], url=button["url"])
+            view.add_item(b)
 
         if user_to_mention is not None:
             title = f"Hey {user_to_mention.mention}, have a look at this!"
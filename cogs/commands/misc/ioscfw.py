@@ -3,8 +3,8 @@ import datetime
 import discord
 from discord import app_commands
 from discord.ext import commands
-from utils import (GIRContext, cfg, get_ios_cfw, get_ipsw_firmware_info,
-                   transform_context, transform_groups)
+from utils import (GIRContext, cfg, get_appledb_index, get_ios_cfw,
+                   get_ipsw_firmware_info, transform_context)
 from utils.framework import whisper, whisper_in_general, whisper_outside_jb_and_geniusbar_unless_genius
 from utils.framework.transformers import (DeviceTransformer,
                                           VersionOnDevice)
@@ -96,15 +96,12 @@ class iOSCFW(commands.Cog):
     @transform_context
     @whisper_outside_jb_and_geniusbar_unless_genius
     async def jailbreak(self, ctx: GIRContext, name: str, user_to_mention: discord.Member = None) -> None:
-        response = await get_ios_cfw()
+        index = await get_appledb_index()
 
-        jbs = response.get("jailbreak")
-        matching_jbs = [jb for jb in jbs if jb.get(
-            "name").lower() == name.lower()]
-        if not matching_jbs:
+        jb = index.find_jailbreak(name)
+        if jb is None:
             raise commands.BadArgument("No jailbreak found with that name.")
 
-        jb = matching_jbs[0]
         info = jb.get('info')
 
         color = info.get("color")
@@ -174,20 +171,15 @@ class iOSCFW(commands.Cog):
     @transform_context
     @whisper_in_general
     async def firmware(self, ctx: GIRContext, version: str) -> None:
-        response = await get_ios_cfw()
+        index = await get_appledb_index()
         og_version = version
         for os_version in ["iOS", "tvOS", "watchOS", "audioOS"]:
             version = version.replace(os_version + " ", "")
-        ios = response.get("ios")
-        # ios = [i for _, i in ios.items()]
 
-        ios = [ios for ios in ios if f"{ios.get('osStr')} {ios.get('version')} ({ios.get('build')})" == og_version or ios.get(
-            'uniqueBuild').lower() == version.lower() or ios.get('version').lower() == version.lower()]
-
-        if not ios:
+        matching_ios = index.find_firmware(og_version, version)
+        if matching_ios is None:
             raise commands.BadArgument("No firmware found with that version.")
 
-        matching_ios = ios[0]
         embed, view = await self.do_firmware_response(ctx, matching_ios)
         await ctx.respond(embed=embed, view=view, ephemeral=ctx.whisper)
 
@@ -198,19 +190,15 @@ class iOSCFW(commands.Cog):
     @transform_context
     @whisper_in_general
     async def betafirmware(self, ctx: GIRContext, version: str) -> None:
-        response = await get_ios_cfw()
+        index = await get_appledb_index()
         og_version = version
         for os_version in ["iOS", "tvOS", "watchOS", "audioOS"]:
             version = version.replace(os_version + " ", "")
-        ios = response.get("ios")
-        # ios = [i for _, i in ios.items()]
-        ios = [ios for ios in ios if (f"{ios.get('osStr')} {ios.get('version')} ({ios.get('build')})" == og_version or ios.get(
-            'uniqueBuild').lower() == version.lower() or ios.get('version').lower() == version.lower()) and ios.get('beta')]
 
-        if not ios:
+        matching_ios = index.find_firmware(og_version, version, beta_only=True)
+        if matching_ios is None:
             raise commands.BadArgument("No firmware found with that version.")
 
-        matching_ios = ios[0]
         embed, view = await self.do_firmware_response(ctx, matching_ios)
         await ctx.respond(embed=embed, view=view, ephemeral=ctx.whisper)
 
@@ -279,23 +267,15 @@ class iOSCFW(commands.Cog):
     @transform_context
     @whisper_in_general
     async def deviceinfo(self, ctx: GIRContext, device: str) -> None:
-        response = await get_ios_cfw()
-        all_devices = response.get("group")
-        transformed_devices = transform_groups(all_devices)
-        devices = [d for d in transformed_devices if d.get('name').lower() == device.lower(
-        ) or device.lower() in [x.lower() for x in d.get('devices')]]
-
-        if not devices:
+        index = await get_appledb_index()
+        matching_device_group = index.find_group(device)
+        if matching_device_group is None:
             raise commands.BadArgument("No device found with that name.")
 
-        matching_device_group = devices[0]
-
         embed = discord.Embed(title=matching_device_group.get(
             'name'), color=discord.Color.random())
 
-        real = response.get("device")
-        models = [
-            dev for dev in real if dev.get('key') in matching_device_group.get("devices")]
+        models = [index.devices[key] for key in matching_device_group.get("devices") if key in index.devices]
         model_numbers = []
         model_names = ""
         for model_number in models:
@@ -313,11 +293,8 @@ class iOSCFW(commands.Cog):
         embed.add_field(name="Model(s)", value='`' +
                         "`, `".join(model_numbers) + "`", inline=True)
 
-        ios = response.get("ios")
-        # ios = [i for _, i in ios.items()]
-        supported_firmwares = [firmware for firmware in ios if model_number.get(
-            "key") in firmware.get("devices")]
-        supported_firmwares.sort(key=lambda x: x.get("released") or "")
+        supported_firmwares = sorted(index.firmwares_by_device.get(model_number.get("key"), []),
+                                     key=lambda x: x.get("released") or "")
 
         if supported_firmwares:
             latest_firmware = supported_firmwares[-1]
@@ -355,27 +332,24 @@ class iOSCFW(commands.Cog):
     @transform_context
     @whisper
     async def canijailbreak(self, ctx: GIRContext, device: DeviceTransformer, version: VersionOnDevice) -> None:
-        response = await get_ios_cfw()
-        found_jbs = []
-        jailbreaks = response.get("jailbreak")
-        # jailbreaks = [jb for _, jb in jailbreaks.items()]
-        for jb in jailbreaks:
-            if jb.get("compatibility") is None:
+        index = await get_appledb_index()
+        # the best compatibility entry of each jailbreak that supports this build on this device
+        potential_versions = {}
+        for jb, jb_version in index.jailbreaks_by_build.get(version.get("build"), []):
+            if not any(d in jb_version.get("devices") for d in device.get("devices")):
                 continue
 
-            potential_version = None
-            for jb_version in jb.get("compatibility"):
-                if any(d in jb_version.get("devices") for d in device.get("devices")) and version.get("build") in jb_version.get("firmwares"):
-                    if potential_version is None:
-                        potential_version = jb_version
-                    elif potential_version.get("priority") is None and jb_version.get("priority") is not None:
-                        potential_version = jb_version
-                    elif potential_version.get("priority") is not None and jb_version.get("priority") is not None and jb_version.get("priority") < potential_version.get("priority"):
-                        potential_version = jb_version
-
-            if potential_version is not None:
-                jb["compatibility"] = [potential_version]
-                found_jbs.append(jb)
+            potential_version = potential_versions.get(id(jb), (None, None))[1]
+            if potential_version is None:
+                potential_version = jb_version
+            elif potential_version.get("priority") is None and jb_version.get("priority") is not None:
+                potential_version = jb_version
+            elif potential_version.get("priority") is not None and jb_version.get("priority") is not None and jb_version.get("priority") < potential_version.get("priority"):
+                potential_version = jb_version
+            potential_versions[id(jb)] = (jb, potential_version)
+
+        # copies, so that the cached AppleDB payload keeps every compatibility entry
+        found_jbs = [{**jb, "compatibility": [potential_version]} for jb, potential_version in potential_versions.values()]
 
         if not found_jbs:
             embed = discord.Embed(
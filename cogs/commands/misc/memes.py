@@ -10,11 +10,12 @@ from data.services import guild_service
 from discord import app_commands
 from discord.ext import commands
 from discord.ext.commands.cooldowns import CooldownMapping
-from utils import GIRContext, cfg, format_number, transform_context
+from utils import GIRContext, cfg, format_number, http_client, transform_context
 from utils.framework import (ImageAttachment, MessageTextBucket,
                              find_triggered_filters,
                              find_triggered_raid_phrases, gatekeeper,
-                             memed_and_up, mempro_and_up, mod_and_up, whisper)
+                             memed_and_up, mempro_and_up, mod_and_up, normalize,
+                             whisper)
 from utils.framework.filter import has_only_silent_filtered_words
 from utils.views import GenericDescriptionModal, Menu, memes_autocomplete
 
@@ -292,34 +293,33 @@ class Memes(commands.Cog):
 
         contents_before = await image.read()
         contents = BytesIO(contents_before)
-        async with aiohttp.ClientSession(headers={"token": cfg.resnext_token}) as client:
-            form = aiohttp.FormData()
-            form.add_field(
-                "file", contents, content_type=image.content_type)
-            async with client.post('https://resnext.slim.rocks/', data=form) as resp:
-                if resp.status == 200:
-                    j = await resp.json()
-                    embed = discord.Embed()
-                    confidence = j.get('confidence')
-                    confidence_percent = f"{confidence*100:.1f}%"
-                    embed.description = f"image prediction: {j.get('classification')}\nconfidence: {confidence_percent}"
-                    embed.set_footer(
-                        text=f"Requested by {ctx.author} • /neuralnet • Processed in {j.get('process_time')}s")
-                    embed.set_image(url="attachment://image.png")
-
-                    if confidence < 0.25:
-                        embed.color = discord.Color.red()
-                    elif confidence < 0.5:
-                        embed.color = discord.Color.yellow()
-                    elif confidence < 0.75:
-                        embed.color = discord.Color.orange()
-                    else:
-                        embed.color = discord.Color.green()
-
-                    await ctx.respond(embed=embed, file=discord.File(BytesIO(contents_before), filename="image.png"))
+        form = aiohttp.FormData()
+        form.add_field(
+            "file", contents, content_type=image.content_type)
+        async with http_client.post('https://resnext.slim.rocks/', data=form, headers={"token": cfg.resnext_token}) as resp:
+            if resp.status == 200:
+                j = await resp.json()
+                embed = discord.Embed()
+                confidence = j.get('confidence')
+                confidence_percent = f"{confidence*100:.1f}%"
+                embed.description = f"image prediction: {j.get('classification')}\nconfidence: {confidence_percent}"
+                embed.set_footer(
+                    text=f"Requested by {ctx.author} • /neuralnet • Processed in {j.get('process_time')}s")
+                embed.set_image(url="attachment://image.png")
+
+                if confidence < 0.25:
+                    embed.color = discord.Color.red()
+                elif confidence < 0.5:
+                    embed.color = discord.Color.yellow()
+                elif confidence < 0.75:
+                    embed.color = discord.Color.orange()
                 else:
-                    raise commands.BadArgument(
-                        "An error occurred classifying that image.")
+                    embed.color = discord.Color.green()
+
+                await ctx.respond(embed=embed, file=discord.File(BytesIO(contents_before), filename="image.png"))
+            else:
+                raise commands.BadArgument(
+                    "An error occurred classifying that image.")
 
     memegen = app_commands.Group(name="memegen", description="Generate memes", guild_ids=[
         cfg.guild_id])
@@ -359,23 +359,22 @@ class Memes(commands.Cog):
         await ctx.defer(ephemeral=False)
         contents_before = await image.read()
         contents = BytesIO(contents_before)
-        async with aiohttp.ClientSession(headers={"token": cfg.resnext_token}) as client:
-            form = aiohttp.FormData()
-            form.add_field(
-                "file", contents, content_type=image.content_type)
-            async with client.post(f'https://resnext.slim.rocks/meme?top_text={top_text}&bottom_text={bottom_text}', data=form) as resp:
-                if resp.status == 200:
-                    resp = await resp.read()
-                    embed = discord.Embed()
-                    embed.set_footer(
-                        text=f"Requested by {ctx.author} • /memegen regular")
-                    embed.set_image(url="attachment://image.png")
-                    embed.color = discord.Color.random()
-
-                    await ctx.respond(embed=embed, file=discord.File(BytesIO(resp), filename="image.png"))
-                else:
-                    raise commands.BadArgument(
-                        "An error occurred generating that meme.")
+        form = aiohttp.FormData()
+        form.add_field(
+            "file", contents, content_type=image.content_type)
+        async with http_client.post(f'https://resnext.slim.rocks/meme?top_text={top_text}&bottom_text={bottom_text}', data=form, headers={"token": cfg.resnext_token}) as resp:
+            if resp.status == 200:
+                resp = await resp.read()
+                embed = discord.Embed()
+                embed.set_footer(
+                    text=f"Requested by {ctx.author} • /memegen regular")
+                embed.set_image(url="attachment://image.png")
+                embed.color = discord.Color.random()
+
+                await ctx.respond(embed=embed, file=discord.File(BytesIO(resp), filename="image.png"))
+            else:
+                raise commands.BadArgument(
+                    "An error occurred generating that meme.")
 
     @memed_and_up()
     @memegen.command(description="Motivational poster)")
@@ -412,23 +411,22 @@ class Memes(commands.Cog):
         await ctx.defer(ephemeral=False)
         contents_before = await image.read()
         contents = BytesIO(contents_before)
-        async with aiohttp.ClientSession(headers={"token": cfg.resnext_token}) as client:
-            form = aiohttp.FormData()
-            form.add_field(
-                "file", contents, content_type=image.content_type)
-            async with client.post(f'https://resnext.slim.rocks/demotivational-meme?top_text={top_text}&bottom_text={bottom_text}', data=form) as resp:
-                if resp.status == 200:
-                    resp = await resp.read()
-                    embed = discord.Embed()
-                    embed.set_footer(
-                        text=f"Requested by {ctx.author} • /memegen motivate")
-                    embed.set_image(url="attachment://image.png")
-                    embed.color = discord.Color.random()
-
-                    await ctx.respond(embed=embed, file=discord.File(BytesIO(resp), filename="image.png"))
-                else:
-                    raise commands.BadArgument(
-                        "An error occurred generating that meme.")
+        form = aiohttp.FormData()
+        form.add_field(
+            "file", contents, content_type=image.content_type)
+        async with http_client.post(f'https://resnext.slim.rocks/demotivational-meme?top_text={top_text}&bottom_text={bottom_text}', data=form, headers={"token": cfg.resnext_token}) as resp:
+            if resp.status == 200:
+                resp = await resp.read()
+                embed = discord.Embed()
+                embed.set_footer(
+                    text=f"Requested by {ctx.author} • /memegen motivate")
+                embed.set_image(url="attachment://image.png")
+                embed.color = discord.Color.random()
+
+                await ctx.respond(embed=embed, file=discord.File(BytesIO(resp), filename="image.png"))
+            else:
+                raise commands.BadArgument(
+                    "An error occurred generating that meme.")
 
     @mod_and_up()
     @memegen.command(description="AI generated text based on a prompt")
@@ -450,35 +448,35 @@ class Memes(commands.Cog):
                 raise commands.BadArgument("That command is on cooldown.")
 
         await ctx.defer(ephemeral=False)
-        async with aiohttp.ClientSession(headers={"Authorization": f"Bearer {cfg.open_ai_token}", "Content-Type": "application/json"}) as client:
-            async with client.post(f"https://api.openai.com/v1/engines/text-davinci-001/completions", json={
-                "prompt": prompt,
-                "temperature": 0.7,
-                "max_tokens": 64,
-                "top_p": 1,
-                "frequency_penalty": 0,
-                "presence_penalty": 0
-            }) as resp:
-
-                if resp.status == 200:
-                    data = await resp.json()
-                    text = data.get("choices")[0].get("text")
-                    text = discord.utils.escape_markdown(text)
-                    if filter_words := await find_triggered_filters(text, ctx.author) or await find_triggered_raid_phrases(text, ctx.author):
-                        if not has_only_silent_filtered_words(filter_words):
-                            text = "A filter was triggered by this response. Please try a different prompt."
-
-                    embed = discord.Embed(color=discord.Color.random())
-                    prompt_formatted = discord.utils.escape_markdown(prompt)
-                    embed.add_field(name="Prompt", value=prompt_formatted[:1024] + "..." if len(
-                        prompt_formatted) > 1024 else prompt_formatted, inline=False)
-                    embed.add_field(
-                        name="Response", value=text or "API did not return a response.", inline=False)
-                    embed.set_footer(
-                        text=f"Requested by {ctx.author} • /memegen aitext")
-                    await ctx.respond(embed=embed)
-                else:
-                    raise commands.BadArgument("An OpenAI API error occured.")
+        async with http_client.post(f"https://api.openai.com/v1/engines/text-davinci-001/completions", json={
+            "prompt": prompt,
+            "temperature": 0.7,
+            "max_tokens": 64,
+            "top_p": 1,
+            "frequency_penalty": 0,
+            "presence_penalty": 0
+        }, headers={"Authorization": f"Bearer {cfg.open_ai_token}", "Content-Type": "application/json"}) as resp:
+
+            if resp.status == 200:
+                data = await resp.json()
+                text = data.get("choices")[0].get("text")
+                text = discord.utils.escape_markdown(text)
+                normalized = normalize(text)
+                if filter_words := await find_triggered_filters(normalized, ctx.author) or await find_triggered_raid_phrases(normalized, ctx.author):
+                    if not has_only_silent_filtered_words(filter_words):
+                        text = "A filter was triggered by this response. Please try a different prompt."
+
+                embed = discord.Embed(color=discord.Color.random())
+                prompt_formatted = discord.utils.escape_markdown(prompt)
+                embed.add_field(name="Prompt", value=prompt_formatted[:1024] + "..." if len(
+                    prompt_formatted) > 1024 else prompt_formatted, inline=False)
+                embed.add_field(
+                    name="Response", value=text or "API did not return a response.", inline=False)
+                embed.set_footer(
+                    text=f"Requested by {ctx.author} • /memegen aitext")
+                await ctx.respond(embed=embed)
+            else:
+                raise commands.BadArgument("An OpenAI API error occured.")
 
     @mod_and_up()
     @app_commands.guilds(cfg.guild_id)
@@ -1,7 +1,5 @@
-import base64
 import datetime
 import io
-import json
 from typing import Union
 
 import discord
@@ -10,9 +8,9 @@ from data.services import user_service
 from discord import app_commands
 from discord.ext import commands
 from discord.utils import format_dt
-from PIL import Image
-from utils import (GIRContext, cfg, get_dstatus_components,
+from utils import (GIRContext, LRUCache, cfg, get_dstatus_components,
                    get_dstatus_incidents, transform_context)
+from utils.emoji_store import EmojiStore
 from utils.framework import (MONTH_MAPPING, Duration, gatekeeper,
                              give_user_birthday_role, mod_and_up, whisper)
 from utils.framework.transformers import ImageAttachment
@@ -28,11 +26,15 @@ class Misc(commands.Cog):
             3, 15.0, commands.BucketType.channel)
 
         try:
-            with open('emojis.json') as f:
-                self.emojis = json.loads(f.read())
-        except:
+            self.emojis = EmojiStore.open()
+        except FileNotFoundError:
             raise Exception(
-                "Could not find emojis.json. Make sure to run scrape_emojis.py")
+                "Could not find the emoji store. Make sure to run scrape_emojis.py")
+        # the images of recently jumboed emojis
+        self.emoji_images = LRUCache(max_size=128, ttl=3600)
+
+    async def cog_unload(self):
+        self.emojis.close()
 
     @app_commands.guilds(cfg.guild_id)
     @app_commands.command(description="Send yourself a reminder after a given time gap")
@@ -78,16 +80,16 @@ class Misc(commands.Cog):
         except commands.PartialEmojiConversionFailure:
             em = emoji
         if isinstance(em, str):
-            emoji_url_file = self.emojis.get(em)
-            if emoji_url_file is None:
-                raise commands.BadArgument(
-                    "Couldn't find a suitable emoji.")
-
-            im = Image.open(io.BytesIO(base64.b64decode(emoji_url_file)))
-            image_conatiner = io.BytesIO()
-            im.save(image_conatiner, 'png')
-            image_conatiner.seek(0)
-            _file = discord.File(image_conatiner, filename='image.png')
+            image = self.emoji_images.get(em)
+            if image is None:
+                image = self.emojis.get(em)
+                if image is None:
+                    raise commands.BadArgument(
+                        "Couldn't find a suitable emoji.")
+                self.emoji_images.set(em, image)
+
+            # the store holds PNGs, which can be sent as they are
+            _file = discord.File(io.BytesIO(image), filename='image.png')
             await ctx.respond(file=_file)
         else:
             await ctx.respond(em.url)
@@ -132,7 +134,7 @@ class Misc(commands.Cog):
 
         # passed all the sanity checks, let's save the birthday
         db_user.birthday = [month, date]
-        db_user.save()
+        user_service.save_user(db_user)
 
         await ctx.send_success(f"Your birthday was set.")
         # if it's the user's birthday today let's assign the role right now!
@@ -7,6 +7,7 @@ from utils import cfg, GIRContext, transform_context
 from utils.framework import admin_and_up, mod_and_up
 from utils.framework.checks import always_whisper
 from utils.framework.transformers import ModsAndAboveMemberOrUser
+from utils.mod.lockdown import lockdown_channel, lockdown_channels
 from utils.mod.modactions_helpers import add_ban_case, submit_public_log
 from utils.views import Confirm, GenericDescriptionModal
 
@@ -103,7 +104,7 @@ class AntiRaid(commands.Cog):
     @transform_context
     async def spammode(self, ctx: GIRContext, mode: bool = None) -> None:
         if mode is None:
-            mode = not guild_service.get_guild().ban_today_spam_accounts
+            mode = not guild_service.snapshot.ban_today_spam_accounts
 
         guild_service.set_spam_mode(mode)
         await ctx.send_success(description=f"We {'**will ban**' if mode else 'will **not ban**'} accounts created today in join spam filter.")
@@ -121,7 +122,7 @@ class AntiRaid(commands.Cog):
         else:
             profile.raid_verified = mode
 
-        profile.save()
+        user_service.save_user(profile)
 
         await ctx.send_success(description=f"{'**Verified**' if profile.raid_verified else '**Unverified**'} user {user.mention}.")
 
@@ -135,7 +136,7 @@ class AntiRaid(commands.Cog):
         if channel is None:
             channel = ctx.channel
             
-        if await self.lock_unlock_channel(ctx, channel, True) is not None:
+        if await lockdown_channel(channel, lock=True):
             await ctx.send_success(f"Locked {channel.mention}!")
         else:
             raise commands.BadArgument(f"{channel.mention} already locked or my permissions are wrong.")
@@ -149,7 +150,7 @@ class AntiRaid(commands.Cog):
         if channel is None:
             channel = ctx.channel
             
-        if await self.lock_unlock_channel(ctx, channel) is not None:
+        if await lockdown_channel(channel, lock=False):
             await ctx.send_success(f"Unlocked {channel.mention}!")
         else:
             raise commands.BadArgument(f"{channel.mention} already unlocked or my permissions are wrong.")
@@ -189,16 +190,11 @@ class AntiRaid(commands.Cog):
         if not channels:
             raise commands.BadArgument("No freezeable channels! Set some using `/freezeable`.")
         
-        locked = []
         await ctx.defer()
-        for channel in channels:
-            channel = ctx.guild.get_channel(channel)
-            if channel is not None:
-                if await self.lock_unlock_channel(ctx, channel, lock=True):
-                    locked.append(channel)
-        
-        if locked:              
-            await ctx.send_success(f"Locked {len(locked)} channels!")
+        result = await lockdown_channels(ctx.guild, channels, lock=True)
+
+        if result.changed:
+            await ctx.send_success(f"Locked {len(result.changed)} channels in {result.elapsed:.1f}s!")
         else:
             raise commands.BadArgument("Server is already locked or my permissions are wrong.")
         
@@ -212,41 +208,13 @@ class AntiRaid(commands.Cog):
         if not channels:
             raise commands.BadArgument("No unfreezeable channels! Set some using `/freezeable`.")
         
-        unlocked = []
         await ctx.defer()
-        for channel in channels:
-            channel = ctx.guild.get_channel(channel)
-            if channel is not None:
-                if await self.lock_unlock_channel(ctx, channel, lock=None):
-                    unlocked.append(channel)
-        
-        if unlocked:              
-            await ctx.send_success(f"Unlocked {len(unlocked)} channels!")
-        else:
-            raise commands.BadArgument("Server is already unlocked or my permissions are wrong.")
+        result = await lockdown_channels(ctx.guild, channels, lock=False)
 
-    async def lock_unlock_channel(self,  ctx: GIRContext, channel, lock=None):
-        default_role = ctx.guild.default_role
-        member_plus = ctx.guild.get_role(cfg.roles.member_plus)   
-        
-        default_perms = channel.overwrites_for(default_role)
-        memberplus_perms = channel.overwrites_for(member_plus)
-
-        if lock and default_perms.send_messages is None and memberplus_perms.send_messages is None:
-            default_perms.send_messages = False
-            memberplus_perms.send_messages = True
-        elif lock is None and (not default_perms.send_messages) and memberplus_perms.send_messages:
-            default_perms.send_messages = None
-            memberplus_perms.send_messages = None
+        if result.changed:
+            await ctx.send_success(f"Unlocked {len(result.changed)} channels in {result.elapsed:.1f}s!")
         else:
-            return
-        
-        try:
-            await channel.set_permissions(default_role, overwrite=default_perms, reason="Locked!" if lock else "Unlocked!")
-            await channel.set_permissions(member_plus, overwrite=memberplus_perms, reason="Locked!" if lock else "Unlocked!")
-            return True
-        except Exception:
-            return
+            raise commands.BadArgument("Server is already unlocked or my permissions are wrong.")
 
     @admin_and_up()
     @app_commands.guilds(cfg.guild_id)
@@ -4,7 +4,7 @@ import typing
 import discord
 import pytz
 from data.model import Case
-from data.services import guild_service, user_service
+from data.services import guild_service, user_service, xp_accumulator
 from discord import app_commands
 from discord.ext import commands
 from discord.utils import format_dt
@@ -49,8 +49,11 @@ class ModUtils(commands.Cog):
                 raise commands.BadArgument(
                     f"Couldn't find user with ID {new_member}")
 
+        # make sure xp gained since the last flush is transferred too
+        await xp_accumulator.flush()
         u, case_count = user_service.transfer_profile(
             old_member.id, new_member.id)
+        xp_accumulator.forget(old_member.id, new_member.id)
 
         embed = discord.Embed(title="Transferred profile")
         embed.description = f"We transferred {old_member.mention}'s profile to {new_member.mention}"
@@ -85,7 +88,8 @@ class ModUtils(commands.Cog):
         results.is_clem = True
         results.is_xp_frozen = True
         results.warn_points = 599
-        results.save()
+        user_service.save_user(results)
+        xp_accumulator.forget(member.id)
 
         case = Case(
             _id=guild_service.get_guild().case_id,
@@ -111,7 +115,8 @@ class ModUtils(commands.Cog):
     async def freezexp(self, ctx: GIRContext, member: discord.Member):
         results = user_service.get_user(member.id)
         results.is_xp_frozen = not results.is_xp_frozen
-        results.save()
+        user_service.save_user(results)
+        xp_accumulator.forget(member.id)
 
         await ctx.send_success(f"{member.mention}'s xp was {'frozen' if results.is_xp_frozen else 'unfrozen'}.")
 
@@ -128,7 +133,7 @@ class ModUtils(commands.Cog):
         results = user_service.get_user(member.id)
         results.birthday_excluded = True
         results.birthday = None
-        results.save()
+        user_service.save_user(results)
 
         birthday_role = ctx.guild.get_role(cfg.roles.birthday)
         if birthday_role is None:
@@ -151,7 +156,7 @@ class ModUtils(commands.Cog):
 
         results = user_service.get_user(member.id)
         results.birthday = None
-        results.save()
+        user_service.save_user(results)
 
         try:
             ctx.tasks.cancel_unbirthday(member.id)
@@ -194,7 +199,7 @@ class ModUtils(commands.Cog):
 
         results = user_service.get_user(member.id)
         results.birthday = [month, date]
-        results.save()
+        user_service.save_user(results)
 
         await ctx.send_success(f"{member.mention}'s birthday was set.")
 
@@ -251,7 +256,7 @@ class ModUtils(commands.Cog):
         else:
             db_user.command_bans[final_command] = True
 
-        db_user.save()
+        user_service.save_user(db_user)
 
         await ctx.send_success(f"{member.mention} was {'banned' if db_user.command_bans[final_command] else 'unbanned'} from using `/{final_command}`.")
 
@@ -1,12 +1,16 @@
 import asyncio
 import re
 
-import aiohttp
 import discord
 from data.services import guild_service
 from discord.ext import commands
-from utils import GIROldContext, PromptData, cfg
-from utils.framework import gatekeeper
+from utils import GIROldContext, PromptData, cfg, http_client
+from utils.framework import MessageContext, gatekeeper, message_stage
+
+CUSTOM_EMOJI_PATTERN = re.compile(r'<:\d+>|<:.+?:\d+>')
+CUSTOM_EMOJI_GIF_PATTERN = re.compile(r'<a:.+:\d+>|<:.+?:\d+>')
+LINK_PATTERN = re.compile(
+    r"(https?:\/\/(www\.)?[-a-zA-Z0-9@:%._\+~#=]{1,256}\.[a-zA-Z0-9()]{1,6}\b([-a-zA-Z0-9()@:%_\+.~#?&//=]*))")
 
 
 class BoosterEmojis(commands.Cog):
@@ -83,17 +87,9 @@ class BoosterEmojis(commands.Cog):
         except Exception:
             pass
 
-    @commands.Cog.listener()
-    async def on_message(self, msg):
-        if not msg.guild:
-            return
-        if msg.author.bot:
-            return
-
-        if not msg.guild.id == cfg.guild_id:
-            return
-        if not msg.channel.id == cfg.channels.booster_emoji:
-            return
+    @message_stage(channels=[cfg.channels.booster_emoji])
+    async def on_message(self, context: MessageContext):
+        msg = context.message
 
         try:
             _bytes, _ = await self.get_bytes(msg)
@@ -107,7 +103,7 @@ class BoosterEmojis(commands.Cog):
             pass
 
     async def get_bytes(self, msg):
-        custom_emojis = re.findall(r'<:\d+>|<:.+?:\d+>', msg.content)
+        custom_emojis = CUSTOM_EMOJI_PATTERN.findall(msg.content)
         if len(custom_emojis) == 1:
             name = custom_emojis[0].split(':')[1]
         custom_emojis = [int(e.split(':')[2].replace('>', ''))
@@ -115,16 +111,15 @@ class BoosterEmojis(commands.Cog):
         custom_emojis = [
             f"https://cdn.discordapp.com/emojis/{e}.png?v=1" for e in custom_emojis]
 
-        custom_emojis_gif = re.findall(r'<a:.+:\d+>|<:.+?:\d+>', msg.content)
+        custom_emojis_gif = CUSTOM_EMOJI_GIF_PATTERN.findall(msg.content)
         if len(custom_emojis_gif) == 1:
             name = custom_emojis_gif[0].split(':')[1]
         custom_emojis_gif = [int(e.split(':')[2].replace('>', ''))
                              for e in custom_emojis_gif]
         custom_emojis_gif = [
             f"https://cdn.discordapp.com/emojis/{e}.gif?v=1" for e in custom_emojis_gif]
-        pattern = re.compile(
-            r"(https?:\/\/(www\.)?[-a-zA-Z0-9@:%._\+~#=]{1,256}\.[a-zA-Z0-9()]{1,6}\b([-a-zA-Z0-9()@:%_\+.~#?&//=]*))")
-        link = pattern.search(msg.content)
+        # skip the link regex entirely for messages without a URL
+        link = LINK_PATTERN.search(msg.content) if "://" in msg.content else None
         if (link):
             if link.group(0):
                 link = link.group(0)
@@ -153,21 +148,20 @@ class BoosterEmojis(commands.Cog):
             await msg.add_reaction('❓')
 
     async def do_content_parsing(self, url):
-        async with aiohttp.ClientSession() as session:
-            async with session.head(url) as resp:
-                if resp.status != 200:
-                    return None
-                elif resp.headers["CONTENT-TYPE"] not in ["image/png", "image/jpeg", "image/gif", "image/webp"]:
-                    return None
-                elif int(resp.headers['CONTENT-LENGTH']) > 257000:
-                    raise commands.BadArgument(
-                        f"Image was too big ({int(resp.headers['CONTENT-LENGTH'])/1000}KB)")
-                else:
-                    async with session.get(url) as resp2:
-                        if resp2.status != 200:
-                            return None
-
-                        return await resp2.read()
+        async with http_client.head(url) as resp:
+            if resp.status != 200:
+                return None
+            elif resp.headers["CONTENT-TYPE"] not in ["image/png", "image/jpeg", "image/gif", "image/webp"]:
+                return None
+            elif int(resp.headers['CONTENT-LENGTH']) > 257000:
+                raise commands.BadArgument(
+                    f"Image was too big ({int(resp.headers['CONTENT-LENGTH'])/1000}KB)")
+            else:
+                async with http_client.get(url) as resp2:
+                    if resp2.status != 200:
+                        return None
+
+                    return await resp2.read()
 
 
 async def setup(bot):
@@ -7,7 +7,8 @@ import aiohttp
 
 import discord
 from discord.ext import commands
-from utils import cfg
+from utils import cfg, http_client
+from utils.framework import MessageContext, message_stage
 
 
 class FixSocials(commands.Cog):
@@ -26,20 +27,15 @@ class FixSocials(commands.Cog):
         self.twitter_pattern = re.compile(r"(https:\/\/(www.)?(twitter|x)\.com\/[a-zA-Z0-9_]+\/status\/[0-9]+)")
 
 
-    @commands.Cog.listener()
-    async def on_message(self, message: discord.Message):
+    @message_stage(channels=[cfg.channels.general], hosts=["tiktok.com", "instagram.com", "reddit.com", "redd.it", "twitter.com", "x.com"])
+    async def on_message(self, context: MessageContext):
         if cfg.aaron_id is None or cfg.roles.aaron_role is None:
             return
-        if not message.guild:
-            return
-        if message.guild.id != cfg.guild_id:
-            return
-        if message.author.bot:
-            return
-        if message.channel.id != cfg.channels.general:
-            return
 
-        message_content = message.content.strip("<>")
+        message = context.message
+
+        # only the links on the hosts above are routed here
+        message_content = " ".join(url.raw for url in context.urls)
         if tiktok_match := self.tiktok_pattern.search(message_content):
             link = tiktok_match.group(0)
             await self.fix_tiktok(message, link) 
@@ -60,28 +56,26 @@ class FixSocials(commands.Cog):
                 'content-type': 'application/json',
                 'user-agent': 'GIR - slim.rocks/gir',
             }
-            async with aiohttp.ClientSession(headers=headers) as session:
-                url = 'https://api.quickvids.win/v1/shorturl/create'
-                data = {'input_text': tiktok_url}
-                async with session.post(url, json=data, timeout=aiohttp.ClientTimeout(total=5)) as response:
-                    if response.status == 200:
-                        text = await response.text()
-                        data = json.loads(text)
-                        quickvids_url = data['quickvids_url']
-                        return quickvids_url
-                    else:
-                        return None
+            url = 'https://api.quickvids.win/v1/shorturl/create'
+            data = {'input_text': tiktok_url}
+            async with http_client.post(url, json=data, headers=headers, timeout=aiohttp.ClientTimeout(total=5)) as response:
+                if response.status == 200:
+                    text = await response.text()
+                    data = json.loads(text)
+                    quickvids_url = data['quickvids_url']
+                    return quickvids_url
+                else:
+                    return None
         except (aiohttp.ClientError, asyncio.TimeoutError):
             return None
 
     @cached(ttl=3600)
     async def is_carousel_tiktok(self, link: str):
         try:
-            async with aiohttp.ClientSession() as session:
-                async with session.get(link, timeout=5) as response:
-                    if response.status == 200:
-                        text = await response.text()
-                        return '>Download All Images</button>' in text
+            async with http_client.get(link, timeout=aiohttp.ClientTimeout(total=5)) as response:
+                if response.status == 200:
+                    text = await response.text()
+                    return '>Download All Images</button>' in text
         except (aiohttp.ClientError, asyncio.TimeoutError):
             return False
 
@@ -92,12 +86,11 @@ class FixSocials(commands.Cog):
             return quickvids_url
 
         else:
-            async with aiohttp.ClientSession() as session:
-                async with session.get(link, allow_redirects=False) as response:
-                    if response.status != 301:
-                        return
+            async with http_client.get(link, allow_redirects=False) as response:
+                if response.status != 301:
+                    return
 
-                    redirected_url = str(response).split("Location': \'")[1].split("\'")[0]
+                redirected_url = str(response).split("Location': \'")[1].split("\'")[0]
 
             redirected_url = redirected_url.replace('www.tiktok.com', 'tnktok.com')
             if (tracking_id_index := redirected_url.index('?')) is not None:
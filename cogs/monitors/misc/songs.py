@@ -2,14 +2,14 @@ import json
 import random
 import re
 
-import aiohttp
 import discord
 import spotipy
 from discord.ext import commands
 from spotipy.oauth2 import SpotifyOAuth
 
-from utils import cfg
-from utils.framework import find_triggered_filters, gatekeeper
+from utils import cfg, http_client
+from utils.framework import (MessageContext, find_triggered_filters, gatekeeper,
+                             message_stage)
 from utils.framework.filter import has_only_silent_filtered_words
 from utils.logging import logger
 from datetime import timezone
@@ -69,33 +69,26 @@ class Songs(commands.Cog):
             logger.error(f"Failed to authenticate with Spotify: {e}")
             self.sp = None
 
-    @commands.Cog.listener()
-    async def on_message(self, message: discord.Message):
+    @message_stage(channels=[cfg.channels.general], hosts=["open.spotify.com", "music.apple.com", "spotify.link"])
+    async def on_message(self, context: MessageContext):
         if cfg.aaron_id is None or cfg.roles.aaron_role is None:
             return
-        if not message.guild:
-            return
-        if message.guild.id != cfg.guild_id:
-            return
-        if message.author.bot:
-            return
-        if message.channel.id != cfg.channels.general:
-            return
 
-        match = self.pattern.search(message.content.strip("<>"))
+        message = context.message
+
+        match = self.pattern.search(" ".join(url.raw for url in context.urls))
         if match:
             link = match.group(0)
             await self.generate_view(message, link)
             return
 
     async def generate_view(self, message: discord.Message, link: str):
-        async with aiohttp.ClientSession() as session:
-            async with session.get(f'https://api.song.link/v1-alpha.1/links?url={link}') as resp:
-                if resp.status != 200:
-                    return None
+        async with http_client.get(f'https://api.song.link/v1-alpha.1/links?url={link}') as resp:
+            if resp.status != 200:
+                return None
 
-                res = await resp.text()
-                res = json.loads(res)
+            res = await resp.text()
+            res = json.loads(res)
 
         spotify_data = res.get('linksByPlatform').get('spotify')
         spotify_uri = spotify_data.get('nativeAppUriDesktop')
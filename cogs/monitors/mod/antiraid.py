@@ -1,44 +1,75 @@
-import re
-from asyncio import Lock
+import asyncio
 from datetime import datetime, timedelta, timezone
+from typing import List
 
 import discord
 from data.model import Case
-from data.services import guild_service, user_service
+from data.services import async_guild_service, async_user_service, guild_service
 from discord.ext import commands
 from expiringdict import ExpiringDict
-from utils import cfg
-from utils.framework import MessageTextBucket, gatekeeper, find_triggered_raid_phrases
-from utils.mod import mute, prepare_ban_log
+from utils import cfg, logger
+from utils.framework import (BatchQueue, MessageContext, NearDuplicateIndex,
+                             SlidingWindow, find_triggered_raid_phrases,
+                             gatekeeper, message_stage, normalize_message)
+from utils.mod import lockdown_channels, mute, prepare_ban_log
 from utils.views import report_raid, report_raid_phrase, report_spam
 
 
+# how long to wait for more raid bans before processing a batch (seconds), and the largest batch
+RAID_BAN_BATCH_DELAY = 0.5
+RAID_BAN_BATCH_SIZE = 200
+# how many DMs or single bans are sent at once
+RAID_BAN_CONCURRENCY = 5
+
+
+class RaidBan:
+    """A queued raid ban"""
+
+    __slots__ = ("user", "reason", "dm_user", "case", "log")
+
+    def __init__(self, user: discord.Member, reason: str, dm_user: bool):
+        self.user = user
+        self.reason = reason
+        self.dm_user = dm_user
+        self.case = None
+        self.log = None
+
+
 class RaidType:
     PingSpam = 1
     RaidPhrase = 2
     MessageSpam = 3
     JoinSpamOverTime = 4
     RaidPhraseDetection = 5
+    SimilarMessages = 6
 
 
 class AntiRaidMonitor(commands.Cog):
     def __init__(self, bot):
         self.bot = bot
 
-        # cooldown to monitor if too many users join in a short period of time (more than 10 within 8 seconds)
-        self.join_raid_detection_threshold = commands.CooldownMapping.from_cooldown(
-            rate=10, per=15, type=commands.BucketType.guild)
-        # cooldown to monitor if users are spamming a message (8 within 6 seconds)
-        self.message_spam_detection_threshold = commands.CooldownMapping.from_cooldown(
-            rate=7, per=6.0, type=commands.BucketType.member)
-        # cooldown to monitor if too many accounts created on the same date are joining within a short period of time
-        # (5 accounts created on the same date joining within 45 minutes of each other)
-        self.join_overtime_raid_detection_threshold = commands.CooldownMapping.from_cooldown(
-            rate=4, per=2700, type=MessageTextBucket.custom)
-
-        # cooldown to monitor how many times AntiRaid has been triggered (5 triggers per 15 seconds puts server in lockdown)
-        self.raid_detection_threshold = commands.CooldownMapping.from_cooldown(
-            rate=4, per=15.0, type=commands.BucketType.guild)
+        thresholds = cfg.antiraid
+        # window to monitor if too many users join in a short period of time (more than 10 within 15 seconds by default)
+        # it also remembers who joined, so we can ban all of them
+        self.join_raid_detection_threshold = SlidingWindow(
+            rate=thresholds.join_spam_rate, per=thresholds.join_spam_per)
+        # window to monitor if users are spamming a message (more than 7 within 6 seconds by default)
+        self.message_spam_detection_threshold = SlidingWindow(
+            rate=thresholds.message_spam_rate, per=thresholds.message_spam_per)
+        # recent messages from whitenames, to find many accounts posting variants of the same text
+        # (more than 3 accounts posting messages at least 70% similar within a minute by default)
+        self.similar_message_index = NearDuplicateIndex(
+            threshold=thresholds.similar_message_threshold, per=thresholds.similar_message_per)
+        self.similar_message_rate = thresholds.similar_message_rate
+        # window to monitor if too many accounts created on the same date are joining within a short period of time
+        # (more than 4 accounts created on the same date joining within 45 minutes of each other by default)
+        self.join_overtime_raid_detection_threshold = SlidingWindow(
+            rate=thresholds.join_overtime_rate, per=thresholds.join_overtime_per)
+
+        # window to monitor how many times AntiRaid has been triggered (more than 4 triggers per 15 seconds by default puts server in lockdown)
+        # it also remembers who triggered it, so we can ban all of them
+        self.raid_detection_threshold = SlidingWindow(
+            rate=thresholds.raid_detection_rate, per=thresholds.raid_detection_per)
         # cooldown to only send one raid alert for moderators per 10 minutes
         self.raid_alert_cooldown = commands.CooldownMapping.from_cooldown(
             1, 600.0, commands.BucketType.guild)
@@ -46,19 +77,15 @@ class AntiRaidMonitor(commands.Cog):
         self.spam_report_cooldown = commands.CooldownMapping.from_cooldown(
             rate=1, per=10.0, type=commands.BucketType.member)
 
-        # stores the users that trigger self.join_raid_detection_threshold so we can ban them
-        self.join_user_mapping = ExpiringDict(max_len=100, max_age_seconds=10)
-        # stores the users that trigger self.message_spam_detection_threshold so we can ban them
-        self.spam_user_mapping = ExpiringDict(max_len=100, max_age_seconds=10)
-        # stores the users that trigger self.join_overtime_raid_detection_threshold so we can ban them
-        self.join_overtime_mapping = ExpiringDict(
-            max_len=100, max_age_seconds=2700)
         # stores the users that we have banned so we don't try to ban them repeatedly
         self.ban_user_mapping = ExpiringDict(max_len=100, max_age_seconds=120)
 
-        # locks to prevent race conditions when banning concurrently
-        self.join_overtime_lock = Lock()
-        self.banning_lock = Lock()
+        # raid bans are collected for up to RAID_BAN_BATCH_DELAY seconds and carried out in batches
+        self.ban_queue = BatchQueue(self.process_raid_bans, max_size=RAID_BAN_BATCH_SIZE, max_delay=RAID_BAN_BATCH_DELAY,
+                                    on_error=lambda e: logger.error(f"Failed to process raid bans: {e}"))
+
+    async def cog_unload(self):
+        await self.ban_queue.close()
 
     @commands.Cog.listener()
     async def on_member_join(self, member):
@@ -77,22 +104,13 @@ class AntiRaidMonitor(commands.Cog):
         if member.bot:
             return
 
-        """Detect whether more than 10 users join within 8 seconds"""
-        # add user to cooldown
+        """Detect whether too many users join within a short period of time"""
+        # add user to the window
         current = datetime.now().timestamp()
-        join_spam_detection_bucket = self.join_raid_detection_threshold.get_bucket(
-            member)
-        self.join_user_mapping[member.id] = member
-
-        # if ratelimit is triggered, we should ban all the users that joined in the past 8 seconds
-        if join_spam_detection_bucket.update_rate_limit(current):
-            users = list(self.join_user_mapping.keys())
-            for user in users:
-                try:
-                    user = self.join_user_mapping[user]
-                except KeyError:
-                    continue
 
+        # if the window overflows, we should ban all the users that joined within it
+        if self.join_raid_detection_threshold.hit(member.guild.id, current, member):
+            for user in self.join_raid_detection_threshold.items(member.guild.id):
                 try:
                     await self.raid_ban(user, reason="Join spam detected.")
                 except Exception:
@@ -103,8 +121,8 @@ class AntiRaidMonitor(commands.Cog):
                 await report_raid(member)
                 await self.freeze_server(member.guild)
 
-        """Detect whether more than 4 users created on the same day
-        (after May 1st 2021) join within 45 minutes of each other"""
+        """Detect whether too many users created on the same day
+        (after May 1st 2021) join within a short period of each other"""
 
         # skip if the user was created within the last 15 minutes
         if member.created_at > datetime.now(member.created_at.tzinfo) - timedelta(minutes=15):
@@ -112,7 +130,7 @@ class AntiRaidMonitor(commands.Cog):
 
         # skip user if we manually verified them, i.e they were approved by a moderator
         # using the !verify command when they appealed a ban.
-        if user_service.get_user(member.id).raid_verified:
+        if (await async_user_service.get_user(member.id)).raid_verified:
             return
 
         # skip if it's an older account (before May 1st 2021)
@@ -122,7 +140,7 @@ class AntiRaidMonitor(commands.Cog):
         # this setting disables the filter for accounts created from "Today"
         # useful when we get alot of new users, for example when a new Jailbreak is released.
         # this setting is controlled using !spammode
-        if not guild_service.get_guild().ban_today_spam_accounts:
+        if not guild_service.snapshot.ban_today_spam_accounts:
             now = datetime.today()
             now = [now.year, now.month, now.day]
             member_now = [member.created_at.year,
@@ -134,44 +152,30 @@ class AntiRaidMonitor(commands.Cog):
         timestamp_bucket_for_logging = member.created_at.strftime(
             "%B %d, %Y, %I %p")
         # generate string representation for the account creation date (July 1st, 2021 for example).
-        # we will use this for the cooldown mechanism, to ratelimit accounts created on this date.
+        # we will use this as the window key, to ratelimit accounts created on this date.
         timestamp = member.created_at.strftime(
             "%B %d, %Y")
 
-        # store this user with all the users that were created on this date
-        async with self.join_overtime_lock:
-            if self.join_overtime_mapping.get(timestamp) is None:
-                self.join_overtime_mapping[timestamp] = [member]
-            else:
-                if member in self.join_overtime_mapping[timestamp]:
-                    return
-
-                self.join_overtime_mapping[timestamp].append(member)
-
-        # handle ratelimitting. If ratelimit is triggered, ban all the users we know were created on this date.
-        bucket = self.join_overtime_raid_detection_threshold.get_bucket(
-            timestamp)
+        # store this user with all the users that were created on this date (rejoins aren't counted twice).
+        # if the window overflows, ban all the users we know were created on this date.
         current = member.joined_at.replace(tzinfo=timezone.utc).timestamp()
-        if bucket.update_rate_limit(current):
-            users = [m for m in self.join_overtime_mapping.get(timestamp)]
-            for user in users:
+        if self.join_overtime_raid_detection_threshold.hit(timestamp, current, member, unique=True):
+            for user in self.join_overtime_raid_detection_threshold.items(timestamp):
                 try:
+                    # the joins stay in the window, so later joins from this date are banned too;
+                    # users that were already banned are skipped by raid_ban
                     await self.raid_ban(user, reason=f"Join spam over time detected (bucket `{timestamp_bucket_for_logging}`)", dm_user=True)
-                    self.join_overtime_mapping[timestamp].remove(user)
                 except Exception:
                     pass
 
-    @commands.Cog.listener()
-    async def on_message(self, message: discord.Message):
-        if message.guild is None:
-            return
-        if message.author.bot:
-            return
-        if message.guild.id != cfg.guild_id:
-            return
-        message.author = message.guild.get_member(message.author.id)
-        if gatekeeper.has(message.guild, message.author, 5):
+    @message_stage(max_level=4)
+    async def on_message(self, context: MessageContext):
+        if context.member is None:
             return
+        message = context.message
+        message.author = context.member
+
+        similar_message_cluster = self.similar_messages(message)
 
         if await self.ping_spam(message):
             await self.handle_raid_detection(message, RaidType.PingSpam)
@@ -181,6 +185,8 @@ class AntiRaidMonitor(commands.Cog):
             await self.handle_raid_detection(message, RaidType.MessageSpam)
         elif await self.detect_scam_link(message):
             await self.report_possible_raid_phrase(message)
+        elif similar_message_cluster and await self.similar_message_spam(message):
+            await self.handle_raid_detection(message, RaidType.SimilarMessages, similar_message_cluster)
 
     async def detect_scam_link(self, message: discord.Message):
         # check if message contains @everyone or @here
@@ -191,9 +197,7 @@ class AntiRaidMonitor(commands.Cog):
         if not (contains_everyone or contains_here) or not contains_keywords:
             return False
 
-        # use regex to find if message contains url
-        url = re.search(r'(https?://\S+)', message.content)
-        if url is None:
+        if not any(url.scheme in ("http", "https") for url in normalize_message(message).urls):
             return False
 
         # don't trigger if this user isn't a whitename
@@ -208,18 +212,15 @@ class AntiRaidMonitor(commands.Cog):
 
         return True
 
-    async def handle_raid_detection(self, message: discord.Message, raid_type: RaidType):
+    async def handle_raid_detection(self, message: discord.Message, raid_type: RaidType, cluster: List[discord.Member] = None):
         current = message.created_at.replace(tzinfo=timezone.utc).timestamp()
-        spam_detection_bucket = self.raid_detection_threshold.get_bucket(
-            message)
         user = message.author
 
         do_freeze = False
         do_banning = False
-        self.spam_user_mapping[user.id] = 1
 
-        # has the antiraid filter been triggered 5 or more times in the past 10 seconds?
-        if spam_detection_bucket.update_rate_limit(current):
+        # has the antiraid filter been triggered too many times recently?
+        if self.raid_detection_threshold.hit(message.guild.id, current, user):
             do_banning = True
             # yes! notify the mods and lock the server.
             raid_alert_bucket = self.raid_alert_cooldown.get_bucket(message)
@@ -232,27 +233,27 @@ class AntiRaidMonitor(commands.Cog):
             await self.freeze_server(message.guild)
 
         # ban all the spammers
-        if raid_type in [RaidType.PingSpam, RaidType.MessageSpam]:
+        if raid_type in [RaidType.PingSpam, RaidType.MessageSpam, RaidType.SimilarMessages]:
+            if raid_type is RaidType.PingSpam:
+                title = "Ping spam detected"
+            elif raid_type is RaidType.MessageSpam:
+                title = "Message spam detected"
+            else:
+                title = "Similar messages from multiple accounts detected"
+
             if not do_banning and not do_freeze:
-                if raid_type is RaidType.PingSpam:
-                    title = "Ping spam detected"
-                else:
-                    title = "Message spam detected"
                 await report_spam(self.bot, message, user, title=title)
             else:
-                users = list(self.spam_user_mapping.keys())
-                for user in users:
-                    try:
-                        _ = self.spam_user_mapping[user]
-                    except KeyError:
-                        continue
-
-                    user = message.guild.get_member(user)
+                # everyone who triggered the antiraid filter within the window,
+                # along with every account that posted a variant of this message
+                offenders = self.raid_detection_threshold.items(message.guild.id) + (cluster or [])
+                for user in {user.id: user for user in offenders}.values():
+                    user = message.guild.get_member(user.id)
                     if user is None:
                         continue
 
                     try:
-                        await self.raid_ban(user, reason="Ping spam detected" if raid_type is RaidType.PingSpam else "Message spam detected")
+                        await self.raid_ban(user, reason=title)
                     except Exception:
                         pass
 
@@ -274,17 +275,16 @@ class AntiRaidMonitor(commands.Cog):
         return False
 
     async def message_spam(self, message):
-        """If a message is spammed 8 times in 5 seconds, mute the user and generate a report.
+        """If a member sends more messages than the configured message spam threshold allows, mute them and generate a report.
         A mod must either unmute or ban the user.
         """
 
         if gatekeeper.has(message.guild, message.author, 1):
             return False
 
-        bucket = self.message_spam_detection_threshold.get_bucket(message)
         current = message.created_at.replace(tzinfo=timezone.utc).timestamp()
 
-        if bucket.update_rate_limit(current):
+        if self.message_spam_detection_threshold.hit(message.author.id, current):
             bucket = self.spam_report_cooldown.get_bucket(message)
             current = message.created_at.replace(
                 tzinfo=timezone.utc).timestamp()
@@ -296,6 +296,36 @@ class AntiRaidMonitor(commands.Cog):
 
         return False
 
+    def similar_messages(self, message) -> List[discord.Member]:
+        """Add a whitename's message to the near-duplicate index. Returns the authors of the recent
+        near-duplicates of the message if more accounts than the configured limit posted one,
+        otherwise an empty list.
+        """
+
+        if gatekeeper.has(message.guild, message.author, 1):
+            return []
+
+        current = message.created_at.replace(tzinfo=timezone.utc).timestamp()
+        cluster = self.similar_message_index.add(message.author.id, normalize_message(message).folded, current, message.author)
+        if len(cluster) <= self.similar_message_rate:
+            return []
+
+        return cluster
+
+    async def similar_message_spam(self, message):
+        """Mute a member who posted a variant of a message many other accounts posted recently,
+        and generate a report. A mod must either unmute or ban the user.
+        """
+
+        bucket = self.spam_report_cooldown.get_bucket(message)
+        current = message.created_at.replace(tzinfo=timezone.utc).timestamp()
+        if bucket.update_rate_limit(current):
+            return False
+
+        ctx = await self.bot.get_context(message)
+        await mute(ctx, message.author, mod=ctx.guild.me, reason="Similar message spam")
+        return True
+
     async def raid_phrase_detected(self, message):
         """Raid phrases are specific phrases (such as known scam URLs), and upon saying them, whitenames
         will immediately be banned. Uses the same system as filters to search messages for the phrases.
@@ -304,24 +334,24 @@ class AntiRaidMonitor(commands.Cog):
         if gatekeeper.has(message.guild, message.author, 2):
             return False
 
-        if await find_triggered_raid_phrases(message.content, message.author) is not None:
+        if await find_triggered_raid_phrases(normalize_message(message), message.author) is not None:
             await self.raid_ban(message.author)
             return True
 
         return False
 
     async def report_possible_raid_phrase(self, message):
-        # use regex to find url from message
-        url = re.search(r'(https?://\S+)', message.content)
+        url = next((url for url in normalize_message(message).urls if url.scheme in ("http", "https")), None)
+        if url is None:
+            return
 
-        # extract domain from url
-        domain = url.group(1).split("/")[2]
+        domain = url.host
         if domain == "discord.gg":
             return
 
         if domain in ["bit.ly", "github.com"]:
             # for bit.ly we don't want to ban the whole domain, just this specific one
-            domain = url.group(1)
+            domain = url.raw
 
         ctx = await self.bot.get_context(message)
         user = message.author
@@ -334,75 +364,95 @@ class AntiRaidMonitor(commands.Cog):
         await ctx.guild.message.delete()
 
     async def raid_ban(self, user: discord.Member, reason="Raid phrase detected", dm_user=False):
-        """Helper function to ban users"""
+        """Helper function to ban users. The ban is queued and carried out with the next batch
+        of raid bans, so this returns right away.
+        """
 
-        async with self.banning_lock:
-            # if self.ban_user_mapping.get(user.id) is not None:
-            if self.bot.ban_cache.is_banned(user.id):
-                return
-            else:
-                self.bot.ban_cache.ban(user.id)
+        if self.bot.ban_cache.is_banned(user.id):
+            return
+        self.bot.ban_cache.ban(user.id)
 
-            db_guild = guild_service.get_guild()
+        self.ban_queue.put(RaidBan(user, reason, dm_user))
 
-            case = Case(
-                _id=db_guild.case_id,
-                _type="BAN",
-                date=datetime.now(),
-                mod_id=self.bot.user.id,
-                mod_tag=str(self.bot.user),
-                punishment="PERMANENT",
-                reason=reason
-            )
+    async def process_raid_bans(self, bans: List["RaidBan"]):
+        """Carry out a batch of raid bans: reserve a block of case IDs, ban everyone (RAID_BAN_CONCURRENCY
+        at a time), then write the cases of the successful bans at once and post their public logs in groups.
+        Users that couldn't be banned, also because the batch failed, are taken out of the ban cache again.
+        """
 
-            guild_service.inc_caseid()
-            user_service.add_case(user.id, case)
+        guild = bans[0].user.guild
+        banned_ids = set()
+        try:
+            first_case_id = await async_guild_service.reserve_case_ids(len(bans))
+            now = datetime.now()
+            for i, ban in enumerate(bans):
+                ban.case = Case(
+                    _id=first_case_id + i,
+                    _type="BAN",
+                    date=now,
+                    mod_id=self.bot.user.id,
+                    mod_tag=str(self.bot.user),
+                    punishment="PERMANENT",
+                    reason=ban.reason
+                )
+                ban.log = prepare_ban_log(self.bot.user, ban.user, ban.case)
+
+            semaphore = asyncio.Semaphore(RAID_BAN_CONCURRENCY)
+
+            # DMs have to go out before the ban, while we still share a server with them
+            async def send_dm(ban: RaidBan):
+                async with semaphore:
+                    try:
+                        await ban.user.send(f"You were banned from {ban.user.guild.name}.\n\nThis action was performed automatically. If you think this was a mistake, please send a message here: https://www.reddit.com/message/compose?to=%2Fr%2FJailbreak", embed=ban.log)
+                    except Exception:
+                        pass
 
-            log = prepare_ban_log(self.bot.user, user, case)
+            await asyncio.gather(*(send_dm(ban) for ban in bans if ban.dm_user))
 
-            if dm_user:
-                try:
-                    await user.send(f"You were banned from {user.guild.name}.\n\nThis action was performed automatically. If you think this was a mistake, please send a message here: https://www.reddit.com/message/compose?to=%2Fr%2FJailbreak", embed=log)
-                except Exception:
-                    pass
+            async def ban_one(ban: RaidBan):
+                async with semaphore:
+                    try:
+                        await guild.ban(discord.Object(id=ban.user.id), reason="Raid")
+                    except Exception as e:
+                        logger.error(f"Failed to ban raider {ban.user.id}: {e}")
+                    else:
+                        banned_ids.add(ban.user.id)
+
+            await asyncio.gather(*(ban_one(ban) for ban in bans))
+        finally:
+            # raid_ban marked everyone as banned when they were queued, undo that for everyone that wasn't banned,
+            # also when the batch failed before getting to the bans. their reserved case IDs are left unused
+            for ban in bans:
+                if ban.user.id not in banned_ids:
+                    self.bot.ban_cache.unban(ban.user.id)
+
+        bans = [ban for ban in bans if ban.user.id in banned_ids]
+        if not bans:
+            return
 
-            if user.guild.get_member(user.id) is not None:
-                await user.ban(reason="Raid")
-            else:
-                await user.guild.ban(discord.Object(id=user.id), reason="Raid")
+        try:
+            await async_user_service.bulk_add_cases([(ban.user.id, ban.case) for ban in bans])
+        except Exception as e:
+            # the bans went through, so log whose cases are missing to be able to add them by hand
+            logger.error(f"Failed to add the cases of {len(bans)} banned raiders ({', '.join(str(ban.user.id) for ban in bans)}): {e}")
+
+        public_logs = guild.get_channel(cfg.channels.public_logs)
+        if public_logs:
+            for ban in bans:
+                ban.log.remove_author()
+                ban.log.set_thumbnail(url=ban.user.display_avatar)
 
-            public_logs = user.guild.get_channel(cfg.channels.public_logs)
-            if public_logs:
-                log.remove_author()
-                log.set_thumbnail(url=user.display_avatar)
-                await public_logs.send(embed=log)
+            # a message can hold up to 10 embeds
+            for i in range(0, len(bans), 10):
+                await public_logs.send(embeds=[ban.log for ban in bans[i:i + 10]])
 
     async def freeze_server(self, guild):
         """Freeze all channels marked as freezeable during a raid, meaning only people with the Member+ role and up
         can talk (temporarily lock out whitenames during a raid)"""
 
-        db_guild = guild_service.get_guild()
-
-        for channel in db_guild.locked_channels:
-            channel = guild.get_channel(channel)
-            if channel is None:
-                continue
-
-            default_role = guild.default_role
-            member_plus = guild.get_role(cfg.roles.member_plus)
-
-            default_perms = channel.overwrites_for(default_role)
-            memberplus_perms = channel.overwrites_for(member_plus)
-
-            if default_perms.send_messages is None and memberplus_perms.send_messages is None:
-                default_perms.send_messages = False
-                memberplus_perms.send_messages = True
-
-                try:
-                    await channel.set_permissions(default_role, overwrite=default_perms, reason="Locked!")
-                    await channel.set_permissions(member_plus, overwrite=memberplus_perms, reason="Locked!")
-                except Exception:
-                    pass
+        result = await lockdown_channels(guild, guild_service.snapshot.locked_channels, lock=True)
+        if result.failed:
+            logger.warning(f"Couldn't freeze {len(result.failed)} channels: {', '.join(f'#{channel.name}' for channel in result.failed)}")
 
 
 async def setup(bot):
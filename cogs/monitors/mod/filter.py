@@ -1,28 +1,59 @@
+import asyncio
 import json
+import os
 import re
 from datetime import datetime, timezone
 
-import aiohttp
 import discord
-from aiocache.decorators import cached
 from data.model import FilterWord
 from data.services import guild_service
-from discord.ext import commands
-from utils import cfg, logger, scam_cache
-from utils.framework import gatekeeper, find_triggered_filters
+from discord.ext import commands, tasks
+from utils import cfg, invite_cache, logger, scam_cache
+from utils.fetchers import fetch_cij_or_news_database
+from utils.framework import (MessageContext, find_triggered_filters, gatekeeper,
+                             message_stage, normalize_message)
+from utils.framework.aho_corasick import KeywordGroups
 from utils.framework.filter import has_only_silent_filtered_words
 from utils.mod import mute
 from utils.views import manual_report, report
 
+# last good copy of the CIJ / ETA filter database, so it works right after a restart
+CIJ_DATABASE_PATH = os.path.join(cfg.state_directory, "cij_or_news_database.json")
+CIJ_DATABASE_KEYS = ("intent_cij", "intent_news", "verb", "subject")
+
+GUILD_TAG_KEYWORDS = KeywordGroups({
+    "intent": [
+        "how to get", "how do i get", "how do i", "how to", "how do", "how can i get", "how can i", "how can", "how to get", "where can", "where to get", "where to", "where do i", "where do", "where can i",
+    ],
+    "verb": [
+        "tag", "guild", "jb", "clan", "ios"
+    ],
+})
+
 
 class Filter(commands.Cog):
     def __init__(self, bot):
         self.bot = bot
-        self.invite_filter = r'(?:https?://)?discord(?:(?:app)?\.com/invite|\.gg)\/{1,}[a-zA-Z0-9]+/?'
+        self.cij_keywords = None
+        self.invite_filter = re.compile(r'(?:https?://)?discord(?:(?:app)?\.com/invite|\.gg)\/{1,}[a-zA-Z0-9]+/?', flags=re.S)
         self.spoiler_filter = r'\|\|(.*?)\|\|'
         self.spam_cooldown = commands.CooldownMapping.from_cooldown(
             2, 10.0, commands.BucketType.member)
 
+    async def cog_load(self):
+        try:
+            with open(CIJ_DATABASE_PATH) as f:
+                self.cij_keywords = self.compile_cij_or_news_database(json.load(f))
+        except FileNotFoundError:
+            pass
+        except Exception as e:
+            logger.error(f"Could not load the saved CIJ or ETA filter database: {e}")
+
+        self.refresh_cij_or_news_database.start()
+
+    async def cog_unload(self):
+        self.refresh_cij_or_news_database.cancel()
+
     @commands.Cog.listener()
     async def on_reaction_add(self, reaction: discord.Reaction, reacter: discord.Member):
         """Generate a report when a moderator reacts the stop sign emoji on a message
@@ -50,9 +81,9 @@ class Filter(commands.Cog):
         await reaction.message.remove_reaction(reaction.emoji, reacter)
         await manual_report(reacter, reaction.message)
 
-    @commands.Cog.listener()
-    async def on_message(self, message):
-        await self.run_filter(message)
+    @message_stage(max_level=6)
+    async def on_message(self, context: MessageContext):
+        await self.run_filter(context.message)
 
     @commands.Cog.listener()
     async def on_message_edit(self, _, message):
@@ -122,7 +153,7 @@ class Filter(commands.Cog):
 
     async def bad_word_filter(self, message) -> bool:
         triggered_words = await find_triggered_filters(
-            message.content, message.author)
+            normalize_message(message), message.author)
         if not triggered_words:
             return
 
@@ -158,16 +189,17 @@ class Filter(commands.Cog):
         return triggered
 
     async def do_invite_filter(self, message):
-        invites = re.findall(self.invite_filter, message.content, flags=re.S)
+        # invites don't need a scheme, so they can't come from the shared URL list
+        if "discord" not in message.content:
+            return
+        invites = self.invite_filter.findall(message.content)
         if not invites:
             return
 
-        db_guild = guild_service.get_guild()
-
-        whitelist = db_guild.filter_excluded_guilds
+        whitelist = guild_service.snapshot.filter_excluded_guilds
         for invite in invites:
             try:
-                invite = await self.bot.fetch_invite(invite)
+                invite = await invite_cache.fetch(self.bot, invite)
 
                 id = None
                 if isinstance(invite, discord.Invite):
@@ -223,25 +255,24 @@ class Filter(commands.Cog):
         return False
 
     async def scam_filter(self, message: discord.Message):
-        for url in scam_cache.scam_jb_urls:
-            if url in message.content.lower():
-                embed = discord.Embed(
-                    title="Fake or scam jailbreak", color=discord.Color.red())
-                embed.description = f"Your message contained the link to a **fake jailbreak** ({url}).\n\nIf you installed this jailbreak, remove it from your device immediately and try to get a refund if you paid for it. Jailbreaks *never* cost money and will not ask for any form of payment or survey to install them."
-                await self.delete(message)
-                await self.ratelimit(message)
-                await message.channel.send(f"{message.author.mention}", embed=embed)
-                return True
+        content = normalize_message(message).lowered
+        if url := scam_cache.jb.match(content):
+            embed = discord.Embed(
+                title="Fake or scam jailbreak", color=discord.Color.red())
+            embed.description = f"Your message contained the link to a **fake jailbreak** ({url}).\n\nIf you installed this jailbreak, remove it from your device immediately and try to get a refund if you paid for it. Jailbreaks *never* cost money and will not ask for any form of payment or survey to install them."
+            await self.delete(message)
+            await self.ratelimit(message)
+            await message.channel.send(f"{message.author.mention}", embed=embed)
+            return True
 
-        for url in scam_cache.scam_unlock_urls:
-            if url in message.content.lower():
-                embed = discord.Embed(
-                    title="Fake or scam unlock", color=discord.Color.red())
-                embed.description = f"Your message contained the link to a **fake unlock** ({url}).\n\nIf you bought a phone second-hand and it arrived iCloud locked, contact the seller to remove it [using these instructions](https://support.apple.com/en-us/HT201351), or get a refund.\n\nIf you or a relative are the original owner of the device and you can provide the original proof of purchase, Apple Support can remove the lock.\nPlease refer to these articles: [How to remove Activation Lock](https://support.apple.com/HT201441) or [If you forgot your iPhone passcode](https://support.apple.com/HT204306)."
-                await self.delete(message)
-                await self.ratelimit(message)
-                await message.channel.send(f"{message.author.mention}", embed=embed)
-                return True
+        if url := scam_cache.unlock.match(content):
+            embed = discord.Embed(
+                title="Fake or scam unlock", color=discord.Color.red())
+            embed.description = f"Your message contained the link to a **fake unlock** ({url}).\n\nIf you bought a phone second-hand and it arrived iCloud locked, contact the seller to remove it [using these instructions](https://support.apple.com/en-us/HT201351), or get a refund.\n\nIf you or a relative are the original owner of the device and you can provide the original proof of purchase, Apple Support can remove the lock.\nPlease refer to these articles: [How to remove Activation Lock](https://support.apple.com/HT201441) or [If you forgot your iPhone passcode](https://support.apple.com/HT204306)."
+            await self.delete(message)
+            await self.ratelimit(message)
+            await message.channel.send(f"{message.author.mention}", embed=embed)
+            return True
 
         return False
 
@@ -293,15 +324,35 @@ class Filter(commands.Cog):
         except Exception:
             pass
 
-    @cached(ttl=3600)
-    async def fetch_cij_or_news_database(self):
-        async with aiohttp.ClientSession() as session:
-            async with session.get("https://raw.githubusercontent.com/DiscordGIR/CIJOrNewsFilter/main/database.json") as resp:
-                if resp.status == 200:
-                    data = await resp.text()
-                    return json.loads(data)
+    def compile_cij_or_news_database(self, database: dict) -> KeywordGroups:
+        if not isinstance(database, dict) or any(not isinstance(database.get(key), list) for key in CIJ_DATABASE_KEYS):
+            raise ValueError(f"missing one of {', '.join(CIJ_DATABASE_KEYS)}")
+
+        return KeywordGroups({key: database[key] for key in CIJ_DATABASE_KEYS})
 
-                return {}
+    @tasks.loop(hours=1)
+    async def refresh_cij_or_news_database(self):
+        """Fetch the CIJ / ETA filter database in the background and save it as the last good copy"""
+
+        try:
+            database = await fetch_cij_or_news_database()
+            if database is None:
+                return
+
+            self.cij_keywords = self.compile_cij_or_news_database(database)
+            await asyncio.to_thread(self.save_cij_or_news_database, database)
+        except Exception as e:
+            logger.error(f"Something went wrong with CIJ or ETA filter; {e}")
+
+    @refresh_cij_or_news_database.before_loop
+    async def before_refresh_cij_or_news_database(self):
+        await self.bot.wait_until_ready()
+
+    def save_cij_or_news_database(self, database: dict):
+        tmp_path = f"{CIJ_DATABASE_PATH}.tmp"
+        with open(tmp_path, "w") as f:
+            json.dump(database, f)
+        os.replace(tmp_path, CIJ_DATABASE_PATH)
 
     async def detect_cij_or_eta(self, message: discord.Message):
         if message.edited_at is not None:
@@ -309,24 +360,15 @@ class Filter(commands.Cog):
         if gatekeeper.has(message.guild, message.author, 1):
             return
 
-        cij_filter_response = await self.fetch_cij_or_news_database()
-        intent_cij = cij_filter_response.get("intent_cij")
-        intent_news = cij_filter_response.get("intent_news")
-
-        verb = cij_filter_response.get("verb")
-        subject = cij_filter_response.get("subject")
-
-        if None in [intent_cij, intent_news, verb]:
-            logger.error(
-                f"Something went wrong with CIJ or ETA filter; {intent_cij}, {intent_news}, {verb}")
+        # not fetched yet, and there was no saved copy either
+        if self.cij_keywords is None:
             return
 
-        text = message.content.lower()
-        subject_and_word_in_message = any(
-            v in text for v in verb) and any(s in text for s in subject)
+        found = self.cij_keywords.groups_in(normalize_message(message).lowered)
+        subject_and_word_in_message = "verb" in found and "subject" in found
 
-        intent_news_triggered = any(intent in text for intent in intent_news)
-        intent_cij_triggered = any(intent in text for intent in intent_cij)
+        intent_news_triggered = "intent_news" in found
+        intent_cij_triggered = "intent_cij" in found
         
         if (intent_news_triggered or intent_cij_triggered) and subject_and_word_in_message and message.channel.id == cfg.channels.general:
             view = discord.ui.View()
@@ -373,15 +415,8 @@ class Filter(commands.Cog):
         if gatekeeper.has(message.guild, message.author, 1):
             return
 
-        intent = [
-            "how to get", "how do i get", "how do i", "how to", "how do", "how can i get", "how can i", "how can", "how to get", "where can", "where to get", "where to", "where do i", "where do", "where can i",
-        ]
-
-        verb = [
-            "tag", "guild", "jb", "clan", "ios"
-        ]
-
-        if any(i in message.content.lower() for i in intent) and any(v in message.content.lower() for v in verb):
+        found = GUILD_TAG_KEYWORDS.groups_in(normalize_message(message).lowered)
+        if "intent" in found and "verb" in found:
             if message.channel.id == cfg.channels.general:
                 embed = discord.Embed(color=discord.Color.orange())
                 embed.description = f"It appears you are asking about the jailbreak guild tag. To join the iOS guild, go into your User Settings and navigate to Profiles. Under Server Tag, select the r/Jailbreak guild.\n\nYou can also get a holographic name tag by boosting the server."
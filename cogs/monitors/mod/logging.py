@@ -1,4 +1,3 @@
-import aiohttp
 import discord
 from discord.ext import commands
 from discord.utils import format_dt
@@ -8,9 +7,9 @@ from io import BytesIO
 from typing import List, Union
 
 import discord
-from data.services.guild_service import guild_service
-from data.services.user_service import user_service
+from data.services import async_guild_service, async_user_service, guild_service
 from utils.config import cfg
+from utils.http import http_client
 
 
 class Logging(commands.Cog):
@@ -31,7 +30,7 @@ class Logging(commands.Cog):
         if member.guild.id != cfg.guild_id:
             return
 
-        db_user = user_service.get_user(member.id)
+        db_user = await async_user_service.get_user(member.id)
         channel = member.guild.get_channel(cfg.channels.private_logs)
 
         embed = discord.Embed(title="Member joined")
@@ -92,16 +91,14 @@ class Logging(commands.Cog):
             return
 
 
-        db_guild = guild_service.get_guild()
-        webhook = db_guild.emoji_logging_webhook
+        webhook = guild_service.snapshot.emoji_logging_webhook
         if webhook is None:
             channel = member.guild.get_channel(cfg.channels.emoji_logs)
             if channel is None:
                 return
 
             webhook = (await channel.create_webhook(name=f"Webhook {channel.name}")).url
-            db_guild.emoji_logging_webhook = webhook
-            db_guild.save()
+            await async_guild_service.set_emoji_logging_webhook(webhook)
 
         content = f"{reaction.emoji}\n\n{reaction.message.channel.mention} | [Link to message]({reaction.message.jump_url}) | **{member.id}**"
         body = {
@@ -110,11 +107,10 @@ class Logging(commands.Cog):
             "content": content
         }
 
-        async with aiohttp.ClientSession() as session:
-            the_webhook: discord.Webhook = discord.Webhook.from_url(
-                webhook, session=session)
-            # send message to webhook
-            await the_webhook.send(**body, allowed_mentions=discord.AllowedMentions(users=False, everyone=False, roles=False))
+        the_webhook: discord.Webhook = discord.Webhook.from_url(
+            webhook, session=http_client.session)
+        # send message to webhook
+        await the_webhook.send(**body, allowed_mentions=discord.AllowedMentions(users=False, everyone=False, roles=False))
 
     @commands.Cog.listener()
     async def on_message_edit(self, before: discord.Message, after: discord.Message) -> None:
@@ -134,7 +130,7 @@ class Logging(commands.Cog):
         if not before.content or not after.content or before.content == after.content:
             return
 
-        db_guild = guild_service.get_guild()
+        db_guild = guild_service.snapshot
         if before.channel.id in db_guild.logging_excluded_channels:
             return
 
@@ -182,7 +178,7 @@ class Logging(commands.Cog):
         if message.content == "" or not message.content:
             return
 
-        db_guild = guild_service.get_guild()
+        db_guild = guild_service.snapshot
         if message.channel.id in db_guild.logging_excluded_channels:
             return
 
@@ -230,7 +226,7 @@ class Logging(commands.Cog):
             return
 
         members = set()
-        db_guild = guild_service.get_guild()
+        db_guild = guild_service.snapshot
         if messages[0].channel.id in db_guild.logging_excluded_channels:
             return
 
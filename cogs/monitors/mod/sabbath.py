@@ -2,9 +2,8 @@ from datetime import timezone
 import discord
 from discord.ext import commands
 
-from data.services import guild_service
 from utils import cfg, logger
-from utils.framework import gatekeeper
+from utils.framework import MessageContext, message_stage
 
 class Sabbath(commands.Cog):
     def __init__(self, bot):
@@ -12,23 +11,18 @@ class Sabbath(commands.Cog):
         self.spam_cooldown = commands.CooldownMapping.from_cooldown(
             1, 300.0, commands.BucketType.member)
 
-    @commands.Cog.listener()
-    async def on_message(self, message: discord.Message):
-        if not message.guild:
-            return
-        if message.guild.id != cfg.guild_id:
-            return
-        if message.author.bot:
-            return
+    @message_stage()
+    async def on_message(self, context: MessageContext):
+        message = context.message
 
         # check if message pings aaron or owner role:
         if not (cfg.aaron_id in message.raw_mentions or cfg.roles.aaron_role in message.raw_role_mentions):
             return
 
-        if not guild_service.get_guild().sabbath_mode:
+        if not context.snapshot.sabbath_mode:
             return
 
-        if gatekeeper.has(message.guild, message.author, 5):
+        if context.level >= 5:
             return
 
         current = message.created_at.replace(tzinfo=timezone.utc).timestamp()
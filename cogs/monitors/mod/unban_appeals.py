@@ -4,7 +4,7 @@ from data.services import user_service
 from discord.ext import commands
 from discord.utils import format_dt
 from utils import cfg
-from utils.framework import gatekeeper
+from utils.framework import MessageContext, gatekeeper, message_stage
 
 
 def chunks(lst, n):
@@ -34,12 +34,9 @@ class UnbanAppeals(commands.Cog):
 
             await member.kick(reason="You are not allowed to join this server.")
 
-    @commands.Cog.listener()
-    async def on_message(self, message: discord.Message):
-        if message.guild is None:
-            return
-        if message.guild.id != cfg.ban_appeal_guild_id:
-            return
+    @message_stage(guild_id=cfg.ban_appeal_guild_id, bots=True)
+    async def on_message(self, context: MessageContext):
+        message = context.message
         if not message.webhook_id:
             return
         if not message.embeds:
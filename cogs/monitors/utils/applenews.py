@@ -1,18 +1,18 @@
 from discord.ext import commands
 from utils.config import cfg
+from utils.framework import ANY_GUILD, MessageContext, message_stage
 
 class AppleNews(commands.Cog):
     def __init__(self, bot):
         self.bot = bot
     
-    @commands.Cog.listener()
-    async def on_message(self, msg):
+    @message_stage(channels=[cfg.channels.applenews], guild_id=ANY_GUILD, bots=True)
+    async def on_message(self, context: MessageContext):
         """When a message is posted in the #apple-news news channel, automatically publish it."""
         
+        msg = context.message
         if not msg.guild:
             return
-        if msg.channel.id != cfg.channels.applenews:
-            return
         if not msg.author.bot:
             return
         if not msg.channel.is_news():
@@ -3,12 +3,11 @@ import os
 import re
 import traceback
 
-import aiohttp
 import discord
 from discord.ext import commands
 
-from utils import canister_fetch_repos, cfg, logger
-from utils.framework import gatekeeper
+from utils import canister_fetch_repos, cfg, http_client, logger
+from utils.framework import ANY_GUILD, ANY_HOST, MessageContext, message_stage
 from utils.views import default_repos
 
 
@@ -16,28 +15,23 @@ class RepoWatcher(commands.Cog):
     def __init__(self, bot):
         self.bot = bot
 
-    @commands.Cog.listener()
-    async def on_message(self, message):
-        if message.guild is None:
-            return
-        if message.guild.id != cfg.guild_id:
-            return
-        if message.author.bot:
-            return
-        if message.channel.id == cfg.channels.general and not gatekeeper.has(message.guild, message.author, 5):
+    @message_stage(hosts=[ANY_HOST])
+    async def on_message(self, context: MessageContext):
+        message = context.message
+        if message.channel.id == cfg.channels.general and context.level < 5:
             return
         # Stops double messages when a package and repo URL are in the same message
-        if 'sileo://package/' in message.content:
+        if any(url.scheme == "sileo" and url.host == "package" for url in context.urls):
             return
 
-        url = re.search(r'(https?://\S+)', message.content)
+        url = next((url for url in context.urls if url.scheme in ("http", "https")), None)
         if url is None:
             return
 
         repos = await canister_fetch_repos()
         repos = [repo['uri'].lower() for repo in repos if repo.get('uri')]
 
-        potential_repo = url.group(0).rstrip("/").lower()
+        potential_repo = url.raw.rstrip("/").lower()
         if any(repo in potential_repo for repo in default_repos):
             return
 
@@ -60,53 +54,47 @@ class Tweaks(commands.Cog):
     def __init__(self, bot):
         self.bot = bot
 
-    @commands.Cog.listener()
-    async def on_message(self, message):
-        if message.author.bot:
-            return
+    @message_stage(guild_id=ANY_GUILD)
+    async def on_message(self, context: MessageContext):
+        message = context.message
 
         if not ("apt" in message.content.lower() and "base structure" in message.content.lower() and ("libhooker" or "substitute" or "substrate" in message.content.lower()) and len(message.content.splitlines()) >= 50):
             return
 
-        async with aiohttp.ClientSession(headers={'content-type': 'application/json', 'X-Auth-Token': os.environ.get("PASTEE_TOKEN")}) as session:
-            async with session.post(url='https://api.paste.ee/v1/pastes', json={"description": f"Uploaded by {message.author}", "sections": [{"name": f"Uploaded by {message.author}", "syntax": "text", "contents": message.content}]}) as response:
-                if response.status != 201:
-                    try:
-                        raise Exception(
-                            f"Failed to upload paste: {response.status}")
-                    except Exception:
-                        logger.error(traceback.format_exc())
+        async with http_client.post(url='https://api.paste.ee/v1/pastes', json={"description": f"Uploaded by {message.author}", "sections": [{"name": f"Uploaded by {message.author}", "syntax": "text", "contents": message.content}]}, headers={'content-type': 'application/json', 'X-Auth-Token': os.environ.get("PASTEE_TOKEN")}) as response:
+            if response.status != 201:
+                try:
+                    raise Exception(
+                        f"Failed to upload paste: {response.status}")
+                except Exception:
+                    logger.error(traceback.format_exc())
 
-                resp = await response.json()
-                pastelink = resp.get("link")
-                if pastelink is None:
-                    return
+            resp = await response.json()
+            pastelink = resp.get("link")
+            if pastelink is None:
+                return
 
-                embed = discord.Embed(
-                    title=f"Tweak list", color=discord.Color.green())
-                embed.description = f"You have pasted a tweak list, to reduce chat spam it can be viewed [here]({pastelink})."
+            embed = discord.Embed(
+                title=f"Tweak list", color=discord.Color.green())
+            embed.description = f"You have pasted a tweak list, to reduce chat spam it can be viewed [here]({pastelink})."
 
-                await message.delete()
-                await message.channel.send(message.author.mention, embed=embed)
+            await message.delete()
+            await message.channel.send(message.author.mention, embed=embed)
 
 
 class Sileo(commands.Cog):
     def __init__(self, bot):
         self.bot = bot
+        self.pattern = re.compile(
+            r"(sileo|zbra):\/\/package\/([a-zA-Z0-9]+(\.[a-zA-Z0-9]+)+(\.[a-zA-Z0-9]+)+)")
 
-    @commands.Cog.listener()
-    async def on_message(self, message):
-        if message.guild is None:
-            return
-        if message.guild.id != cfg.guild_id:
-            return
-        if message.author.bot:
-            return
-        if message.channel.id == cfg.channels.general and not gatekeeper.has(message.guild, message.author, 5):
+    @message_stage(hosts=["package"])
+    async def on_message(self, context: MessageContext):
+        message = context.message
+        if message.channel.id == cfg.channels.general and context.level < 5:
             return
 
-        urlscheme = re.search(
-            "(sileo|zbra):\/\/package\/([a-zA-Z0-9]+(\.[a-zA-Z0-9]+)+(\.[a-zA-Z0-9]+)+)", message.content)
+        urlscheme = self.pattern.search(" ".join(url.raw for url in context.urls))
 
         if urlscheme is None:
             return
@@ -1,16 +1,30 @@
 import datetime
 import discord
-from discord.ext import commands
+from discord.ext import commands, tasks
 
 import math
 from random import randint
-from data.services.user_service import user_service
+from data.services import async_user_service, xp_accumulator
+from data.services.xp_accumulator import FLUSH_INTERVAL
 from utils.config import cfg
+from utils.framework import MessageContext, message_stage
 
 
 class Xp(commands.Cog):
     def __init__(self, bot):
         self.bot = bot
+        self.flush_xp.start()
+
+    async def cog_unload(self):
+        self.flush_xp.cancel()
+        # don't lose xp gained since the last flush when shutting down
+        await xp_accumulator.flush()
+
+    @tasks.loop(seconds=FLUSH_INTERVAL)
+    async def flush_xp(self):
+        """Background task to write xp gained from chatting to the database in bulk."""
+
+        await xp_accumulator.flush()
 
     @commands.Cog.listener()
     async def on_member_join(self, member: discord.Member) -> None:
@@ -19,7 +33,7 @@ class Xp(commands.Cog):
         if member.guild.id != cfg.guild_id:
             return
 
-        user = user_service.get_user(id=member.id)
+        user = await async_user_service.get_user(id=member.id)
 
         if user.is_xp_frozen or user.is_clem:
             return
@@ -29,29 +43,21 @@ class Xp(commands.Cog):
         roles_to_add = self.assess_new_roles(level, member)
         await self.add_new_roles(member, roles_to_add)
 
-    @commands.Cog.listener()
-    async def on_message(self, message):
-        if not message.guild:
-            return
-        if message.guild.id != cfg.guild_id:
-            return
-        if message.author.bot:
-            return
-
-        if message.channel.id == cfg.channels.bot_commands:
-            return
+    @message_stage(exclude_channels=[cfg.channels.bot_commands])
+    async def on_message(self, context: MessageContext):
+        message = context.message
 
-        user = user_service.get_user(id=message.author.id)
+        user = await xp_accumulator.get_user(message.author.id)
         if user.is_xp_frozen or user.is_clem:
             return
 
         xp_to_add = randint(0, 11)
-        new_xp, level_before = user_service.inc_xp(
+        new_xp, level_before = xp_accumulator.inc_xp(
             message.author.id, xp_to_add)
         new_level = self.get_level(new_xp)
 
         if new_level > level_before:
-            user_service.inc_level(message.author.id)
+            xp_accumulator.inc_level(message.author.id)
 
         roles_to_add = self.assess_new_roles(new_level, message.author)
         await self.add_new_roles(message, roles_to_add)
@@ -108,14 +114,14 @@ class StickyRoles(commands.Cog):
 
         roles = [role.id for role in member.roles if role <
                  member.guild.me.top_role and role != member.guild.default_role]
-        user_service.set_sticky_roles(member.id, roles)
+        await async_user_service.set_sticky_roles(member.id, roles)
 
     @commands.Cog.listener()
     async def on_member_join(self, member: discord.Member):
         if member.guild.id != cfg.guild_id:
             return
 
-        possible_roles = user_service.get_user(member.id).sticky_roles
+        possible_roles = (await async_user_service.get_user(member.id)).sticky_roles
         roles = [member.guild.get_role(role) for role in possible_roles if member.guild.get_role(
             role) is not None and member.guild.get_role(role) < member.guild.me.top_role]
         await member.add_roles(*roles, reason="Sticky roles")
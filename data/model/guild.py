@@ -19,6 +19,8 @@ class Guild(mongoengine.Document):
     memes                     = mongoengine.EmbeddedDocumentListField(Tag, default=[])
     sabbath_mode              = mongoengine.BooleanField(default=False)
     ban_today_spam_accounts   = mongoengine.BooleanField(default=False)
+    # bumped by every GuildService settings mutator so cached snapshots know when to reload
+    settings_version          = mongoengine.IntField(default=0)
     
     meta = {
         'db_alias': 'default',
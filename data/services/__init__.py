@@ -1,2 +1,4 @@
 from .guild_service import guild_service
-from .user_service import *
\ No newline at end of file
+from .user_service import *
+from .async_service import async_guild_service, async_user_service
+from .xp_accumulator import xp_accumulator
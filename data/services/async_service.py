@@ -0,0 +1,50 @@
+import asyncio
+import functools
+import inspect
+from concurrent.futures import ThreadPoolExecutor
+
+from .guild_service import guild_service
+from .user_service import user_service
+
+# pymongo is thread safe and keeps its own connection pool, so running the
+# blocking mongoengine calls on a small dedicated pool keeps them off the event loop
+_db_executor = ThreadPoolExecutor(max_workers=8, thread_name_prefix="gir-db")
+
+
+class AsyncService:
+    """Awaitable view over one of the synchronous services.
+
+    Every method of the wrapped service is exposed under the same name, but returns
+    an awaitable that runs the blocking database call in a worker thread. Methods that
+    are already coroutines are passed through untouched. Both views share the same
+    underlying service object, so cogs can move from `user_service.get_user(...)`
+    to `await async_user_service.get_user(...)` one at a time.
+    """
+
+    def __init__(self, service):
+        self._service = service
+
+    def __getattr__(self, name):
+        attr = getattr(self._service, name)
+        if not callable(attr) or inspect.iscoroutinefunction(attr):
+            return attr
+
+        @functools.wraps(attr)
+        async def wrapper(*args, **kwargs):
+            loop = asyncio.get_running_loop()
+            return await loop.run_in_executor(_db_executor, functools.partial(attr, *args, **kwargs))
+
+        # only build the wrapper once per method
+        setattr(self, name, wrapper)
+        return wrapper
+
+    async def run(self, func, *args, **kwargs):
+        """Run an arbitrary blocking database call (such as `Document.save`) in the database pool.
+        """
+
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(_db_executor, functools.partial(func, *args, **kwargs))
+
+
+async_user_service = AsyncService(user_service)
+async_guild_service = AsyncService(guild_service)
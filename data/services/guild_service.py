@@ -1,8 +1,107 @@
-from aiocache import cached, caches
+import threading
+import time
+from types import MappingProxyType
+from typing import FrozenSet, List, Mapping, NamedTuple, Optional, Tuple
+
 from data.model import FilterWord, Guild, Tag, Giveaway
 from utils import cfg
 
+# reload the snapshot at least this often (seconds), to pick up edits made
+# outside the bot that didn't bump Guild.settings_version
+SNAPSHOT_MAX_AGE = 600
+
+
+class GuildSnapshot(NamedTuple):
+    """Read-only copy of the guild settings that are checked on every message or join.
+    The same object is shared by all readers, so don't modify anything in it.
+    """
+
+    version: int
+    locked_channels: Tuple[int, ...]
+    filter_excluded_channels: FrozenSet[int]
+    filter_excluded_guilds: FrozenSet[int]
+    logging_excluded_channels: FrozenSet[int]
+    filter_words: Tuple[FilterWord, ...]
+    raid_phrases: Tuple[FilterWord, ...]
+    nsa_guild_id: Optional[int]
+    nsa_mapping: Mapping
+    emoji_logging_webhook: Optional[str]
+    sabbath_mode: bool
+    ban_today_spam_accounts: bool
+
+    @classmethod
+    def from_guild(cls, guild: Guild) -> "GuildSnapshot":
+        return cls(
+            version=guild.settings_version,
+            locked_channels=tuple(guild.locked_channels),
+            filter_excluded_channels=frozenset(guild.filter_excluded_channels),
+            filter_excluded_guilds=frozenset(guild.filter_excluded_guilds),
+            logging_excluded_channels=frozenset(guild.logging_excluded_channels),
+            filter_words=tuple(guild.filter_words),
+            raid_phrases=tuple(guild.raid_phrases),
+            nsa_guild_id=guild.nsa_guild_id,
+            nsa_mapping=MappingProxyType(dict(guild.nsa_mapping)),
+            emoji_logging_webhook=guild.emoji_logging_webhook,
+            sabbath_mode=guild.sabbath_mode,
+            ban_today_spam_accounts=guild.ban_today_spam_accounts,
+        )
+
+
 class GuildService:
+    def __init__(self):
+        self._snapshot: Optional[GuildSnapshot] = None
+        self._snapshot_loaded_at = 0.0
+        self._snapshot_lock = threading.Lock()
+        # bumped whenever a tag or meme is added or removed, so autocompletes know to reload the names
+        self.tags_version = 0
+        self.memes_version = 0
+
+    @property
+    def snapshot(self) -> GuildSnapshot:
+        """The current settings snapshot of the main guild. Only the very first access
+        hits the database, after that reading a setting is just an attribute lookup.
+        """
+
+        snapshot = self._snapshot
+        if snapshot is None:
+            snapshot = self.refresh_snapshot()
+        return snapshot
+
+    def refresh_snapshot(self) -> GuildSnapshot:
+        """Reload the settings snapshot from the database and swap it in.
+        Every mutator below calls this after writing, so readers see their own changes straight away.
+        """
+
+        guild = Guild.objects(_id=cfg.guild_id).exclude("tags", "memes").first()
+        snapshot = GuildSnapshot.from_guild(guild)
+        with self._snapshot_lock:
+            # a slower concurrent refresh must not replace a newer snapshot
+            if self._snapshot is None or snapshot.version >= self._snapshot.version:
+                self._snapshot = snapshot
+                self._snapshot_loaded_at = time.monotonic()
+            return self._snapshot
+
+    def check_snapshot_version(self) -> bool:
+        """Compare the snapshot against the settings version stored in the database and
+        reload it if it's outdated or older than `SNAPSHOT_MAX_AGE`.
+
+        Returns
+        -------
+        bool
+            True if the snapshot was reloaded
+        """
+
+        if self._snapshot is None or time.monotonic() - self._snapshot_loaded_at > SNAPSHOT_MAX_AGE:
+            self.refresh_snapshot()
+            return True
+
+        current = Guild.objects(_id=cfg.guild_id).only("settings_version").first()
+        if current.settings_version != self._snapshot.version:
+            self.refresh_snapshot()
+            return True
+
+        return False
+
     def get_guild(self) -> Guild:
         """Returns the state of the main guild from the database.
 
@@ -14,11 +113,17 @@ class GuildService:
 
         return Guild.objects(_id=cfg.guild_id).first()
     
+    def get_tag_names(self) -> List[str]:
+        return [tag.name for tag in Guild.objects(_id=cfg.guild_id).only("tags").first().tags]
+
     def add_tag(self, tag: Tag) -> None:
         Guild.objects(_id=cfg.guild_id).update_one(push__tags=tag)
+        self.tags_version += 1
 
     def remove_tag(self, tag: str):
-        return Guild.objects(_id=cfg.guild_id).update_one(pull__tags__name=Tag(name=tag).name)
+        result = Guild.objects(_id=cfg.guild_id).update_one(pull__tags__name=Tag(name=tag).name)
+        self.tags_version += 1
+        return result
 
     def edit_tag(self, tag):
         return Guild.objects(_id=cfg.guild_id, tags__name=tag.name).update_one(set__tags__S=tag)
@@ -31,11 +136,17 @@ class GuildService:
         self.edit_tag(tag)
         return tag
 
+    def get_meme_names(self) -> List[str]:
+        return [meme.name for meme in Guild.objects(_id=cfg.guild_id).only("memes").first().memes]
+
     def add_meme(self, meme: Tag) -> None:
         Guild.objects(_id=cfg.guild_id).update_one(push__memes=meme)
+        self.memes_version += 1
 
     def remove_meme(self, meme: str):
-        return Guild.objects(_id=cfg.guild_id).update_one(pull__memes__name=Tag(name=meme).name)
+        result = Guild.objects(_id=cfg.guild_id).update_one(pull__memes__name=Tag(name=meme).name)
+        self.memes_version += 1
+        return result
 
     def edit_meme(self, meme):
         return Guild.objects(_id=cfg.guild_id, memes__name=meme.name).update_one(set__memes__S=meme)
@@ -55,6 +166,23 @@ class GuildService:
 
         Guild.objects(_id=cfg.guild_id).update_one(inc__case_id=1)
 
+    def reserve_case_ids(self, count: int = 1) -> int:
+        """Atomically reserves `count` consecutive case IDs, without loading the rest of the Guild document.
+
+        Parameters
+        ----------
+        count : int
+            How many case IDs to reserve
+
+        Returns
+        -------
+        int
+            The first reserved case ID
+        """
+
+        guild = Guild.objects(_id=cfg.guild_id).only("case_id").modify(inc__case_id=count)
+        return guild.case_id
+
     def get_giveaway(self, _id: int) -> Giveaway:
         """
         Return the Document representing a giveaway, whose ID (message ID) is given by `id`
@@ -101,47 +229,57 @@ class GuildService:
         existing = self.get_guild().raid_phrases.filter(word=phrase)
         if(len(existing) > 0):
             return False
-        Guild.objects(_id=cfg.guild_id).update_one(push__raid_phrases=FilterWord(word=phrase, bypass=5, notify=True))
-        await self.get_raid_phrases.cache.clear()
+        Guild.objects(_id=cfg.guild_id).update_one(push__raid_phrases=FilterWord(word=phrase, bypass=5, notify=True), inc__settings_version=1)
+        self.refresh_snapshot()
         return True
     
-    @cached(ttl=3600, key="guild_raid_phrases")
     async def get_raid_phrases(self):
-        return self.get_guild().raid_phrases
+        return self.snapshot.raid_phrases
 
     async def remove_raid_phrase(self, phrase: str):
-        await self.get_raid_phrases.cache.clear()
-        Guild.objects(_id=cfg.guild_id).update_one(pull__raid_phrases__word=FilterWord(word=phrase).word)
+        Guild.objects(_id=cfg.guild_id).update_one(pull__raid_phrases__word=FilterWord(word=phrase).word, inc__settings_version=1)
+        self.refresh_snapshot()
 
     def set_spam_mode(self, mode) -> None:
-        Guild.objects(_id=cfg.guild_id).update_one(set__ban_today_spam_accounts=mode)
+        Guild.objects(_id=cfg.guild_id).update_one(set__ban_today_spam_accounts=mode, inc__settings_version=1)
+        self.refresh_snapshot()
+
+    def set_sabbath_mode(self, mode) -> None:
+        Guild.objects(_id=cfg.guild_id).update_one(set__sabbath_mode=mode, inc__settings_version=1)
+        self.refresh_snapshot()
+
+    def set_emoji_logging_webhook(self, webhook: str) -> None:
+        Guild.objects(_id=cfg.guild_id).update_one(set__emoji_logging_webhook=webhook, inc__settings_version=1)
+        self.refresh_snapshot()
 
     async def add_filtered_word(self, fw: FilterWord) -> None:
         existing = self.get_guild().filter_words.filter(word=fw.word)
         if(len(existing) > 0):
             return False
 
-        Guild.objects(_id=cfg.guild_id).update_one(push__filter_words=fw)
-        await self.get_filtered_words.cache.clear()
+        Guild.objects(_id=cfg.guild_id).update_one(push__filter_words=fw, inc__settings_version=1)
+        self.refresh_snapshot()
         return True
 
-    @cached(ttl=3600, key="guild_filtered_words")
     async def get_filtered_words(self) -> FilterWord:
-        return self.get_guild().filter_words
+        return self.snapshot.filter_words
 
     async def remove_filtered_word(self, word: str):
-        await self.get_filtered_words.cache.clear()
-        return Guild.objects(_id=cfg.guild_id).update_one(pull__filter_words__word=FilterWord(word=word).word)
+        res = Guild.objects(_id=cfg.guild_id).update_one(pull__filter_words__word=FilterWord(word=word).word, inc__settings_version=1)
+        self.refresh_snapshot()
+        return res
 
     async def update_filtered_word(self, word: FilterWord):
-        await self.get_filtered_words.cache.clear()
-        return Guild.objects(_id=cfg.guild_id, filter_words__word=word.word).update_one(set__filter_words__S=word)
+        res = Guild.objects(_id=cfg.guild_id, filter_words__word=word.word).update_one(set__filter_words__S=word, inc__settings_version=1)
+        self.refresh_snapshot()
+        return res
 
     def add_whitelisted_guild(self, id: int):
         g = Guild.objects(_id=cfg.guild_id)
         g2 = g.first()
         if id not in g2.filter_excluded_guilds:
-            g.update_one(push__filter_excluded_guilds=id)
+            g.update_one(push__filter_excluded_guilds=id, inc__settings_version=1)
+            self.refresh_snapshot()
             return True
         return False
 
@@ -149,7 +287,8 @@ class GuildService:
         g = Guild.objects(_id=cfg.guild_id)
         g2 = g.first()
         if id in g2.filter_excluded_guilds:
-            g.update_one(pull__filter_excluded_guilds=id)
+            g.update_one(pull__filter_excluded_guilds=id, inc__settings_version=1)
+            self.refresh_snapshot()
             return True
         return False
 
@@ -157,7 +296,8 @@ class GuildService:
         g = Guild.objects(_id=cfg.guild_id)
         g2 = g.first()
         if id not in g2.filter_excluded_channels:
-            g.update_one(push__filter_excluded_channels=id)
+            g.update_one(push__filter_excluded_channels=id, inc__settings_version=1)
+            self.refresh_snapshot()
             return True
         return False
 
@@ -165,7 +305,8 @@ class GuildService:
         g = Guild.objects(_id=cfg.guild_id)
         g2 = g.first()
         if id in g2.filter_excluded_channels:
-            g.update_one(pull__filter_excluded_channels=id)
+            g.update_one(pull__filter_excluded_channels=id, inc__settings_version=1)
+            self.refresh_snapshot()
             return True
         return False
 
@@ -173,7 +314,8 @@ class GuildService:
         g = Guild.objects(_id=cfg.guild_id)
         g2 = g.first()
         if id not in g2.logging_excluded_channels:
-            g.update_one(push__logging_excluded_channels=id)
+            g.update_one(push__logging_excluded_channels=id, inc__settings_version=1)
+            self.refresh_snapshot()
             return True
         return False
 
@@ -181,22 +323,27 @@ class GuildService:
         g = Guild.objects(_id=cfg.guild_id)
         g2 = g.first()
         if id in g2.logging_excluded_channels:
-            g.update_one(pull__logging_excluded_channels=id)
+            g.update_one(pull__logging_excluded_channels=id, inc__settings_version=1)
+            self.refresh_snapshot()
             return True
         return False
 
     def get_locked_channels(self):
-        return self.get_guild().locked_channels
+        return self.snapshot.locked_channels
 
     def add_locked_channels(self, channel):
-        Guild.objects(_id=cfg.guild_id).update_one(push__locked_channels=channel)
+        Guild.objects(_id=cfg.guild_id).update_one(push__locked_channels=channel, inc__settings_version=1)
+        self.refresh_snapshot()
 
     def remove_locked_channels(self, channel):
-        Guild.objects(_id=cfg.guild_id).update_one(pull__locked_channels=channel)
+        Guild.objects(_id=cfg.guild_id).update_one(pull__locked_channels=channel, inc__settings_version=1)
+        self.refresh_snapshot()
 
     def set_nsa_mapping(self, channel_id, webhooks):
         guild = Guild.objects(_id=cfg.guild_id).first()
         guild.nsa_mapping[str(channel_id)] = webhooks
+        guild.settings_version += 1
         guild.save()
+        self.refresh_snapshot()
 
 guild_service = GuildService()
@@ -1,7 +1,15 @@
-from typing import Counter
+from typing import Counter, Dict, List, Tuple
 from data.model import Case, Cases, User
+from pymongo import UpdateOne
+from utils.cache import LRUCache
 
 class UserService:
+    def __init__(self):
+        # User documents are looked up on every message, join and interaction, so keep
+        # the recently used ones around. Every method that changes a User document
+        # without going through the cached object must drop or refresh its entry.
+        self.cache = LRUCache(max_size=5000, ttl=600)
+
     def get_user(self, id: int) -> User:
         """Look up the User document of a user, whose ID is given by `id`.
         If the user doesn't have a User document in the database, first create that.
@@ -17,6 +25,13 @@ class UserService:
             The User document we found from the database.
         """
 
+        user = self.cache.get(id)
+        if user is None:
+            user = self._fetch_user(id)
+            self.cache.set(id, user)
+        return user
+
+    def _fetch_user(self, id: int) -> User:
         user = User.objects(_id=id).first()
         # first we ensure this user has a User document in the database before continuing
         if not user:
@@ -24,6 +39,18 @@ class UserService:
             user._id = id
             user.save()
         return user
+
+    def save_user(self, user: User) -> None:
+        """Save changes made to a User document returned by `get_user` and refresh its cache entry.
+
+        Parameters
+        ----------
+        user : User
+            The User document to save
+        """
+
+        user.save()
+        self.cache.set(user._id, user)
     
     def leaderboard(self) -> list:
         return User.objects[0:130].only('_id', 'xp').order_by('-xp', '-_id').select_related()
@@ -49,6 +76,7 @@ class UserService:
         # first we ensure this user has a User document in the database before continuing
         self.get_user(_id)
         User.objects(_id=_id).update_one(inc__warn_points=points)
+        self.cache.pop(_id)
         
     def inc_xp(self, id, xp):
         """Increments user xp.
@@ -56,7 +84,8 @@ class UserService:
 
         self.get_user(id)
         User.objects(_id=id).update_one(inc__xp=xp)
-        u = User.objects(_id=id).first()
+        self.cache.pop(id)
+        u = self.get_user(id)
         return (u.xp, u.level)
 
     def inc_level(self, id) -> None:
@@ -65,6 +94,26 @@ class UserService:
 
         self.get_user(id)
         User.objects(_id=id).update_one(inc__level=1)
+        self.cache.pop(id)
+
+    def bulk_inc_xp(self, increments: Dict[int, Tuple[int, int]]) -> None:
+        """Applies many xp and level increments in a single unordered bulk write.
+        Users without a User document get one created through the upsert.
+
+        Parameters
+        ----------
+        increments : Dict[int, Tuple[int, int]]
+            Maps a user ID to the (xp, level) amounts to increment by
+        """
+
+        if not increments:
+            return
+
+        operations = [UpdateOne({"_id": _id}, {"$inc": {"xp": xp, "level": level}}, upsert=True)
+                      for _id, (xp, level) in increments.items()]
+        User._get_collection().bulk_write(operations, ordered=False)
+        for _id in increments:
+            self.cache.pop(_id)
     
     def get_cases(self, id: int) -> Cases:
         """Return the Document representing the cases of a user, whose ID is given by `id`
@@ -107,6 +156,23 @@ class UserService:
         self.get_cases(_id)
         Cases.objects(_id=_id).update_one(push__cases=case)
 
+    def bulk_add_cases(self, cases: List[Tuple[int, Case]]) -> None:
+        """Appends many cases in a single unordered bulk write. Users without a
+        Cases document get one created through the upsert.
+
+        Parameters
+        ----------
+        cases : List[Tuple[int, Case]]
+            (user ID, case) pairs to add
+        """
+
+        if not cases:
+            return
+
+        operations = [UpdateOne({"_id": _id}, {"$push": {"cases": case.to_mongo()}}, upsert=True)
+                      for _id, case in cases]
+        Cases._get_collection().bulk_write(operations, ordered=False)
+
     def set_warn_kicked(self, _id: int) -> None:
         """Set the `was_warn_kicked` field in the User object of the user, whose ID is given by `_id`,
         to True. (this happens when a user reaches 400+ points for the first time and is kicked).
@@ -121,6 +187,7 @@ class UserService:
         # first we ensure this user has a User document in the database before continuing
         self.get_user(_id)
         User.objects(_id=_id).update_one(set__was_warn_kicked=True)
+        self.cache.pop(_id)
 
 
     def rundown(self, id: int) -> list:
@@ -156,11 +223,15 @@ class UserService:
         return User.objects(birthday=date)
     
     def transfer_profile(self, oldmember, newmember):
-        u = self.get_user(oldmember)
+        # work on fresh copies, the cached documents are about to be rewritten
+        self.cache.pop(oldmember)
+        self.cache.pop(newmember)
+
+        u = self._fetch_user(oldmember)
         u._id = newmember
         u.save()
         
-        u2 = self.get_user(oldmember)
+        u2 = self._fetch_user(oldmember)
         u2.xp = 0
         u2.level = 0
         u2.save()
@@ -172,6 +243,9 @@ class UserService:
         cases2 = self.get_cases(oldmember)
         cases2.cases = []
         cases2.save()
+
+        self.cache.pop(oldmember)
+        self.cache.pop(newmember)
         
         return u, len(cases.cases)
     
@@ -227,5 +301,6 @@ class UserService:
     def set_sticky_roles(self, _id: int, roles) -> None:
         self.get_user(_id)
         User.objects(_id=_id).update_one(set__sticky_roles=roles)
+        self.cache.pop(_id)
 
 user_service = UserService()
\ No newline at end of file
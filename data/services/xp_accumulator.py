@@ -0,0 +1,193 @@
+import asyncio
+import time
+from typing import Dict, List, Optional, Tuple
+
+from utils.logging import logger
+
+from .async_service import async_user_service
+
+# flush pending xp at least this often (seconds)
+FLUSH_INTERVAL = 5
+# never keep an increment in memory for longer than this (seconds), even if the flush loop stalls
+MAX_PENDING_AGE = 15
+# flush early once this many users have unsaved xp
+MAX_PENDING_USERS = 500
+# drop cached xp state for idle users once we track more than this many
+MAX_TRACKED_USERS = 20000
+
+
+class XpState:
+    """The xp related fields of a User document, kept up to date in memory
+    between flushes.
+    """
+
+    __slots__ = ("xp", "level", "is_xp_frozen", "is_clem")
+
+    def __init__(self, xp: int, level: int, is_xp_frozen: bool, is_clem: bool):
+        self.xp = xp
+        self.level = level
+        self.is_xp_frozen = is_xp_frozen
+        self.is_clem = is_clem
+
+
+class XpAccumulator:
+    """Write-behind buffer for xp gained from chatting.
+
+    The first message from a user loads their xp and level from the database,
+    after that all level and role decisions are made from the in-memory state.
+    Increments are collected per user and written to Mongo in one unordered
+    bulk write by `flush`, which the Xp cog calls every `FLUSH_INTERVAL` seconds
+    and on unload. A flush is also started early when more than `MAX_PENDING_USERS`
+    users have unsaved xp, or when the oldest increment is older than `MAX_PENDING_AGE`.
+    """
+
+    def __init__(self):
+        self._state: Dict[int, XpState] = {}
+        # user ID -> [xp, level] that hasn't been written yet
+        self._pending: Dict[int, List[int]] = {}
+        # increments taken out of _pending by a flush that is still running
+        self._inflight: Dict[int, List[int]] = {}
+        self._oldest_pending: Optional[float] = None
+        self._flush_lock = asyncio.Lock()
+        self._flush_task: Optional[asyncio.Task] = None
+
+        self.flush_count = 0
+        self.last_flush_size = 0
+        self.last_flush_latency = 0.0
+        self.max_flush_latency = 0.0
+        self.total_flush_latency = 0.0
+
+    @property
+    def pending_count(self) -> int:
+        return len(self._pending)
+
+    @property
+    def average_flush_latency(self) -> float:
+        if not self.flush_count:
+            return 0.0
+        return self.total_flush_latency / self.flush_count
+
+    async def get_user(self, _id: int) -> XpState:
+        """Return the xp state of a user, loading it from the database the first time we see them.
+
+        Parameters
+        ----------
+        _id : int
+            The ID of the user
+
+        Returns
+        -------
+        XpState
+            The xp, level and xp freeze flags of the user, including increments that haven't been flushed yet
+        """
+
+        state = self._state.get(_id)
+        if state is not None:
+            return state
+
+        user = await async_user_service.get_user(_id)
+        # another message from this user may have loaded the state while we were waiting
+        state = self._state.get(_id)
+        if state is not None:
+            return state
+
+        # the document doesn't include increments that haven't been written yet
+        xp, level = user.xp, user.level
+        for unsaved in (self._inflight.get(_id), self._pending.get(_id)):
+            if unsaved is not None:
+                xp += unsaved[0]
+                level += unsaved[1]
+
+        if len(self._state) >= MAX_TRACKED_USERS:
+            self._state = {k: v for k, v in self._state.items() if k in self._pending}
+
+        state = XpState(xp, level, user.is_xp_frozen, user.is_clem)
+        self._state[_id] = state
+        return state
+
+    def inc_xp(self, _id: int, xp: int) -> Tuple[int, int]:
+        """Increments user xp in memory. `get_user` must have been called for this user first.
+
+        Returns
+        -------
+        Tuple[int, int]
+            The new xp of the user and their level before this increment
+        """
+
+        state = self._state[_id]
+        state.xp += xp
+        self._add_pending(_id, xp, 0)
+        return (state.xp, state.level)
+
+    def inc_level(self, _id: int) -> None:
+        """Increments user level in memory. `get_user` must have been called for this user first.
+        """
+
+        self._state[_id].level += 1
+        self._add_pending(_id, 0, 1)
+
+    def forget(self, *ids: int) -> None:
+        """Drop the cached state of users whose User document was changed elsewhere
+        (xp freezes, clem, profile transfers). Pending increments are kept and still flushed.
+        """
+
+        for _id in ids:
+            self._state.pop(_id, None)
+
+    def _add_pending(self, _id: int, xp: int, level: int) -> None:
+        pending = self._pending.get(_id)
+        if pending is None:
+            self._pending[_id] = [xp, level]
+        else:
+            pending[0] += xp
+            pending[1] += level
+
+        now = time.monotonic()
+        if self._oldest_pending is None:
+            self._oldest_pending = now
+
+        if len(self._pending) >= MAX_PENDING_USERS or now - self._oldest_pending >= MAX_PENDING_AGE:
+            self._schedule_flush()
+
+    def _schedule_flush(self) -> None:
+        if self._flush_task is not None and not self._flush_task.done():
+            return
+
+        self._flush_task = asyncio.get_running_loop().create_task(self.flush())
+
+    async def flush(self) -> None:
+        """Write all pending increments to the database in one bulk write.
+        If the write fails, the increments are put back and retried on the next flush.
+        """
+
+        async with self._flush_lock:
+            if not self._pending:
+                return
+
+            pending, self._pending = self._pending, {}
+            self._inflight = pending
+            self._oldest_pending = None
+
+            start = time.perf_counter()
+            try:
+                await async_user_service.bulk_inc_xp({_id: (xp, level) for _id, (xp, level) in pending.items()})
+            except Exception as e:
+                logger.error(f"Failed to flush xp for {len(pending)} users, will retry: {e}")
+                for _id, (xp, level) in pending.items():
+                    unsaved = self._pending.setdefault(_id, [0, 0])
+                    unsaved[0] += xp
+                    unsaved[1] += level
+                self._oldest_pending = time.monotonic()
+                return
+            finally:
+                self._inflight = {}
+
+            latency = time.perf_counter() - start
+            self.flush_count += 1
+            self.last_flush_size = len(pending)
+            self.last_flush_latency = latency
+            self.max_flush_latency = max(self.max_flush_latency, latency)
+            self.total_flush_latency += latency
+
+
+xp_accumulator = XpAccumulator()
@@ -2,16 +2,16 @@ import asyncio
 import os
 import traceback
 import discord
-from discord.ext import commands
+from discord.ext import commands, tasks
 from discord import app_commands
 from discord.app_commands import AppCommandError, Command, ContextMenu, CommandInvokeError, TransformerError
 from extensions import initial_extensions
-from utils import cfg, db, logger, GIRContext, BanCache, IssueCache, Tasks, RuleCache, init_client_session, scam_cache
-from utils.framework import PermissionsFailure, gatekeeper, find_triggered_filters
+from utils import cfg, db, logger, log_shipper, GIRContext, BanCache, IssueCache, Tasks, RuleCache, get_appledb_index, http_client, scam_cache, warm_start
+from utils.framework import PermissionsFailure, gatekeeper, find_triggered_filters, message_pipeline
 from cogs.commands.context_commands import setup_context_commands
 
 from typing import Union
-from data.services.user_service import user_service
+from data.services import async_guild_service, async_user_service
 
 # Remove warning from songs cog
 import warnings
@@ -43,7 +43,84 @@ class Bot(commands.Bot):
         setup_context_commands(self)
 
         self.tasks = Tasks(self)
-        await init_client_session()
+
+        await async_guild_service.refresh_snapshot()
+        self.guild_snapshot_refresh.start()
+
+        # loaded concurrently on the first on_ready
+        warm_start.add("ban cache", self.ban_cache.fetch_ban_cache)
+        warm_start.add("issue cache", self.issue_cache.fetch_issue_cache)
+        warm_start.add("rule cache", self.rule_cache.fetch_rule_cache)
+        warm_start.add("scam cache", self.load_scam_cache)
+        warm_start.add("appledb index", get_appledb_index)
+
+    async def load_scam_cache(self):
+        await scam_cache.load()
+        # the first refresh runs right away and replaces the saved list
+        if not scam_cache.refresh.is_running():
+            scam_cache.refresh.start()
+
+    async def add_cog(self, cog: commands.Cog, **kwargs):
+        await super().add_cog(cog, **kwargs)
+        message_pipeline.add_cog(cog)
+
+    async def remove_cog(self, name: str, **kwargs):
+        cog = await super().remove_cog(name, **kwargs)
+        if cog is not None:
+            message_pipeline.remove_cog(cog)
+        return cog
+
+    async def close(self):
+        await self.ban_cache.save()
+        await self.issue_cache.flush()
+        await self.rule_cache.flush()
+        await super().close()
+        await log_shipper.close()
+        await http_client.close()
+
+    async def on_message(self, message: discord.Message):
+        await self.process_commands(message)
+        await message_pipeline.dispatch(message)
+
+        for index in (self.issue_cache, self.rule_cache):
+            if index.watches(message.channel.id):
+                await index.on_message(message)
+
+    async def on_raw_message_edit(self, payload: discord.RawMessageUpdateEvent):
+        for index in (self.issue_cache, self.rule_cache):
+            if not index.watches(payload.channel_id):
+                continue
+
+            channel = self.get_channel(payload.channel_id)
+            if channel is None:
+                continue
+
+            try:
+                message = await channel.fetch_message(payload.message_id)
+            except discord.NotFound:
+                await index.on_message_delete(payload.message_id)
+            else:
+                await index.on_message(message)
+
+    async def on_raw_message_delete(self, payload: discord.RawMessageDeleteEvent):
+        for index in (self.issue_cache, self.rule_cache):
+            if index.watches(payload.channel_id):
+                await index.on_message_delete(payload.message_id)
+
+    async def on_raw_bulk_message_delete(self, payload: discord.RawBulkMessageDeleteEvent):
+        for index in (self.issue_cache, self.rule_cache):
+            if index.watches(payload.channel_id):
+                for message_id in payload.message_ids:
+                    await index.on_message_delete(message_id)
+
+    @tasks.loop(seconds=30)
+    async def guild_snapshot_refresh(self):
+        """Reload the guild settings snapshot if it was changed outside of this process"""
+
+        try:
+            await async_guild_service.check_snapshot_version()
+        except Exception as e:
+            logger.error(f"Failed to check guild settings version: {e}")
 
 
 class MyTree(app_commands.CommandTree):
@@ -70,7 +147,7 @@ class MyTree(app_commands.CommandTree):
         else:
             command_name = command.name
 
-        db_user = user_service.get_user(interaction.user.id)
+        db_user = await async_user_service.get_user(interaction.user.id)
 
         if db_user.command_bans.get(command_name):
             ctx = GIRContext(interaction)
@@ -156,10 +233,27 @@ async def on_ready():
         f'Logged in as: {bot.user.name} - {bot.user.id} ({discord.__version__})')
     logger.info(f'Successfully logged in and booted...!')
 
-    await bot.ban_cache.fetch_ban_cache()
-    await bot.issue_cache.fetch_issue_cache()
-    await bot.rule_cache.fetch_rule_cache()
-    await scam_cache.fetch_scam_cache()
+    warm_start.start()
+
+
+@bot.event
+async def on_guild_update(before: discord.Guild, after: discord.Guild):
+    # permission levels are memoized per member, and level 7 depends on who owns the guild
+    if before.owner_id != after.owner_id:
+        gatekeeper.invalidate()
+
+
+@bot.event
+async def on_member_ban(guild: discord.Guild, user: discord.User):
+    # keeps the ban cache in sync with bans made by other bots and by hand
+    if guild.id == cfg.guild_id:
+        bot.ban_cache.ban(user.id)
+
+
+@bot.event
+async def on_member_unban(guild: discord.Guild, user: discord.User):
+    if guild.id == cfg.guild_id:
+        bot.ban_cache.unban(user.id)
 
 
 async def main():
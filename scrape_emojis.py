@@ -1,7 +1,15 @@
 import aiohttp
 from bs4 import BeautifulSoup
 import asyncio
-import json
+import base64
+import importlib.util
+import os
+
+# load the store directly, so that the bot config and database aren't needed
+_path = os.path.join(os.path.dirname(__file__), "utils", "emoji_store.py")
+_spec = importlib.util.spec_from_file_location("emoji_store", _path)
+emoji_store = importlib.util.module_from_spec(_spec)
+_spec.loader.exec_module(emoji_store)
 
 async def emoji_thing():
     emojis = None
@@ -21,11 +29,10 @@ async def emoji_thing():
                 for row in table:
                     if len(row) > 4:
                         moji = row[3].replace('…', '').strip()
-                        emojis[row[2]] = moji.replace('data:image/png;base64,', '')
+                        emojis[row[2]] = base64.b64decode(moji.replace('data:image/png;base64,', ''))
                         
     if emojis:
-        with open('emojis.json', 'w') as f:
-            f.write(json.dumps(emojis))
+        emoji_store.write_emoji_store(emojis)
 
 if __name__ == "__main__":
     loop = asyncio.new_event_loop();
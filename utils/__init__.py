@@ -1,8 +1,13 @@
 from .config import *
 from .context import *
 from .database import *
+from .fetch_cache import *
 from .fetchers import *
+from .http import *
 from .logging import *
 from .misc import *
 from .cache import *
-from .jobs import *
\ No newline at end of file
+from .jobs import *
+from .startup import *
+from .appledb import *
+from .autocomplete import *
@@ -0,0 +1,186 @@
+"""
+Lookup tables over the AppleDB payload returned by get_ios_cfw, so that autocompletes,
+transformers and commands don't have to scan every device and firmware on each call.
+"""
+
+import asyncio
+from itertools import groupby
+from typing import Dict, List, Optional, Tuple
+
+from .fetchers import get_ios_cfw
+from .misc import transform_groups
+
+# the device types that have jailbreaks, for jailbreakable_device_autocomplete
+JAILBREAKABLE_TYPES = ("iPhone", "iPod", "iPad", "Apple TV", "Apple Watch", "HomePod")
+
+
+def version_sort_key(firmware: dict) -> tuple:
+    """Sorts firmwares by their version number, so that 16.10 comes after 16.9."""
+
+    parts = (firmware.get("version") or "").split(" ")
+    try:
+        numbers = list(map(int, parts[0].split(".")))
+    except ValueError:
+        numbers = []
+    return numbers, parts
+
+
+def device_release_date(device: Optional[dict]) -> str:
+    """The release date of a device as a sortable string, "-1" if it's unknown."""
+
+    if device is None:
+        return "-1"
+
+    released = device.get("released") or "-1"
+    if isinstance(released, list):
+        released = released[0]
+    return str(released)
+
+
+class AppleDBIndex:
+    """Indexes of one AppleDB payload. A new index is built whenever get_ios_cfw returns
+    a new payload (see `get_appledb_index`).
+
+    Parameters
+    ----------
+    data : dict
+        The payload returned by get_ios_cfw
+    """
+
+    def __init__(self, data: dict):
+        self.data = data
+
+        # device key -> device
+        self.devices: Dict[str, dict] = {}
+        for device in data.get("device") or []:
+            self.devices.setdefault(device.get("key"), device)
+
+        # device groups (with subgroups flattened), and the first group by lowercase name or device key
+        self.groups: List[dict] = transform_groups(data.get("group") or [])
+        self._groups_by_name: Dict[str, dict] = {}
+        self._groups_by_device: Dict[str, dict] = {}
+        for group in self.groups:
+            self._groups_by_name.setdefault(group.get("name").lower(), group)
+            for key in group.get("devices") or []:
+                self._groups_by_device.setdefault(key.lower(), group)
+
+        # groups by release date, newest first, then by type and by their order in AppleDB
+        self.groups_by_release: List[dict] = self._sort_groups(self.groups)
+        self.jailbreakable_groups: List[dict] = [group for group in self.groups_by_release if group.get("type")
+                                                 and any(x in group.get("type") for x in JAILBREAKABLE_TYPES)]
+
+        firmwares = data.get("ios") or []
+        # device key -> firmwares for that device, highest version first
+        self.firmwares_by_device: Dict[str, List[dict]] = {}
+        # lowercase uniqueBuild -> firmware, lowercase version -> firmwares, "iOS 16.1 (20B82)" -> firmware
+        self.firmwares_by_build: Dict[str, dict] = {}
+        self._firmwares_by_version: Dict[str, List[dict]] = {}
+        self._firmwares_by_name: Dict[str, dict] = {}
+        for firmware in firmwares:
+            for key in firmware.get("devices") or []:
+                self.firmwares_by_device.setdefault(key, []).append(firmware)
+            if firmware.get("uniqueBuild"):
+                self.firmwares_by_build.setdefault(firmware["uniqueBuild"].lower(), firmware)
+            if firmware.get("version"):
+                self._firmwares_by_version.setdefault(firmware["version"].lower(), []).append(firmware)
+            self._firmwares_by_name.setdefault(
+                f"{firmware.get('osStr')} {firmware.get('version')} ({firmware.get('build')})", firmware)
+
+        for device_firmwares in self.firmwares_by_device.values():
+            device_firmwares.sort(key=version_sort_key, reverse=True)
+
+        # iOS and iPadOS releases with a build number, newest first
+        releases = [firmware for firmware in firmwares if firmware.get("osStr") in ["iOS", "iPadOS"] and firmware.get("build") is not None]
+        releases.sort(key=lambda x: str(x.get("released") or "1970-01-01"), reverse=True)
+        self.ios_releases: List[dict] = [firmware for firmware in releases if not firmware.get("beta")]
+        self.ios_beta_releases: List[dict] = [firmware for firmware in releases if firmware.get("beta")]
+
+        # jailbreaks by name, and build -> (jailbreak, compatibility entry) pairs in AppleDB order
+        self.jailbreaks: List[dict] = sorted(data.get("jailbreak") or [], key=lambda x: x["name"].lower())
+        self._jailbreaks_by_name: Dict[str, dict] = {}
+        self.jailbreaks_by_build: Dict[str, List[Tuple[dict, dict]]] = {}
+        for jailbreak in data.get("jailbreak") or []:
+            self._jailbreaks_by_name.setdefault(jailbreak.get("name").lower(), jailbreak)
+            for compatibility in jailbreak.get("compatibility") or []:
+                for build in set(compatibility.get("firmwares") or []):
+                    self.jailbreaks_by_build.setdefault(build, []).append((jailbreak, compatibility))
+
+        self.bypasses: List[dict] = sorted(data.get("bypass") or [], key=lambda x: x.get("name").lower())
+
+    def _sort_groups(self, groups: List[dict]) -> List[dict]:
+        groups = sorted(groups, key=lambda x: x.get("type") or "zzz")
+        by_order = []
+        for _, group in groupby(groups, lambda x: x.get("type")):
+            by_order.extend(sorted(group, key=lambda x: x.get("order"), reverse=True))
+
+        release_dates = {id(group): device_release_date(self.devices.get((group.get("devices") or [None])[0]))
+                         for group in by_order}
+        by_order.sort(key=lambda x: release_dates[id(x)], reverse=True)
+        return by_order
+
+    def find_group(self, value: str) -> Optional[dict]:
+        """The device group with this name, or containing a device with this key."""
+
+        value = value.lower()
+        return self._groups_by_name.get(value) or self._groups_by_device.get(value)
+
+    def find_firmware(self, value: str, version: str, beta_only: bool = False) -> Optional[dict]:
+        """The firmware named `value` (like "iOS 16.1 (20B82)"), or with `version` as its build or version number.
+
+        Parameters
+        ----------
+        value : str
+            What the user entered
+        version : str
+            `value` without the OS name
+        beta_only : bool
+            Whether to only look for beta firmwares
+        """
+
+        version = version.lower()
+        candidates = [self._firmwares_by_name.get(value), self.firmwares_by_build.get(version),
+                      *self._firmwares_by_version.get(version, ())]
+        for firmware in candidates:
+            if firmware is not None and (not beta_only or firmware.get("beta")):
+                return firmware
+
+    def find_firmware_on_device(self, device_key: str, version: str) -> Optional[dict]:
+        """The firmware with `version` as its build, or the firmware for the device with `version` as its version number."""
+
+        firmware = self.firmwares_by_build.get(version.lower())
+        if firmware is not None:
+            return firmware
+
+        return next((firmware for firmware in self.firmwares_by_device.get(device_key, ()) if firmware.get("version") == version), None)
+
+    def find_jailbreak(self, name: str) -> Optional[dict]:
+        return self._jailbreaks_by_name.get(name.lower())
+
+
+_index: Optional[AppleDBIndex] = None
+_index_lock = asyncio.Lock()
+
+
+async def get_appledb_index() -> Optional[AppleDBIndex]:
+    """The index of the current AppleDB payload, built in a thread the first time it's needed
+    after the payload was refreshed.
+
+    Returns
+    -------
+    Optional[AppleDBIndex]
+        The index, or None if AppleDB couldn't be fetched
+    """
+
+    global _index
+
+    data = await get_ios_cfw()
+    if data is None:
+        return None
+
+    if _index is not None and _index.data is data:
+        return _index
+
+    async with _index_lock:
+        if _index is None or _index.data is not data:
+            _index = await asyncio.to_thread(AppleDBIndex, data)
+    return _index
@@ -0,0 +1,126 @@
+"""
+An index of autocomplete candidates that answers substring and prefix queries without scanning
+every candidate.
+"""
+
+from bisect import bisect_left
+from typing import Any, Callable, Dict, Iterable, List, Optional, Sequence, Tuple
+
+# substrings up to this long are indexed directly, longer queries are looked up by their rarest trigram
+GRAM_SIZE = 3
+
+
+class AutocompleteIndex:
+    """The candidates of an autocomplete, sorted once, with an index of every substring of up to
+    GRAM_SIZE characters of their search texts.
+
+    Matching is case-insensitive. A query of up to GRAM_SIZE characters is a single lookup, and longer
+    queries only check the candidates that contain their rarest trigram, so the time to answer doesn't
+    grow with the number of candidates. Results are returned in sorted order, and the search stops as
+    soon as `limit` results are found.
+
+    Parameters
+    ----------
+    entries : Iterable[Tuple[str, Any, Sequence[str]]]
+        The candidates, as (name, value, texts to search) tuples
+    sort_key : Optional[Callable[[tuple], Any]]
+        Key to sort the entries by, the lowercase name by default
+    prefix : bool
+        Whether to match queries against the start of the first search text only, instead of anywhere
+        in the search texts. The entries are then sorted by that text
+    """
+
+    def __init__(self, entries: Iterable[Tuple[str, Any, Sequence[str]]], sort_key: Optional[Callable[[tuple], Any]] = None, prefix: bool = False):
+        self.prefix = prefix
+        if prefix:
+            entries = sorted(entries, key=lambda entry: (entry[2][0] or "").lower())
+        else:
+            entries = sorted(entries, key=sort_key or (lambda entry: entry[0].lower()))
+
+        self._choices: List[Tuple[str, Any]] = [(name, value) for name, value, _ in entries]
+        # missing texts (None) are skipped
+        self._texts: List[Tuple[str, ...]] = [tuple(text.lower() for text in texts if text is not None) for _, _, texts in entries]
+
+        # prefix mode: the sorted first search texts, to bisect
+        self._keys: List[str] = [texts[0] if texts else "" for texts in self._texts] if prefix else []
+
+        # substring mode: every substring of up to GRAM_SIZE characters -> positions of the entries containing it, ascending
+        self._grams: Dict[str, List[int]] = {}
+        if not prefix:
+            for position, texts in enumerate(self._texts):
+                grams = set()
+                for text in texts:
+                    for size in range(1, GRAM_SIZE + 1):
+                        grams.update(text[i:i + size] for i in range(len(text) - size + 1))
+                for gram in grams:
+                    self._grams.setdefault(gram, []).append(position)
+
+    def __len__(self):
+        return len(self._choices)
+
+    def search(self, query: str, limit: int = 25) -> List[Tuple[str, Any]]:
+        """The first `limit` candidates matching `query`, as (name, value) pairs.
+
+        Parameters
+        ----------
+        query : str
+            What the user typed so far
+        limit : int
+            The most results to return
+
+        Returns
+        -------
+        List[Tuple[str, Any]]
+            The names and values of the matching candidates, in sorted order
+        """
+
+        query = query.lower()
+        if not query:
+            return self._choices[:limit]
+
+        if self.prefix:
+            keys = self._keys
+            start = end = bisect_left(keys, query)
+            while end < len(keys) and end - start < limit and keys[end].startswith(query):
+                end += 1
+            return self._choices[start:end]
+
+        if len(query) <= GRAM_SIZE:
+            return [self._choices[position] for position in self._grams.get(query, ())[:limit]]
+
+        candidates = min((self._grams.get(query[i:i + GRAM_SIZE], ()) for i in range(len(query) - GRAM_SIZE + 1)), key=len)
+        results = []
+        for position in candidates:
+            if any(query in text for text in self._texts[position]):
+                results.append(self._choices[position])
+                if len(results) == limit:
+                    break
+        return results
+
+
+class AutocompleteCache:
+    """Holds the AutocompleteIndex of a catalogue, building it the first time it's needed and again
+    only when the catalogue changes.
+
+    The catalogue is identified by a source object, for example the list it's built from or a version
+    counter. The index is rebuilt when `get` is passed a different object than last time, or after `invalidate`.
+
+    Parameters
+    ----------
+    build : Callable[[Any], AutocompleteIndex]
+        Builds the index, given the source object
+    """
+
+    def __init__(self, build: Callable[[Any], AutocompleteIndex]):
+        self.build = build
+        self._index: Optional[AutocompleteIndex] = None
+        self._source: Any = None
+
+    def get(self, source: Any = None) -> AutocompleteIndex:
+        if self._index is None or source is not self._source:
+            self._index = self.build(source)
+            self._source = source
+        return self._index
+
+    def invalidate(self) -> None:
+        self._index = None
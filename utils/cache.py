@@ -1,100 +1,813 @@
+import asyncio
+import json
+import os
+import re
+import struct
+import sys
+import threading
+import time
+from abc import ABC, abstractmethod
+from array import array
+from bisect import bisect_left
+from collections import OrderedDict
+from datetime import datetime, timezone
+from typing import Dict, List, Optional, Tuple
+from urllib.parse import parse_qs, urlparse
+
 import discord
+from discord.ext import tasks
 from utils.fetchers import fetch_scam_urls
 
 from .config import cfg 
 from .logging import logger
 
 
+class LRUCache:
+    """A thread safe mapping that holds at most `max_size` entries, dropping the least
+    recently used one when full. Entries also expire `ttl` seconds after they were set.
+    """
+
+    def __init__(self, max_size: int, ttl: float):
+        self.max_size = max_size
+        self.ttl = ttl
+        self._data = OrderedDict()
+        self._lock = threading.Lock()
+
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    def __len__(self):
+        return len(self._data)
+
+    def get(self, key, default=None):
+        with self._lock:
+            entry = self._data.get(key)
+            if entry is None:
+                self.misses += 1
+                return default
+
+            expires_at, value = entry
+            if expires_at < time.monotonic():
+                del self._data[key]
+                self.misses += 1
+                return default
+
+            self._data.move_to_end(key)
+            self.hits += 1
+            return value
+
+    def set(self, key, value):
+        with self._lock:
+            self._data[key] = (time.monotonic() + self.ttl, value)
+            self._data.move_to_end(key)
+            while len(self._data) > self.max_size:
+                self._data.popitem(last=False)
+                self.evictions += 1
+
+    def pop(self, key, default=None):
+        with self._lock:
+            entry = self._data.pop(key, None)
+            return default if entry is None else entry[1]
+
+    def clear(self):
+        with self._lock:
+            self._data.clear()
+
+    @property
+    def hit_rate(self) -> float:
+        total = self.hits + self.misses
+        return self.hits / total if total else 0.0
+
+
 class BanCache:
+    """The IDs of everyone banned from the main guild, kept as a sorted array of unsigned 64 bit ints
+    (8 bytes per ban, rather than a Python int in a set).
+
+    The IDs are saved to `PATH` and loaded from there on startup, and bans and unbans that happened
+    while the bot was offline are caught up from the audit log. The full, paginated crawl of the
+    guild's bans only happens on first boot, when the file is older than the audit log goes back,
+    or when asked for with /refreshbans. While running, the cache is kept up to date by the
+    on_member_ban / on_member_unban events and the bot's own moderation actions.
+    """
+
+    PATH = os.path.join(cfg.state_directory, "ban_cache.bin")
+    # how often changes are written to disk, in seconds
+    SAVE_INTERVAL = 60
+    # Discord keeps audit logs for 45 days, older files are crawled again
+    MAX_CATCH_UP_AGE = 40 * 24 * 60 * 60
+    # magic, guild ID, number of IDs, when the file was saved (unix time)
+    HEADER = struct.Struct("<8sQQd")
+    MAGIC = b"GIRBANS1"
+
     def __init__(self, bot):
         self.bot = bot
-        self.cache = set()
+        self._ids = array("Q")
+        self._loaded = False
+        self._dirty = False
+        # changes made while a crawl is running, replayed on top of its result
+        self._changes_during_crawl: Optional[List[Tuple[bool, int]]] = None
+
+    def __len__(self):
+        return len(self._ids)
+
+    async def fetch_ban_cache(self, force: bool = False):
+        """Load the ban list, from disk if possible. This is called on every on_ready,
+        but only does any work the first time unless `force` is set.
+
+        Parameters
+        ----------
+        force : bool
+            Crawl the full ban list from Discord even if it's already loaded
+        """
+
+        if self._loaded and not force:
+            return
 
-    async def fetch_ban_cache(self):
         guild = self.bot.get_guild(cfg.guild_id)
-        the_list = [ban async for ban in guild.bans(limit=None)]
-        self.cache = {entry.user.id for entry in the_list}
+        if guild is None:
+            return
+
+        if not force and await self.load(guild):
+            self._loaded = True
+        else:
+            await self.crawl(guild)
+            self._loaded = True
+            await self.save()
+
+        if not self.autosave.is_running():
+            self.autosave.start()
+
+    async def crawl(self, guild: discord.Guild):
+        """Replace the cache with the full ban list of the guild."""
+
+        start = time.perf_counter()
+        self._changes_during_crawl = []
+        try:
+            ids = array("Q")
+            async for entry in guild.bans(limit=None):
+                ids.append(entry.user.id)
+            ids = array("Q", sorted(ids))
+            changes = self._changes_during_crawl
+        finally:
+            self._changes_during_crawl = None
+
+        self._ids = ids
+        for banned, user_id in changes:
+            if banned:
+                self.ban(user_id)
+            else:
+                self.unban(user_id)
+        self._dirty = True
+        logger.info(f"Crawled {len(ids)} bans in {time.perf_counter() - start:.2f}s")
+
+    async def load(self, guild: discord.Guild) -> bool:
+        """Load the IDs saved to `PATH` and catch up with the audit log.
+        Returns False if the file is missing, unusable or too old to catch up.
+        """
+
+        start = time.perf_counter()
+        try:
+            loaded = await asyncio.to_thread(self._read)
+        except Exception as e:
+            logger.warning(f"Couldn't read the saved ban list: {e}")
+            return False
+
+        if loaded is None:
+            return False
+
+        guild_id, ids, saved_at = loaded
+        if guild_id != guild.id or time.time() - saved_at > self.MAX_CATCH_UP_AGE:
+            return False
+
+        self._ids = ids
+        try:
+            caught_up = await self.catch_up(guild, saved_at)
+        except discord.HTTPException as e:
+            logger.warning(f"Couldn't catch up with bans from the audit log: {e}")
+            return False
+
+        logger.info(f"Loaded {len(ids)} bans from disk and caught up with {caught_up} changes in {time.perf_counter() - start:.2f}s")
+        return True
+
+    async def catch_up(self, guild: discord.Guild, since: float) -> int:
+        """Apply the bans and unbans from the audit log since `since` (unix time), oldest first."""
+
+        # a little overlap, as applying the same change twice is harmless
+        after = datetime.fromtimestamp(since - 60, tz=timezone.utc)
+        entries = []
+        for action in (discord.AuditLogAction.ban, discord.AuditLogAction.unban):
+            async for entry in guild.audit_logs(limit=None, after=after, action=action):
+                entries.append(entry)
+
+        for entry in sorted(entries, key=lambda entry: entry.id):
+            if entry.target is None:
+                continue
+            if entry.action is discord.AuditLogAction.ban:
+                self.ban(entry.target.id)
+            else:
+                self.unban(entry.target.id)
+        return len(entries)
+
+    async def save(self):
+        """Write the cache to `PATH`, replacing the old file atomically."""
+
+        # don't replace a good file with the empty cache of a bot that never got ready
+        if not self._loaded:
+            return
+
+        data = self.HEADER.pack(self.MAGIC, cfg.guild_id, len(self._ids), time.time()) + self._to_bytes(self._ids)
+        self._dirty = False
+        try:
+            await asyncio.to_thread(self._write, data)
+        except Exception as e:
+            self._dirty = True
+            logger.error(f"Failed to save the ban list: {e}")
+
+    @tasks.loop(seconds=SAVE_INTERVAL)
+    async def autosave(self):
+        if self._dirty:
+            await self.save()
 
     def is_banned(self, user_id):
-        return user_id in self.cache
+        ids = self._ids
+        i = bisect_left(ids, user_id)
+        return i < len(ids) and ids[i] == user_id
 
     def ban(self, user_id):
-        self.cache.add(user_id)
+        if self._changes_during_crawl is not None:
+            self._changes_during_crawl.append((True, user_id))
+
+        ids = self._ids
+        i = bisect_left(ids, user_id)
+        if i == len(ids) or ids[i] != user_id:
+            ids.insert(i, user_id)
+            self._dirty = True
 
     def unban(self, user_id):
-        self.cache.discard(user_id)
+        if self._changes_during_crawl is not None:
+            self._changes_during_crawl.append((False, user_id))
+
+        ids = self._ids
+        i = bisect_left(ids, user_id)
+        if i < len(ids) and ids[i] == user_id:
+            del ids[i]
+            self._dirty = True
+
+    @staticmethod
+    def _to_bytes(ids: array) -> bytes:
+        if sys.byteorder == "big":
+            ids = array("Q", ids)
+            ids.byteswap()
+        return ids.tobytes()
+
+    def _read(self) -> Optional[Tuple[int, array, float]]:
+        if not os.path.exists(self.PATH):
+            return None
+
+        with open(self.PATH, "rb") as f:
+            data = f.read()
+
+        magic, guild_id, count, saved_at = self.HEADER.unpack_from(data)
+        if magic != self.MAGIC:
+            return None
+
+        ids = array("Q")
+        ids.frombytes(data[self.HEADER.size:])
+        if sys.byteorder == "big":
+            ids.byteswap()
+        if len(ids) != count:
+            return None
+        return guild_id, ids, saved_at
+
+    def _write(self, data: bytes):
+        tmp_path = f"{self.PATH}.tmp"
+        with open(tmp_path, "wb") as f:
+            f.write(data)
+        os.replace(tmp_path, self.PATH)
+
+
+class ChannelEmbedIndex(ABC):
+    """An index of the embeds posted in one channel, for the caches of common issues and rules.
 
+    The index only holds what the commands need from each message as plain JSON records, and is
+    saved to `PATH` along with the ID of the last message seen. After a restart, only messages
+    newer than that are fetched, plus the saved messages whose signed CDN URLs have expired.
+    While running, the index is kept up to date by the message create, edit and delete events
+    of the channel, so lookups never wait for a crawl. Each event only rebuilds the entries of
+    that message, and saving is delayed by `SAVE_DELAY` seconds so that bursts are saved once.
+
+    Subclasses set `PATH`, return the channel from `channel_id` and turn messages into records
+    with `records_for`. `cache` maps titles to the value `build` makes out of each record,
+    with later messages taking precedence. `cache` is replaced rather than modified when it
+    changes, so holders of the old dict (like the autocompletes) can tell it changed.
+    """
+
+    PATH: str = None
+    CHANNEL_NAME: str = None
+    SAVE_DELAY = 5.0
+    # refetch saved messages whose CDN URLs expire within this many seconds
+    URL_EXPIRY_MARGIN = 3600
+    # with more expired messages than this, crawling the channel takes fewer requests
+    MAX_REFETCHES = 50
 
-class IssueCache():
     def __init__(self, bot):
         self.bot = bot
         self.cache = {}
+        # message ID -> the records of that message
+        self._messages: Dict[int, List[dict]] = {}
+        # title -> IDs of the messages with a record of that title, ascending
+        self._title_messages: Dict[str, List[int]] = {}
+        self.last_message_id: Optional[int] = None
+        self._save_task: Optional[asyncio.Task] = None
 
-    def __contains__(self, item):
-        if item in self.cache:
-            return True
+    @property
+    @abstractmethod
+    def channel_id(self) -> Optional[int]:
+        ...
+
+    @abstractmethod
+    def records_for(self, message: discord.Message) -> List[dict]:
+        """The records to index for a message. Records with a "title" end up in `cache`."""
+
+    @abstractmethod
+    def build(self, message_id: int, record: dict):
+        """The value `cache` holds for a record."""
+
+    def watches(self, channel_id: int) -> bool:
+        return channel_id == self.channel_id
+
+    def message_ids(self, kind: str) -> List[int]:
+        """IDs of the indexed messages with records of the given kind, oldest first."""
+
+        return [message_id for message_id, records in sorted(self._messages.items()) if any(record.get("kind") == kind for record in records)]
 
-    async def fetch_issue_cache(self):
-        guild: discord.TextChannel = self.bot.get_guild(cfg.guild_id)
+    async def fetch(self, force: bool = False):
+        """Load the saved index and fetch the messages posted after it, or crawl the whole channel
+        if there is no saved index for this channel or `force` is set.
+        """
+
+        guild = self.bot.get_guild(cfg.guild_id)
         if not guild:
             return
 
-        channel = guild.get_channel(cfg.channels.common_issues)
+        channel = guild.get_channel(self.channel_id)
         if channel is None:
-            logger.warn("#rules-and-info channel not found! The /issue command will not work! Make sure to set `channel_common_issues` in the database if you want it.")
+            logger.warn(f"#{self.CHANNEL_NAME} channel not found! Make sure it's set in the database if you want it.")
             return
 
-        async for message in channel.history(limit=None, oldest_first=True):
-            if message.author.id != self.bot.user.id:
-                continue
+        start = time.perf_counter()
+        after = None
+        expired = []
+        if not force:
+            try:
+                saved = await asyncio.to_thread(self._read)
+            except FileNotFoundError:
+                saved = None
+            except Exception as e:
+                logger.error(f"Could not load the saved #{self.CHANNEL_NAME} index: {e}")
+                saved = None
+
+            if saved is not None and saved["channel_id"] == channel.id:
+                self._messages = {int(message_id): records for message_id, records in saved["messages"].items()}
+                self.last_message_id = saved["last_message_id"]
+                expired = [message_id for message_id, records in self._messages.items() if _has_expired_urls(records, self.URL_EXPIRY_MARGIN)]
+                if self.last_message_id is not None and len(expired) <= self.MAX_REFETCHES:
+                    after = discord.Object(id=self.last_message_id)
+
+        if after is None:
+            self._messages = {}
+            self.last_message_id = None
+            expired = []
+
+        # the attachment URLs in saved embeds are signed and stop working after a while
+        for message_id in expired:
+            try:
+                self._index(await channel.fetch_message(message_id))
+            except discord.NotFound:
+                self._messages.pop(message_id, None)
+            except discord.HTTPException as e:
+                logger.error(f"Could not refresh message {message_id} of #{self.CHANNEL_NAME}: {e}")
+
+        fetched = len(expired)
+        async for message in channel.history(limit=None, after=after, oldest_first=True):
+            self._index(message)
+            fetched += 1
+
+        self._rebuild()
+        await self.save()
+        logger.info(f"Indexed #{self.CHANNEL_NAME} ({len(self.cache)} entries, {fetched} messages fetched) in {time.perf_counter() - start:.2f}s")
+
+    async def on_message(self, message: discord.Message):
+        """Index a new or edited message of the channel."""
+
+        old_records = self._messages.get(message.id, [])
+        self._index(message)
+        self._update(message.id, old_records)
+        self._schedule_save()
+
+    async def on_message_delete(self, message_id: int):
+        old_records = self._messages.pop(message_id, None)
+        if old_records is not None:
+            self._update(message_id, old_records)
+            self._schedule_save()
+
+    def _index(self, message: discord.Message):
+        records = self.records_for(message)
+        if records:
+            self._messages[message.id] = records
+        else:
+            self._messages.pop(message.id, None)
+
+        if self.last_message_id is None or message.id > self.last_message_id:
+            self.last_message_id = message.id
+
+    def _record(self, message_id: int, title: str) -> dict:
+        # the last record of that title in the message wins, like in _rebuild
+        return [record for record in self._messages[message_id] if record.get("title") == title][-1]
+
+    def _update(self, message_id: int, old_records: List[dict]):
+        """Update `cache` for the titles of one message, before and after it changed."""
+
+        old_titles = {record["title"] for record in old_records if record.get("title") is not None}
+        new_titles = {record["title"] for record in self._messages.get(message_id, []) if record.get("title") is not None}
+
+        cache = dict(self.cache)
+        for title in old_titles | new_titles:
+            message_ids = self._title_messages.setdefault(title, [])
+            i = bisect_left(message_ids, message_id)
+            present = i < len(message_ids) and message_ids[i] == message_id
+            if title in new_titles and not present:
+                message_ids.insert(i, message_id)
+            elif title not in new_titles and present:
+                del message_ids[i]
+
+            if not message_ids:
+                del self._title_messages[title]
+                cache.pop(title, None)
+            elif message_ids[-1] == message_id or title in old_titles:
+                # this message holds the title, or held it until now
+                latest = message_ids[-1]
+                cache[title] = self.build(latest, self._record(latest, title))
+        self.cache = cache
+
+    def _rebuild(self):
+        cache = {}
+        title_messages = {}
+        for message_id, records in sorted(self._messages.items()):
+            for record in records:
+                if record.get("title") is not None:
+                    cache[record["title"]] = self.build(message_id, record)
+                    message_ids = title_messages.setdefault(record["title"], [])
+                    if not message_ids or message_ids[-1] != message_id:
+                        message_ids.append(message_id)
+        self.cache = cache
+        self._title_messages = title_messages
+
+    def _schedule_save(self):
+        if self._save_task is None or self._save_task.done():
+            self._save_task = asyncio.get_running_loop().create_task(self._save_later())
+
+    async def _save_later(self):
+        await asyncio.sleep(self.SAVE_DELAY)
+        await self.save()
 
-            if not message.embeds:
+    async def flush(self):
+        """Save right away if a save is pending, for when the bot shuts down."""
+
+        if self._save_task is not None and not self._save_task.done():
+            self._save_task.cancel()
+            self._save_task = None
+            await self.save()
+
+    async def save(self):
+        data = {
+            "channel_id": self.channel_id,
+            "last_message_id": self.last_message_id,
+            "messages": {str(message_id): records for message_id, records in self._messages.items()}
+        }
+        try:
+            await asyncio.to_thread(self._write, data)
+        except Exception as e:
+            logger.error(f"Failed to save the #{self.CHANNEL_NAME} index: {e}")
+
+    def _read(self) -> dict:
+        with open(self.PATH) as f:
+            return json.load(f)
+
+    def _write(self, data: dict):
+        tmp_path = f"{self.PATH}.tmp"
+        with open(tmp_path, "w") as f:
+            json.dump(data, f)
+        os.replace(tmp_path, self.PATH)
+
+
+def _has_expired_urls(value, margin: float) -> bool:
+    """Whether a record holds a signed Discord CDN URL that expires within `margin` seconds."""
+
+    if isinstance(value, dict):
+        return any(_has_expired_urls(item, margin) for item in value.values())
+    if isinstance(value, list):
+        return any(_has_expired_urls(item, margin) for item in value)
+    if not isinstance(value, str) or "discordapp" not in value or "ex=" not in value:
+        return False
+
+    url = urlparse(value)
+    if url.hostname not in ("cdn.discordapp.com", "media.discordapp.net"):
+        return False
+    try:
+        expires = int(parse_qs(url.query)["ex"][0], 16)
+    except (KeyError, ValueError):
+        return False
+    return expires <= time.time() + margin
+
+
+class IssueEntry:
+    """A common issue posted by the bot, as kept in the issue index."""
+
+    __slots__ = ("title", "message_id", "jump_url", "embed", "buttons")
+
+    def __init__(self, title: str, message_id: int, jump_url: str, embed: discord.Embed, buttons: List[dict]):
+        self.title = title
+        self.message_id = message_id
+        self.jump_url = jump_url
+        self.embed = embed
+        # link buttons, as dicts with the label, url and emoji
+        self.buttons = buttons
+
+
+class IssueCache(ChannelEmbedIndex):
+    PATH = os.path.join(cfg.state_directory, "issue_index.json")
+    CHANNEL_NAME = "common-issues"
+
+    def __contains__(self, item):
+        if item in self.cache:
+            return True
+
+    @property
+    def channel_id(self):
+        return cfg.channels.common_issues
+
+    async def fetch_issue_cache(self, force: bool = False):
+        await self.fetch(force)
+
+    def records_for(self, message):
+        if message.author.id != self.bot.user.id:
+            return []
+
+        if not message.embeds:
+            return []
+
+        embed = message.embeds[0]
+        if not embed.footer.text:
+            return []
+
+        if embed.footer.text.startswith("Submitted by"):
+            buttons = []
+            for component in message.components:
+                if isinstance(component, discord.ActionRow):
+                    for child in component.children:
+                        buttons.append({"label": child.label, "url": child.url, "emoji": str(child.emoji) if child.emoji else None})
+            return [{"kind": "issue", "title": f"{embed.title}", "jump_url": message.jump_url, "embed": embed.to_dict(), "buttons": buttons}]
+        elif embed.footer.text.startswith("Table of Contents"):
+            return [{"kind": "toc"}]
+        return []
+
+    def build(self, message_id, record):
+        return IssueEntry(record["title"], message_id, record["jump_url"], discord.Embed.from_dict(record["embed"]), record["buttons"])
+
+
+class RuleCache(ChannelEmbedIndex):
+    PATH = os.path.join(cfg.state_directory, "rule_index.json")
+    CHANNEL_NAME = "rules-and-info"
+
+    @property
+    def channel_id(self):
+        return cfg.channels.rules
+
+    async def fetch_rule_cache(self, force: bool = False):
+        await self.fetch(force)
+
+    def records_for(self, message):
+        return [{"kind": "rule", "title": f"{embed.title}", "embed": embed.to_dict()} for embed in message.embeds]
+
+    def build(self, message_id, record):
+        return discord.Embed.from_dict(record["embed"])
+
+
+class ScamMatcher:
+    """Looks up the hosts and URLs mentioned in a message against a list of scam URLs.
+
+    Entries that look like a domain, optionally followed by a path, are indexed by host. An entry
+    without a path matches the host and all of its subdomains, in a single dictionary lookup per
+    domain level. Entries with a path are stored in a per-host trie of path prefixes. The few
+    entries that aren't URLs at all are still matched as plain substrings.
+    """
+
+    # a domain, optionally preceded by a scheme and followed by a path
+    HOST_PATTERN = re.compile(r"(?:[a-z][a-z0-9+.-]*://)?((?:[a-z0-9-]+\.)+[a-z0-9-]+)(/[^\s<>()\[\]]*)?")
+
+    def __init__(self, entries: List[str]):
+        self.entries = entries
+        # host -> entry that bans the whole host
+        self._hosts: Dict[str, str] = {}
+        # host -> trie of path characters, the entry is stored under the None key of its last node
+        self._paths: Dict[str, dict] = {}
+        self._substrings: List[str] = []
+
+        for entry in entries:
+            if not isinstance(entry, str) or not entry.strip():
                 continue
 
-            embed = message.embeds[0]
-            if not embed.footer.text:
+            lowered = entry.strip().lower()
+            match = self.HOST_PATTERN.fullmatch(lowered)
+            if match is None:
+                self._substrings.append(lowered)
                 continue
 
-            if embed.footer.text.startswith("Submitted by"):
-                self.cache[f"{embed.title}"] = message
-            else:
+            host, path = match.group(1), match.group(2)
+            if not path:
+                self._hosts.setdefault(host, entry)
                 continue
 
-class RuleCache():
-    def __init__(self, bot):
-        self.bot = bot
-        self.cache = {}
+            node = self._paths.setdefault(host, {})
+            for char in path:
+                node = node.setdefault(char, {})
+            node.setdefault(None, entry)
 
-    async def fetch_rule_cache(self):
-        guild: discord.TextChannel = self.bot.get_guild(cfg.guild_id)
-        if not guild:
-            return
+    def __len__(self):
+        return len(self.entries)
 
-        channel = guild.get_channel(cfg.channels.rules)
-        if channel is None:
-            logger.warn("#rules-and-info channel not found! The /rule command will not work! Make sure to set `channel_rules` in the database if you want it.")
-            return
+    def match(self, text: str) -> Optional[str]:
+        """Return the scam list entry found in `text` (which must already be lowercased), if any."""
+
+        for found in self.HOST_PATTERN.finditer(text):
+            host, path = found.group(1), found.group(2) or ""
+            while host:
+                entry = self._hosts.get(host)
+                if entry is not None:
+                    return entry
+
+                node = self._paths.get(host)
+                if node is not None:
+                    for char in path:
+                        node = node.get(char)
+                        if node is None:
+                            break
+                        if None in node:
+                            return node[None]
+
+                host = host.partition(".")[2]
+
+        for entry in self._substrings:
+            if entry in text:
+                return entry
+        return None
 
-        async for message in channel.history(limit=None, oldest_first=True):
-            if not message.embeds:
-                continue
-            
-            for embed in message.embeds:
-                self.cache[f"{embed.title}"] = embed
 
 class ScamCache:
+    """The fake jailbreak and fake unlock URL lists from the anti-scam JSON list,
+    refreshed in the background every `REFRESH_INTERVAL` hours. The last list fetched
+    is saved to `PATH`, so the filter works right away after a restart.
+    """
+
+    REFRESH_INTERVAL = 1
+    PATH = os.path.join(cfg.state_directory, "scam_cache.json")
+
     def __init__(self):
         self.scam_jb_urls = []
         self.scam_unlock_urls = []
+        self.jb = ScamMatcher([])
+        self.unlock = ScamMatcher([])
+
+    async def load(self):
+        """Load the list saved by the last fetch, if there is one."""
+
+        try:
+            obj = await asyncio.to_thread(self._read)
+        except FileNotFoundError:
+            return
+        except Exception as e:
+            logger.error(f"Could not load the saved scam URL list: {e}")
+            return
+
+        self._apply(obj)
 
     async def fetch_scam_cache(self):
-        obj = await fetch_scam_urls()
+        # this is the cache of the list, so always ask for a new copy
+        obj = await fetch_scam_urls.cache.refresh()
+        if obj is None:
+            return
+
+        self._apply(obj)
+        await asyncio.to_thread(self._write, obj)
+
+    def _apply(self, obj: dict):
         scam_jb_urls = obj.get("scamjburls")
         if scam_jb_urls is not None:
+            self.jb = ScamMatcher(scam_jb_urls)
             self.scam_jb_urls = scam_jb_urls
-        
+
         scam_unlock_urls = obj.get("scamideviceunlockurls")
         if scam_unlock_urls is not None:
+            self.unlock = ScamMatcher(scam_unlock_urls)
             self.scam_unlock_urls = scam_unlock_urls
 
+    def _read(self) -> dict:
+        with open(self.PATH) as f:
+            return json.load(f)
+
+    def _write(self, obj: dict):
+        tmp_path = f"{self.PATH}.tmp"
+        with open(tmp_path, "w") as f:
+            json.dump(obj, f)
+        os.replace(tmp_path, self.PATH)
+
+    @tasks.loop(hours=REFRESH_INTERVAL)
+    async def refresh(self):
+        try:
+            await self.fetch_scam_cache()
+        except Exception as e:
+            # keep matching against the lists we already have
+            logger.error(f"Failed to refresh the scam URL list: {e}")
+
 scam_cache = ScamCache()
+
+
+class InviteCache:
+    """Resolves invite codes for the invite filter without asking Discord about the same code over and over.
+
+    Resolved invites are kept for `POSITIVE_TTL` seconds, and codes Discord doesn't know about
+    (NotFound) for `NEGATIVE_TTL` seconds. Concurrent lookups of a code that is already being
+    resolved wait for that request instead of sending their own.
+    """
+
+    POSITIVE_TTL = 600
+    NEGATIVE_TTL = 300
+
+    def __init__(self):
+        self._resolved = LRUCache(max_size=5000, ttl=self.POSITIVE_TTL)
+        self._not_found = LRUCache(max_size=5000, ttl=self.NEGATIVE_TTL)
+        self._inflight: Dict[str, asyncio.Task] = {}
+
+        self.hits = 0
+        self.negative_hits = 0
+        self.coalesced = 0
+        self.misses = 0
+
+    @property
+    def calls_saved(self) -> int:
+        return self.hits + self.negative_hits + self.coalesced
+
+    @staticmethod
+    def code_of(invite: str) -> str:
+        """The invite code of a discord.gg or discord.com/invite link (or of a bare code)."""
+
+        return invite.rstrip("/").rsplit("/", 1)[-1]
+
+    async def fetch(self, bot: discord.Client, invite: str):
+        """Resolve an invite like `bot.fetch_invite` would, from the cache where possible.
+
+        Raises
+        ------
+        discord.NotFound
+            The invite is invalid or expired, possibly as remembered from an earlier lookup
+        """
+
+        code = self.code_of(invite)
+
+        resolved = self._resolved.get(code)
+        if resolved is not None:
+            self.hits += 1
+            return resolved
+
+        not_found = self._not_found.get(code)
+        if not_found is not None:
+            self.negative_hits += 1
+            # a new exception each time, re-raising a cached one would keep growing its traceback
+            raise discord.NotFound(*not_found)
+
+        task = self._inflight.get(code)
+        if task is not None:
+            self.coalesced += 1
+            return await asyncio.shield(task)
+
+        self.misses += 1
+        task = asyncio.get_running_loop().create_task(self._fetch(bot, code))
+        self._inflight[code] = task
+        return await asyncio.shield(task)
+
+    async def _fetch(self, bot: discord.Client, code: str):
+        try:
+            resolved = await bot.fetch_invite(code)
+        except discord.NotFound as e:
+            # only what's needed to raise an equivalent NotFound, not the exception and its frames
+            self._not_found.set(code, (e.response, {"code": e.code, "message": e.text}))
+            raise
+        finally:
+            self._inflight.pop(code, None)
+
+        self._resolved.set(code, resolved)
+        return resolved
+
+invite_cache = InviteCache()
@@ -7,6 +7,25 @@ class Features:
     disable_member_join_logging: bool
     disable_role_add_logging_for_recent_joiners: bool
 
+class AntiRaid:
+    # more than this many members joining within `join_spam_per` seconds is a join raid
+    join_spam_rate: int = 10
+    join_spam_per: float = 15
+    # more than this many messages from one member within `message_spam_per` seconds is message spam
+    message_spam_rate: int = 7
+    message_spam_per: float = 6.0
+    # more than this many accounts created on the same date joining within `join_overtime_per` seconds
+    join_overtime_rate: int = 4
+    join_overtime_per: float = 2700
+    # more than this many antiraid triggers within `raid_detection_per` seconds locks the server down
+    raid_detection_rate: int = 4
+    raid_detection_per: float = 15.0
+    # messages from more than this many different accounts within `similar_message_per` seconds
+    # that are at least `similar_message_threshold` similar (0 to 1) are a raid trigger
+    similar_message_rate: int = 3
+    similar_message_per: float = 60.0
+    similar_message_threshold: float = 0.7
+
 class Roles:
     administrator: int 
     moderator: int
@@ -99,6 +118,11 @@ class Config:
             logger.warning("Markov is DISABLED! `/memegen text` features will not be enabled.")
 
         self.dev = os.environ.get("DEV") is not None
+
+        # where the bot keeps the caches it writes at runtime (ban list, indexes, fetcher payloads).
+        # they are rebuilt if missing, but keeping them avoids a cold start after a restart
+        self.state_directory = os.environ.get("STATE_DIRECTORY", "state")
+        os.makedirs(self.state_directory, exist_ok=True)
         
         self.spotify_id = os.environ.get("SPOTIFY_ID")
         self.spotify_secret = os.environ.get("SPOTIFY_SECRET")
@@ -110,6 +134,7 @@ class Config:
         self.roles = Roles()
         self.channels = Channels()
         self.features = Features()
+        self.antiraid = AntiRaid()
 
         # read config.json to populate roles and channels
         import json
@@ -121,6 +146,9 @@ class Config:
                 setattr(self.channels, k, v)
             for k, v in data['features'].items():
                 setattr(self.features, k, v)
+            # optional, the defaults in AntiRaid are used for anything not set
+            for k, v in data.get('antiraid', {}).items():
+                setattr(self.antiraid, k, v)
 
         logger.info(
             f"GIR will be running in: {self.guild_id} in \033[1m{'DEVELOPMENT' if self.dev else 'PRODUCTION'}\033[0m mode")
@@ -0,0 +1,99 @@
+"""
+The PNG images of the Unicode emojis used by /jumbo. This module only uses the standard library,
+so scrape_emojis.py can load it without the bot's config or database.
+"""
+
+import base64
+import json
+import mmap
+import os
+from typing import Dict, Optional
+
+BLOB_PATH = "emojis.bin"
+INDEX_PATH = "emojis.index.json"
+# what scrape_emojis.py used to generate, converted to the store the first time it's opened
+LEGACY_JSON_PATH = "emojis.json"
+
+
+class EmojiStore:
+    """The emoji images, stored one after another in a single blob file, with an index of
+    where each image starts and how long it is. The blob is memory-mapped, so images are only
+    read from disk when they are looked up, and are returned exactly as stored.
+
+    Parameters
+    ----------
+    blob_path : str
+        Path of the file holding the images
+    index_path : str
+        Path of the JSON index, mapping each emoji to the offset and length of its image
+    """
+
+    def __init__(self, blob_path: str = BLOB_PATH, index_path: str = INDEX_PATH):
+        with open(index_path) as f:
+            self._index: Dict[str, list] = json.load(f)
+
+        self._mmap: Optional[mmap.mmap] = None
+        with open(blob_path, "rb") as f:
+            # an empty file can't be mapped
+            if os.fstat(f.fileno()).st_size:
+                self._mmap = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+
+    @classmethod
+    def open(cls, blob_path: str = BLOB_PATH, index_path: str = INDEX_PATH, legacy_json_path: str = LEGACY_JSON_PATH) -> "EmojiStore":
+        """Open the store, converting the old emojis.json to it first if that's all there is."""
+
+        if not os.path.exists(index_path) and os.path.exists(legacy_json_path):
+            with open(legacy_json_path) as f:
+                emojis = json.load(f)
+            write_emoji_store({emoji: base64.b64decode(image) for emoji, image in emojis.items()}, blob_path, index_path)
+
+        return cls(blob_path, index_path)
+
+    def __len__(self):
+        return len(self._index)
+
+    def __contains__(self, emoji: str):
+        return emoji in self._index
+
+    def get(self, emoji: str) -> Optional[bytes]:
+        """The PNG image of `emoji`, or None if the store doesn't have it."""
+
+        entry = self._index.get(emoji)
+        if entry is None or self._mmap is None:
+            return None
+
+        offset, length = entry
+        return self._mmap[offset:offset + length]
+
+    def close(self) -> None:
+        if self._mmap is not None:
+            self._mmap.close()
+            self._mmap = None
+
+
+def write_emoji_store(emojis: Dict[str, bytes], blob_path: str = BLOB_PATH, index_path: str = INDEX_PATH) -> None:
+    """Write the images of `emojis` to a new store, replacing the old files.
+
+    Parameters
+    ----------
+    emojis : Dict[str, bytes]
+        The emojis, mapped to their PNG images
+    blob_path : str
+        Path of the file holding the images
+    index_path : str
+        Path of the JSON index
+    """
+
+    index = {}
+    offset = 0
+    with open(f"{blob_path}.tmp", "wb") as f:
+        for emoji, image in emojis.items():
+            f.write(image)
+            index[emoji] = [offset, len(image)]
+            offset += len(image)
+
+    with open(f"{index_path}.tmp", "w") as f:
+        json.dump(index, f)
+
+    os.replace(f"{blob_path}.tmp", blob_path)
+    os.replace(f"{index_path}.tmp", index_path)
@@ -0,0 +1,185 @@
+import asyncio
+import functools
+import json
+import os
+import time
+from typing import Any, Awaitable, Callable, Dict, Hashable
+
+from .config import cfg
+from .logging import logger
+
+# where the last good payload of persisted fetchers is kept for cold starts
+CACHE_DIRECTORY = os.path.join(cfg.state_directory, "fetcher_cache")
+
+
+class _Entry:
+    __slots__ = ("value", "fetched_at")
+
+    def __init__(self, value: Any, fetched_at: float):
+        self.value = value
+        self.fetched_at = fetched_at
+
+
+class FetchCache:
+    """Caches the results of a fetcher, per set of arguments, and serves stale results
+    while they are refreshed in the background.
+
+    - A result younger than `ttl` seconds is returned as is.
+    - An older result is still returned right away, and a refresh is started in the background.
+    - Without a result, the caller waits for the fetch. Concurrent callers share a single request.
+    - None (a failed fetch) is never cached, so the last good result keeps being served.
+
+    With `persist`, the last good result of a fetcher without arguments is also saved to
+    CACHE_DIRECTORY and served (as stale) after a restart until the first refresh finishes.
+
+    Parameters
+    ----------
+    func : Callable[..., Awaitable[Any]]
+        The fetcher
+    ttl : float
+        How long a result is fresh, in seconds
+    persist : bool
+        Whether to save the last good result to disk
+    """
+
+    def __init__(self, func: Callable[..., Awaitable[Any]], ttl: float, persist: bool = False):
+        self.func = func
+        self.ttl = ttl
+        self.persist = persist
+        self.name = func.__name__
+
+        self._entries: Dict[Hashable, _Entry] = {}
+        self._inflight: Dict[Hashable, asyncio.Task] = {}
+        self._loaded_from_disk = False
+
+        self.hits = 0
+        self.stale_hits = 0
+        self.misses = 0
+
+    @property
+    def path(self) -> str:
+        return os.path.join(CACHE_DIRECTORY, f"{self.name}.json")
+
+    def ages(self) -> Dict[Hashable, float]:
+        """How old the cached result for each set of arguments is, in seconds."""
+
+        now = time.time()
+        return {key: now - entry.fetched_at for key, entry in self._entries.items()}
+
+    async def get(self, *args, **kwargs) -> Any:
+        key = self._key(args, kwargs)
+        if self.persist and not self._loaded_from_disk and not args and not kwargs:
+            await self._load()
+
+        entry = self._entries.get(key)
+        if entry is not None:
+            if time.time() - entry.fetched_at < self.ttl:
+                self.hits += 1
+            else:
+                self.stale_hits += 1
+                self._refresh(key, args, kwargs)
+            return entry.value
+
+        self.misses += 1
+        return await asyncio.shield(self._refresh(key, args, kwargs))
+
+    async def refresh(self, *args, **kwargs) -> Any:
+        """Fetch a new result now instead of serving the cached one, sharing the request
+        with a refresh that is already running.
+        """
+
+        return await asyncio.shield(self._refresh(self._key(args, kwargs), args, kwargs))
+
+    def invalidate(self) -> None:
+        self._entries.clear()
+
+    @staticmethod
+    def _key(args: tuple, kwargs: dict) -> Hashable:
+        return (args, tuple(sorted(kwargs.items())))
+
+    def _refresh(self, key: Hashable, args: tuple, kwargs: dict) -> asyncio.Task:
+        task = self._inflight.get(key)
+        if task is None:
+            task = asyncio.get_running_loop().create_task(self._fetch(key, args, kwargs))
+            self._inflight[key] = task
+        return task
+
+    async def _fetch(self, key: Hashable, args: tuple, kwargs: dict) -> Any:
+        try:
+            value = await self.func(*args, **kwargs)
+        except Exception as e:
+            # callers waiting for a first result see the error, stale results keep being served
+            if key in self._entries:
+                logger.error(f"Failed to refresh {self.name}: {e}")
+                return self._entries[key].value
+            raise
+        finally:
+            self._inflight.pop(key, None)
+
+        if value is None:
+            entry = self._entries.get(key)
+            return None if entry is None else entry.value
+
+        fetched_at = time.time()
+        self._entries[key] = _Entry(value, fetched_at)
+        if self.persist and not args and not kwargs:
+            try:
+                await asyncio.to_thread(self._write, value, fetched_at)
+            except Exception as e:
+                logger.error(f"Failed to save {self.name}: {e}")
+        return value
+
+    async def _load(self) -> None:
+        self._loaded_from_disk = True
+        try:
+            saved = await asyncio.to_thread(self._read)
+        except FileNotFoundError:
+            return
+        except Exception as e:
+            logger.error(f"Could not load the saved {self.name}: {e}")
+            return
+
+        key = ((), ())
+        if key not in self._entries:
+            self._entries[key] = _Entry(saved["value"], saved["fetched_at"])
+
+    def _read(self) -> dict:
+        with open(self.path) as f:
+            return json.load(f)
+
+    def _write(self, value: Any, fetched_at: float) -> None:
+        os.makedirs(CACHE_DIRECTORY, exist_ok=True)
+        tmp_path = f"{self.path}.tmp"
+        with open(tmp_path, "w") as f:
+            json.dump({"fetched_at": fetched_at, "value": value}, f)
+        os.replace(tmp_path, self.path)
+
+
+# every fetcher wrapped with stale_while_revalidate, by name
+fetch_caches: Dict[str, FetchCache] = {}
+
+
+def stale_while_revalidate(ttl: float, persist: bool = False):
+    """Cache the results of an async fetcher with a FetchCache. The cache is available
+    as the `cache` attribute of the wrapped function.
+
+    Parameters
+    ----------
+    ttl : float
+        How long a result is fresh, in seconds
+    persist : bool
+        Whether to save the last good result to disk, for fetchers without arguments
+    """
+
+    def decorator(func):
+        cache = FetchCache(func, ttl, persist)
+        fetch_caches[cache.name] = cache
+
+        @functools.wraps(func)
+        async def wrapper(*args, **kwargs):
+            return await cache.get(*args, **kwargs)
+
+        wrapper.cache = cache
+        return wrapper
+
+    return decorator
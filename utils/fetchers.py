@@ -1,13 +1,11 @@
 import json
 import urllib
 
-import aiohttp
-from aiocache import cached
+from .fetch_cache import stale_while_revalidate
+from .http import http_client
 
-client_session = None
 
-
-@cached(ttl=3600)
+@stale_while_revalidate(ttl=3600, persist=True)
 async def get_ios_cfw():
     """Gets all apps on ios.cfw.guide
 
@@ -17,14 +15,12 @@ async def get_ios_cfw():
         "ios, jailbreaks, devices"
     """
 
-    async with client_session.get("https://api.appledb.dev/main.json") as resp:
+    async with http_client.get("https://api.appledb.dev/main.json") as resp:
         if resp.status == 200:
-            data = await resp.json()
+            return await resp.json()
 
-    return data
 
-
-@cached(ttl=3600)
+@stale_while_revalidate(ttl=3600)
 async def get_ipsw_firmware_info(version: str):
     """Gets all apps on ios.cfw.guide
 
@@ -34,7 +30,7 @@ async def get_ipsw_firmware_info(version: str):
         "ios, jailbreaks, devices"
     """
 
-    async with client_session.get(f"https://api.ipsw.me/v4/ipsw/{version}") as resp:
+    async with http_client.get(f"https://api.ipsw.me/v4/ipsw/{version}") as resp:
         if resp.status == 200:
             data = await resp.json()
             return data
@@ -42,17 +38,17 @@ async def get_ipsw_firmware_info(version: str):
         return []
 
 
-@cached(ttl=600)
+@stale_while_revalidate(ttl=600, persist=True)
 async def get_dstatus_components():
-    async with client_session.get("https://discordstatus.com/api/v2/components.json") as resp:
+    async with http_client.get("https://discordstatus.com/api/v2/components.json") as resp:
         if resp.status == 200:
             components = await resp.json()
             return components
 
 
-@cached(ttl=600)
+@stale_while_revalidate(ttl=600, persist=True)
 async def get_dstatus_incidents():
-    async with client_session.get("https://discordstatus.com/api/v2/incidents.json") as resp:
+    async with http_client.get("https://discordstatus.com/api/v2/incidents.json") as resp:
         if resp.status == 200:
             incidents = await resp.json()
             return incidents
@@ -73,7 +69,7 @@ async def canister_search_package(query):
 
     """
     ignored_repos = ["zodttd", "modmyi"]
-    async with client_session.get(f'https://api.canister.me/v2/jailbreak/package/search?q={urllib.parse.quote(query)}') as resp:
+    async with http_client.get(f'https://api.canister.me/v2/jailbreak/package/search?q={urllib.parse.quote(query)}') as resp:
         if resp.status == 200:
             response = json.loads(await resp.text())
             packages = response.get('data')
@@ -98,7 +94,7 @@ async def canister_search_repo(query):
 
     """
 
-    async with client_session.get(f'https://api.canister.me/v2/jailbreak/repository/search?q={urllib.parse.quote(query)}') as resp:
+    async with http_client.get(f'https://api.canister.me/v2/jailbreak/repository/search?q={urllib.parse.quote(query)}') as resp:
         if resp.status == 200:
             response = json.loads(await resp.text())
             return response.get('data')
@@ -106,9 +102,9 @@ async def canister_search_repo(query):
             return None
 
 
-@cached(ttl=3600)
+@stale_while_revalidate(ttl=3600, persist=True)
 async def canister_fetch_repos():
-    async with client_session.get('https://api.canister.me/v2/jailbreak/repository/ranking?rank=*') as resp:
+    async with http_client.get('https://api.canister.me/v2/jailbreak/repository/ranking?rank=*') as resp:
         if resp.status == 200:
             response = await resp.json(content_type=None)
             return response.get("data")
@@ -116,14 +112,24 @@ async def canister_fetch_repos():
         return None
 
 
-@cached(ttl=3600)
+async def fetch_cij_or_news_database():
+    """Gets the keyword lists of the CIJ / ETA filter
+
+    Returns
+    -------
+    dict
+        "intent_cij, intent_news, verb, subject", or None if the request failed
+    """
+
+    async with http_client.get("https://raw.githubusercontent.com/DiscordGIR/CIJOrNewsFilter/main/database.json") as resp:
+        if resp.status == 200:
+            return json.loads(await resp.text())
+
+
+@stale_while_revalidate(ttl=3600)
 async def fetch_scam_urls():
-    async with client_session.get("https://raw.githubusercontent.com/SlimShadyIAm/Anti-Scam-Json-List/main/antiscam.json") as resp:
+    async with http_client.get("https://raw.githubusercontent.com/SlimShadyIAm/Anti-Scam-Json-List/main/antiscam.json") as resp:
         if resp.status == 200:
             obj = json.loads(await resp.text())
             return obj
 
-
-async def init_client_session():
-    global client_session
-    client_session = aiohttp.ClientSession()
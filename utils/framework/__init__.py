@@ -1,6 +1,11 @@
+from .batching import *
 from .birthday import *
 from .checks import *
 from .cooldown import *
+from .normalize import *
 from .filter import *
 from .permissions import *
-from .transformers import *
\ No newline at end of file
+from .pipeline import *
+from .similarity import *
+from .transformers import *
+from .urls import *
\ No newline at end of file
@@ -0,0 +1,228 @@
+"""
+A multi-pattern substring matcher (Aho-Corasick automaton) and the compiled
+form of the filter word list that is built on top of it.
+"""
+
+from collections import deque
+from typing import Dict, Iterable, Iterator, List, Sequence, Set
+
+
+class AhoCorasick:
+    """Finds which of a fixed set of patterns occur in a text, in a single pass over the text.
+
+    Parameters
+    ----------
+    patterns : Sequence[str]
+        The patterns to search for. The ID of a pattern is its index in this sequence.
+    """
+
+    def __init__(self, patterns: Sequence[str]):
+        self.patterns = list(patterns)
+
+        # state 0 is the root; goto[state] maps a character to the next state
+        self._goto: List[Dict[str, int]] = [{}]
+        # IDs of the patterns that end exactly at this state
+        self._own: List[List[int]] = [[]]
+        # empty patterns occur in every text
+        self._always: List[int] = []
+
+        for pattern_id, pattern in enumerate(self.patterns):
+            if not pattern:
+                self._always.append(pattern_id)
+                continue
+
+            state = 0
+            for char in pattern:
+                nxt = self._goto[state].get(char)
+                if nxt is None:
+                    nxt = len(self._goto)
+                    self._goto[state][char] = nxt
+                    self._goto.append({})
+                    self._own.append([])
+                state = nxt
+            self._own[state].append(pattern_id)
+
+        self._fail = [0] * len(self._goto)
+        # nearest state along the failure chain that completes a pattern (0 if none)
+        self._out = [0] * len(self._goto)
+
+        queue = deque(self._goto[0].values())
+        while queue:
+            state = queue.popleft()
+            for char, nxt in self._goto[state].items():
+                queue.append(nxt)
+
+                fail = self._fail[state]
+                while fail and char not in self._goto[fail]:
+                    fail = self._fail[fail]
+                fail = self._goto[fail].get(char, 0)
+                if fail == nxt:
+                    fail = 0
+
+                self._fail[nxt] = fail
+                self._out[nxt] = fail if self._own[fail] else self._out[fail]
+
+    def __len__(self):
+        return len(self.patterns)
+
+    def find(self, text: str) -> Set[int]:
+        """Return the IDs of all patterns that occur somewhere in `text`."""
+
+        found = set(self._always)
+        goto, fail, own, out = self._goto, self._fail, self._own, self._out
+        # states whose output chain was already collected
+        seen = set()
+
+        state = 0
+        for char in text:
+            while state and char not in goto[state]:
+                state = fail[state]
+            state = goto[state].get(char, 0)
+
+            hit = state if own[state] else out[state]
+            while hit and hit not in seen:
+                seen.add(hit)
+                found.update(own[hit])
+                hit = out[hit]
+
+        return found
+
+
+class CompiledFilter:
+    """The filter word list compiled into one automaton.
+
+    For every word it knows the lowercased form and the lowercased form without
+    whitespace, which is what `find_triggered_filters` and `find_triggered_raid_phrases`
+    look for in the normalized variants of a message.
+
+    Parameters
+    ----------
+    words : Sequence
+        FilterWord-like objects with a `word` and `false_positive` attribute
+    """
+
+    def __init__(self, words: Sequence):
+        self.words = list(words)
+
+        pattern_ids: Dict[str, int] = {}
+        self._word_pattern: List[int] = []
+        self._word_pattern_no_spaces: List[int] = []
+        # pattern ID -> indices of the words using it, as lowercased word / without spaces
+        self._by_word: List[List[int]] = []
+        self._by_word_no_spaces: List[List[int]] = []
+
+        def pattern_id(pattern: str) -> int:
+            _id = pattern_ids.get(pattern)
+            if _id is None:
+                _id = pattern_ids[pattern] = len(pattern_ids)
+                self._by_word.append([])
+                self._by_word_no_spaces.append([])
+            return _id
+
+        for i, word in enumerate(self.words):
+            lowered = word.word.lower()
+            word_id = pattern_id(lowered)
+            no_spaces_id = pattern_id("".join(lowered.split()))
+
+            self._word_pattern.append(word_id)
+            self._word_pattern_no_spaces.append(no_spaces_id)
+            self._by_word[word_id].append(i)
+            self._by_word_no_spaces[no_spaces_id].append(i)
+
+        self.automaton = AhoCorasick(list(pattern_ids))
+
+    def triggered(self, text: str, without_spaces: str, without_spaces_and_punctuation: str, match_word_without_spaces: bool = True) -> Iterator:
+        """Yield, in list order, every word that occurs in the message.
+
+        A word triggers if it occurs in `text`, or, unless it is marked as a false positive,
+        in `without_spaces` or `without_spaces_and_punctuation`. If `match_word_without_spaces`
+        is set, the word with its own whitespace removed is also looked for in
+        `without_spaces_and_punctuation`.
+        """
+
+        in_text = self.automaton.find(text)
+        in_without_spaces = self.automaton.find(without_spaces)
+        in_stripped = self.automaton.find(without_spaces_and_punctuation)
+
+        candidates: Set[int] = set()
+        for pattern in in_text | in_without_spaces | in_stripped:
+            candidates.update(self._by_word[pattern])
+        if match_word_without_spaces:
+            for pattern in in_stripped:
+                candidates.update(self._by_word_no_spaces[pattern])
+
+        for i in sorted(candidates):
+            word = self.words[i]
+            pattern = self._word_pattern[i]
+            if pattern in in_text:
+                yield word
+            elif word.false_positive:
+                continue
+            elif pattern in in_without_spaces or pattern in in_stripped:
+                yield word
+            elif match_word_without_spaces and self._word_pattern_no_spaces[i] in in_stripped:
+                yield word
+
+
+class CompiledFilterCache:
+    """Keeps the CompiledFilter for a word list, recompiling only when the list changes.
+
+    The guild snapshot hands out a new tuple every time it is reloaded, so a new
+    object is first compared by content before paying for a rebuild.
+    """
+
+    def __init__(self):
+        self._words = None
+        self._signature = None
+        self._compiled = None
+
+    def get(self, words: Sequence) -> CompiledFilter:
+        if words is self._words:
+            return self._compiled
+
+        signature = tuple((word.word, word.false_positive) for word in words)
+        if signature != self._signature or self._compiled is None:
+            self._compiled = CompiledFilter(words)
+            self._signature = signature
+        else:
+            # same words and flags, but the other attributes may still have changed
+            self._compiled.words = list(words)
+
+        self._words = words
+        return self._compiled
+
+
+class KeywordGroups:
+    """Several named keyword lists compiled into one automaton, so a single pass over a
+    text tells which of the lists have at least one keyword in it.
+
+    Parameters
+    ----------
+    groups : Dict[str, Iterable[str]]
+        Group name -> keywords. Keywords are matched as plain substrings, so they should
+        already be in the same case as the texts they are matched against.
+    """
+
+    def __init__(self, groups: Dict[str, Iterable[str]]):
+        self.groups = {name: list(keywords) for name, keywords in groups.items()}
+
+        patterns: Dict[str, int] = {}
+        # pattern ID -> names of the groups that contain it
+        self._pattern_groups: List[Set[str]] = []
+        for name, keywords in self.groups.items():
+            for keyword in keywords:
+                _id = patterns.get(keyword)
+                if _id is None:
+                    _id = patterns[keyword] = len(patterns)
+                    self._pattern_groups.append(set())
+                self._pattern_groups[_id].add(name)
+
+        self.automaton = AhoCorasick(list(patterns))
+
+    def groups_in(self, text: str) -> Set[str]:
+        """Return the names of the groups with a keyword that occurs in `text`."""
+
+        found: Set[str] = set()
+        for pattern in self.automaton.find(text):
+            found |= self._pattern_groups[pattern]
+        return found
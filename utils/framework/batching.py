@@ -0,0 +1,101 @@
+"""
+A queue that hands items to a coroutine in batches, once enough items are
+waiting or the oldest one has waited long enough.
+"""
+
+import asyncio
+import time
+import traceback
+from typing import Awaitable, Callable, Generic, List, Optional, TypeVar
+
+T = TypeVar("T")
+
+
+class BatchQueue(Generic[T]):
+    """Collects items and processes them in batches in a background task.
+
+    A batch is started by the first item put into an empty queue, and is handed to `process`
+    once it holds `max_size` items or `max_delay` seconds have passed, whichever comes first.
+    Batches are processed one at a time, in order.
+
+    Parameters
+    ----------
+    process : Callable[[List[T]], Awaitable[None]]
+        Coroutine that handles one batch
+    max_size : int
+        The most items in one batch
+    max_delay : float
+        How long to wait for more items after the first one of a batch, in seconds
+    on_error : Callable[[Exception], None], optional
+        Called when `process` raises, defaults to printing the traceback
+    """
+
+    def __init__(self, process: Callable[[List[T]], Awaitable[None]], max_size: int = 100, max_delay: float = 1.0, on_error: Optional[Callable[[Exception], None]] = None):
+        self.process = process
+        self.max_size = max_size
+        self.max_delay = max_delay
+        self.on_error = on_error
+
+        self._queue: Optional[asyncio.Queue] = None
+        self._worker: Optional[asyncio.Task] = None
+
+        self.batches = 0
+        self.items = 0
+        self.last_batch_size = 0
+        self.last_batch_latency = 0.0
+
+    def __len__(self):
+        return 0 if self._queue is None else self._queue.qsize()
+
+    def put(self, item: T) -> None:
+        """Queue an item without waiting for it to be processed."""
+
+        if self._queue is None:
+            self._queue = asyncio.Queue()
+        if self._worker is None or self._worker.done():
+            self._worker = asyncio.get_running_loop().create_task(self._run())
+        self._queue.put_nowait(item)
+
+    async def drain(self) -> None:
+        """Wait until every item queued so far has been processed."""
+
+        if self._queue is not None:
+            await self._queue.join()
+
+    async def close(self) -> None:
+        """Process what is left in the queue, then stop the background task."""
+
+        await self.drain()
+        if self._worker is not None:
+            self._worker.cancel()
+            self._worker = None
+
+    async def _run(self) -> None:
+        loop = asyncio.get_running_loop()
+        while True:
+            batch = [await self._queue.get()]
+            deadline = loop.time() + self.max_delay
+            while len(batch) < self.max_size:
+                timeout = deadline - loop.time()
+                if timeout <= 0:
+                    break
+                try:
+                    batch.append(await asyncio.wait_for(self._queue.get(), timeout))
+                except asyncio.TimeoutError:
+                    break
+
+            start = time.perf_counter()
+            try:
+                await self.process(batch)
+            except Exception as e:
+                if self.on_error is not None:
+                    self.on_error(e)
+                else:
+                    traceback.print_exc()
+            finally:
+                self.batches += 1
+                self.items += len(batch)
+                self.last_batch_size = len(batch)
+                self.last_batch_latency = time.perf_counter() - start
+                for _ in batch:
+                    self._queue.task_done()
@@ -1,3 +1,6 @@
+from collections import deque
+from typing import Any, Deque, Dict, Hashable, List, Tuple
+
 from discord.ext import commands
 
 """
@@ -14,3 +17,110 @@ class MessageTextBucket(commands.BucketType):
         
     def __call__(self, msg):
         return self.get_key(msg)   
+
+
+class SlidingWindow:
+    """Counts events per key over the last `per` seconds, and reports when more than `rate`
+    of them fall inside the window. Unlike a cooldown bucket the window slides with every
+    event, and it remembers what each event was about, so a detector can act on everyone
+    that was part of the burst.
+
+    Each key has a deque of (timestamp, item) pairs in arrival order. Expired events are
+    popped from the front as new ones are appended, so every update is O(1) amortized.
+
+    Parameters
+    ----------
+    rate : int
+        How many events are allowed inside the window
+    per : float
+        The length of the window in seconds
+    max_events : int
+        The most events kept per key, to bound memory during a flood
+    """
+
+    def __init__(self, rate: int, per: float, max_events: int = 1000):
+        self.rate = rate
+        self.per = per
+        self.max_events = max_events
+        # key -> events inside the window
+        self._events: Dict[Hashable, Deque[Tuple[float, Any]]] = {}
+        # key -> how many events of each item ID are inside the window, for unique windows
+        self._ids: Dict[Hashable, Dict[Hashable, int]] = {}
+        self._last_sweep = 0.0
+
+    def __len__(self):
+        return len(self._events)
+
+    def hit(self, key: Hashable, current: float, item: Any = None, unique: bool = False) -> bool:
+        """Record an event for `key` at time `current`.
+
+        Parameters
+        ----------
+        key : Hashable
+            What the events are counted for, for example a guild, member or account creation date
+        current : float
+            The timestamp of the event
+        item : Any, optional
+            What the event was about (for example the member that joined), see `items`
+        unique : bool
+            If set, an item that is already inside the window isn't counted again. Items must have an `id`
+
+        Returns
+        -------
+        bool
+            True if there are now more than `rate` events in the window
+        """
+
+        self._sweep(current)
+
+        events = self._events.get(key)
+        if events is None:
+            events = self._events[key] = deque()
+            self._ids[key] = {}
+        ids = self._ids[key]
+        self._expire(events, ids, current)
+
+        if unique and item is not None and item.id in ids:
+            return False
+
+        if len(events) >= self.max_events:
+            self._forget(events.popleft()[1], ids)
+        events.append((current, item))
+        if item is not None:
+            ids[item.id] = ids.get(item.id, 0) + 1
+
+        return len(events) > self.rate
+
+    def items(self, key: Hashable) -> List[Any]:
+        """The items of the events currently in the window of `key`, oldest first."""
+
+        return [item for _, item in self._events.get(key, ()) if item is not None]
+
+    def _expire(self, events: Deque[Tuple[float, Any]], ids: Dict[Hashable, int], current: float) -> None:
+        cutoff = current - self.per
+        while events and events[0][0] <= cutoff:
+            self._forget(events.popleft()[1], ids)
+
+    @staticmethod
+    def _forget(item: Any, ids: Dict[Hashable, int]) -> None:
+        if item is None:
+            return
+
+        count = ids.get(item.id, 0) - 1
+        if count > 0:
+            ids[item.id] = count
+        else:
+            ids.pop(item.id, None)
+
+    def _sweep(self, current: float) -> None:
+        # drop the windows of keys that have been quiet for a whole window, at most once per window
+        if current - self._last_sweep < self.per:
+            return
+
+        self._last_sweep = current
+        for key in list(self._events):
+            events = self._events[key]
+            self._expire(events, self._ids[key], current)
+            if not events:
+                del self._events[key]
+                del self._ids[key]
@@ -1,52 +1,42 @@
-import string
-from typing import List
+from typing import List, Union
 
 import discord
 from data.model import FilterWord
 from data.services import guild_service
-from fold_to_ascii import fold
 from utils.framework import gatekeeper
+from utils.framework.aho_corasick import CompiledFilterCache
+from utils.framework.normalize import NormalizedText, normalize
 
+_filter_words = CompiledFilterCache()
+_raid_phrases = CompiledFilterCache()
 
-async def find_triggered_filters(input, member: discord.Member) -> List[FilterWord]:
+
+async def find_triggered_filters(input: Union[str, NormalizedText], member: discord.Member) -> List[FilterWord]:
     """
     BAD WORD FILTER
     """
-    symbols = (u"абвгдеёжзийклмнопрстуфхцчшщъыьэюяАБВГДЕЁЖЗИЙКЛМНОПРСТУФХЦЧШЩЪЫЬЭЮЯ",
-               u"abBrdeex3nnKnmHonpcTyoxu4wwbbbeoRABBrDEEX3NNKNMHONPCTyOXU4WWbbbEOR")
-
-    tr = {ord(a): ord(b) for a, b in zip(*symbols)}
-
-    input_lowercase = fold(input.translate(tr).lower()).lower().strip(":")   
-    folded_without_spaces = "".join(input_lowercase.split())
-    folded_without_spaces_and_punctuation = folded_without_spaces.translate(
-        str.maketrans('', '', string.punctuation))
+    forms = normalize(input).filter_forms
 
-    db_guild = guild_service.get_guild()
-
-    if not input_lowercase:
+    if not forms.text:
         return []
     # reported = False
 
+    compiled = _filter_words.get(await guild_service.get_filtered_words())
+    level = gatekeeper.level(member)
+
     words_found = []
-    for word in await guild_service.get_filtered_words():
-        if gatekeeper.has(member.guild, member, word.bypass):
+    for word in compiled.triggered(forms.text, forms.without_spaces, forms.without_spaces_and_punctuation):
+        if level >= word.bypass:
             continue
 
-        filter_word_without_spaces = "".join(word.word.lower().split())
-        if (word.word.lower() in input_lowercase) or \
-            (not word.false_positive and word.word.lower() in folded_without_spaces) or \
-                (not word.false_positive and word.word.lower() in folded_without_spaces_and_punctuation or
-                    (not word.false_positive and filter_word_without_spaces in folded_without_spaces_and_punctuation)):
-
-            # remove all whitespace, punctuation in message and run filter again
-            if word.false_positive and word.word.lower() not in input_lowercase.split():
-                continue
+        # remove all whitespace, punctuation in message and run filter again
+        if word.false_positive and word.word.lower() not in forms.words:
+            continue
 
-            if word.notify:
-                return [word]
+        if word.notify:
+            return [word]
 
-            words_found.append(word)
+        words_found.append(word)
     return words_found
 
 def has_only_silent_filtered_words(triggered_filter_words: List[FilterWord]):
@@ -57,25 +47,16 @@ def has_only_silent_filtered_words(triggered_filter_words: List[FilterWord]):
     return all(filter_word.silent_filter for filter_word in triggered_filter_words)
 
 
-async def find_triggered_raid_phrases(input, member):
-    symbols = (u"абвгдеёжзийклмнопрстуфхцчшщъыьэюяАБВГДЕЁЖЗИЙКЛМНОПРСТУФХЦЧШЩЪЫЬЭЮЯ",
-               u"abBrdeex3nnKnmHonpcTyoxu4wwbbbeoRABBrDEEX3NNKNMHONPCTyOXU4WWbbbEOR")
-
-    tr = {ord(a): ord(b) for a, b in zip(*symbols)}
-
-    folded_message = fold(input.translate(tr).lower()).lower()
-    folded_without_spaces = "".join(folded_message.split())
-    folded_without_spaces_and_punctuation = folded_without_spaces.translate(
-        str.maketrans('', '', string.punctuation))
+async def find_triggered_raid_phrases(input: Union[str, NormalizedText], member):
+    forms = normalize(input).raid_forms
 
-    if folded_message:
-        for word in await guild_service.get_raid_phrases():
-            if not gatekeeper.has(member.guild, member, word.bypass):
-                if (word.word.lower() in folded_message) or \
-                    (not word.false_positive and word.word.lower() in folded_without_spaces) or \
-                        (not word.false_positive and word.word.lower() in folded_without_spaces_and_punctuation):
-                    # remove all whitespace, punctuation in message and run filter again
-                    if word.false_positive and word.word.lower() not in folded_message.split():
-                        continue
+    if forms.text:
+        compiled = _raid_phrases.get(await guild_service.get_raid_phrases())
+        level = gatekeeper.level(member)
+        for word in compiled.triggered(forms.text, forms.without_spaces, forms.without_spaces_and_punctuation, match_word_without_spaces=False):
+            if level < word.bypass:
+                # remove all whitespace, punctuation in message and run filter again
+                if word.false_positive and word.word.lower() not in forms.words:
+                    continue
 
-                    return word
+                return word
@@ -0,0 +1,87 @@
+import string
+from typing import FrozenSet, NamedTuple, Tuple, Union
+
+import discord
+from fold_to_ascii import fold
+from utils.cache import LRUCache
+
+from .urls import ParsedURL, extract_urls
+
+# Cyrillic letters that look like latin ones, mapped to the latin letter
+_CYRILLIC_TABLE = str.maketrans(
+    u"абвгдеёжзийклмнопрстуфхцчшщъыьэюяАБВГДЕЁЖЗИЙКЛМНОПРСТУФХЦЧШЩЪЫЬЭЮЯ",
+    u"abBrdeex3nnKnmHonpcTyoxu4wwbbbeoRABBrDEEX3NNKNMHONPCTyOXU4WWbbbEOR")
+_PUNCTUATION_TABLE = str.maketrans('', '', string.punctuation)
+
+# messages are usually looked at by several listeners within a few seconds of each other
+_message_cache = LRUCache(max_size=2048, ttl=60)
+
+
+class FoldedForms(NamedTuple):
+    """The forms of a folded text that the filters match against."""
+
+    text: str
+    without_spaces: str
+    without_spaces_and_punctuation: str
+    words: FrozenSet[str]
+
+    @classmethod
+    def from_text(cls, text: str) -> "FoldedForms":
+        without_spaces = "".join(text.split())
+        return cls(text, without_spaces, without_spaces.translate(_PUNCTUATION_TABLE), frozenset(text.split()))
+
+
+class NormalizedText:
+    """A piece of user text, lowercased and folded to ASCII once, in all the forms
+    the word filter, raid phrase filter and the CIJ / guild tag checks look at.
+
+    Parameters
+    ----------
+    raw : str
+        The text as the user sent it
+    """
+
+    __slots__ = ("raw", "lowered", "folded", "filter_forms", "raid_forms", "_urls")
+
+    def __init__(self, raw: str):
+        self.raw = raw
+        self.lowered = raw.lower()
+        folded = fold(raw.translate(_CYRILLIC_TABLE).lower()).lower()
+        self.folded = folded
+
+        # the raid phrase filter matches the folded text as is,
+        # the word filter first strips colons (emoji names) from both ends
+        self.raid_forms = FoldedForms.from_text(folded)
+        stripped = folded.strip(":")
+        self.filter_forms = self.raid_forms if stripped == folded else FoldedForms.from_text(stripped)
+        self._urls = None
+
+    @property
+    def urls(self) -> Tuple[ParsedURL, ...]:
+        """The URLs in the raw text, extracted the first time they are needed."""
+
+        if self._urls is None:
+            self._urls = extract_urls(self.raw)
+        return self._urls
+
+
+def normalize(content: Union[str, NormalizedText]) -> NormalizedText:
+    """Return `content` as NormalizedText, normalizing it if it is still a string."""
+
+    if isinstance(content, NormalizedText):
+        return content
+    return NormalizedText(content or "")
+
+
+def normalize_message(message: discord.Message) -> NormalizedText:
+    """Return the normalized content of a message, memoized by message ID so that every
+    listener handling the same message shares one NormalizedText. Edited messages are
+    normalized again.
+    """
+
+    normalized = _message_cache.get(message.id)
+    content = message.content or ""
+    if normalized is None or normalized.raw != content:
+        normalized = NormalizedText(content)
+        _message_cache.set(message.id, normalized)
+    return normalized
@@ -53,38 +53,10 @@ class Permissions:
             6: cfg.roles.administrator,
         }
 
-        # This dict maps a permission level to a lambda function which, when given the right paramters,
-        # will return True or False if a user has that permission level.
-        self._permissions = {
-            0: lambda x, y: True,
-
-            1: (lambda guild, m: self.has(guild, m, 2) or (guild.id == cfg.guild_id
-                and guild.get_role(cfg.roles.member_plus) in m.roles)),
-
-            2: (lambda guild, m: self.has(guild, m, 3) or (guild.id == cfg.guild_id
-                and guild.get_role(cfg.roles.member_pro) in m.roles)),
-
-            3: (lambda guild, m: self.has(guild, m, 4) or (guild.id == cfg.guild_id
-                and guild.get_role(cfg.roles.member_edition) in m.roles)),
-
-            4: (lambda guild, m: self.has(guild, m, 5) or (guild.id == cfg.guild_id
-                and guild.get_role(cfg.roles.genius) in m.roles)),
-
-            5: (lambda guild, m: self.has(guild, m, 6) or (guild.id == cfg.guild_id
-                and guild.get_role(cfg.roles.moderator) in m.roles)),
-
-            6: (lambda guild, m: self.has(guild, m, 7) or (guild.id == cfg.guild_id
-                and guild.get_role(cfg.roles.administrator) in m.roles)),
-
-            7: (lambda guild, m: self.has(guild, m, 9) or (guild.id == cfg.guild_id
-                and m == guild.owner)),
-
-            9: (lambda guild, m: guild.id == cfg.guild_id
-                and m.id == cfg.owner_id),
-
-            10: (lambda guild, m: guild.id == cfg.guild_id
-                 and m.id == cfg.owner_id),
-        }
+        # role ID -> the permission level it grants
+        self._role_levels = {role: level for level, role in self._permission_mapping.items()}
+        # member ID -> (role IDs the level was computed from, level)
+        self._level_cache = {}
 
         self._permission_names = {
             0: "Everyone and up",
@@ -107,9 +79,60 @@ class Permissions:
     def highest_level(self) -> int:
         return list(sorted(self._permission_names.keys()))[-1]
 
+    def level(self, member: discord.Member, guild: discord.Guild = None) -> int:
+        """Calculates the highest permission level a member has, in a single pass over their roles.
+        The result is memoized per member and role set, so repeated checks for the same message
+        are a dictionary lookup.
+
+        Parameters
+        ----------
+        member : discord.Member
+            The member whose permission level we're calculating
+        guild : discord.Guild, optional
+            The guild to check, defaults to the member's guild
+
+        Returns
+        -------
+        int
+            The member's permission level
+        """
+
+        if guild is None:
+            guild = getattr(member, "guild", None)
+        if guild is None or guild.id != cfg.guild_id:
+            return 0
+
+        # the raw role ID list, which avoids building and sorting Role objects like `member.roles` does
+        roles = tuple(getattr(member, "_roles", ()))
+        cached = self._level_cache.get(member.id)
+        if cached is not None and cached[0] == roles:
+            return cached[1]
+
+        if member.id == cfg.owner_id:
+            level = 10
+        elif member.id == guild.owner_id:
+            level = 7
+        else:
+            level = max((self._role_levels[role] for role in roles if role in self._role_levels), default=0)
+
+        if len(self._level_cache) >= 50000:
+            self._level_cache.clear()
+        self._level_cache[member.id] = (roles, level)
+        return level
+
+    def invalidate(self, member_id: int = None) -> None:
+        """Forget memoized permission levels, either for one member or for everyone
+        (for example when the guild owner or a role changes).
+        """
+
+        if member_id is None:
+            self._level_cache.clear()
+        else:
+            self._level_cache.pop(member_id, None)
+
     def has(self, guild: discord.Guild, member: discord.Member, level: int) -> bool:
         """Checks whether a user given by `member` has at least the permission level `level`
-        in guild `guild`. Using the `self.permissions` dict-lambda thing.
+        in guild `guild`, by comparing against their memoized `level`.
 
         Parameters
         ----------
@@ -127,13 +150,16 @@ class Permissions:
             
         """
 
-        if self._permissions.get(level) is None:
+        if self._permission_names.get(level) is None:
             raise AttributeError(f"Undefined permission level {level}")
 
-        return self._permissions[level](guild, member)
+        if level == 0:
+            return True
+
+        return self.level(member, guild) >= level
 
     def calculate_permissions(self, level: int):
-        if self._permissions.get(level) is None:
+        if self._permission_names.get(level) is None:
             raise AttributeError(f"Undefined permission level {level}")
 
         return self.level_list(level)
@@ -0,0 +1,219 @@
+import asyncio
+import copy
+import time
+import traceback
+from typing import Callable, Dict, Iterable, List, Optional, Sequence
+
+import discord
+from data.services import guild_service
+from utils.config import cfg
+from utils.logging import logger
+
+from .normalize import NormalizedText, normalize_message
+from .permissions import gatekeeper
+from .urls import HostRouter, ParsedURL
+
+# passed as `guild_id` to receive messages from every guild and from DMs
+ANY_GUILD = object()
+# the default `guild_id`, resolved to cfg.guild_id when the stage is registered
+MAIN_GUILD = object()
+
+
+class MessageContext:
+    """Everything the message stages commonly need, computed once per message.
+
+    The normalized text and the URLs are only computed when a stage first asks for them.
+    Stages registered for specific hosts get a copy of the context whose `urls` only
+    holds the URLs on those hosts.
+    """
+
+    def __init__(self, message: discord.Message):
+        self.message = message
+        self.guild = message.guild
+        self.snapshot = guild_service.snapshot
+
+        if isinstance(message.author, discord.Member) or self.guild is None:
+            self.member = message.author
+        else:
+            self.member = self.guild.get_member(message.author.id)
+
+        self.level = gatekeeper.level(self.member) if isinstance(self.member, discord.Member) else 0
+        self._urls = None
+
+    @property
+    def normalized(self) -> NormalizedText:
+        return normalize_message(self.message)
+
+    @property
+    def urls(self) -> Sequence[ParsedURL]:
+        if self._urls is None:
+            return self.normalized.urls
+        return self._urls
+
+    def with_urls(self, urls: Sequence[ParsedURL]) -> "MessageContext":
+        routed = copy.copy(self)
+        routed._urls = urls
+        return routed
+
+
+class MessageStage:
+    """A cog method registered with the message pipeline, along with the conditions
+    a message must meet to be handed to it, and how long it has taken so far.
+    """
+
+    def __init__(self, name: str, callback: Callable, order: int, channels: Optional[Iterable[int]], exclude_channels: Iterable[int], guild_id, bots: bool, max_level: Optional[int], hosts: Optional[Iterable[str]]):
+        self.name = name
+        self.callback = callback
+        self.order = order
+        self.channels = None if channels is None else frozenset(channels)
+        self.exclude_channels = frozenset(exclude_channels)
+        self.guild_id = cfg.guild_id if guild_id is MAIN_GUILD else guild_id
+        self.bots = bots
+        self.max_level = max_level
+        self.hosts = None if hosts is None else tuple(hosts)
+
+        self.calls = 0
+        self.total_time = 0.0
+        self.max_time = 0.0
+
+    @property
+    def average_time(self) -> float:
+        return self.total_time / self.calls if self.calls else 0.0
+
+    def accepts(self, context: MessageContext) -> bool:
+        message = context.message
+        if self.guild_id is not ANY_GUILD and (context.guild is None or context.guild.id != self.guild_id):
+            return False
+        if message.author.bot and not self.bots:
+            return False
+        if message.channel.id in self.exclude_channels:
+            return False
+        if self.max_level is not None and context.level > self.max_level:
+            return False
+        return True
+
+
+def message_stage(channels: Optional[Iterable[int]] = None, exclude_channels: Iterable[int] = (), guild_id=MAIN_GUILD, bots: bool = False, max_level: Optional[int] = None, hosts: Optional[Iterable[str]] = None):
+    """Mark a cog method as a stage of the message pipeline. It will be called with
+    a MessageContext for every new message that meets the given conditions.
+
+    Parameters
+    ----------
+    channels : Iterable[int], optional
+        Only messages in these channels are handed to the stage, defaults to all channels
+    exclude_channels : Iterable[int]
+        Messages in these channels are never handed to the stage
+    guild_id : int, optional
+        The guild the stage listens to, defaults to the main guild. Pass ANY_GUILD to also receive DMs
+    bots : bool
+        Whether messages sent by bots and webhooks are handed to the stage
+    max_level : int, optional
+        Messages from members with a permission level above this are not handed to the stage
+    hosts : Iterable[str], optional
+        Only messages with a URL on one of these domains (or their subdomains) are handed to the stage,
+        and `context.urls` only holds those URLs. Pass ANY_HOST to receive every message with a URL
+    """
+
+    def decorator(func):
+        func.__message_stage__ = dict(channels=channels, exclude_channels=exclude_channels,
+                                      guild_id=guild_id, bots=bots, max_level=max_level, hosts=hosts)
+        return func
+
+    return decorator
+
+
+class MessagePipeline:
+    """Replaces the separate `on_message` listeners of the monitor cogs with a single dispatch.
+
+    Stages restricted to a set of channels are indexed by channel ID, so a message is only
+    matched against the stages for its channel plus the ones that listen everywhere.
+    Stages interested in links are additionally routed by the hosts of the URLs in the message.
+    Matching stages run concurrently, just like separate listeners would, and an exception
+    in one stage doesn't affect the others.
+    """
+
+    def __init__(self):
+        self._stages: List[MessageStage] = []
+        self._by_channel: Dict[int, List[MessageStage]] = {}
+        self._everywhere: List[MessageStage] = []
+        self._hosts: HostRouter[MessageStage] = HostRouter()
+        self._order = 0
+
+    @property
+    def stages(self) -> List[MessageStage]:
+        return list(self._stages)
+
+    def add_cog(self, cog) -> None:
+        """Register every method of `cog` marked with `message_stage`."""
+
+        for name in dir(type(cog)):
+            options = getattr(getattr(type(cog), name, None), "__message_stage__", None)
+            if options is None:
+                continue
+
+            self._order += 1
+            stage = MessageStage(f"{cog.qualified_name}.{name}", getattr(cog, name), self._order, **options)
+            self._stages.append(stage)
+        self._reindex()
+
+    def remove_cog(self, cog) -> None:
+        self._stages = [stage for stage in self._stages if getattr(stage.callback, "__self__", None) is not cog]
+        self._reindex()
+
+    def _reindex(self) -> None:
+        self._by_channel = {}
+        self._everywhere = []
+        self._hosts = HostRouter()
+        for stage in sorted(self._stages, key=lambda s: s.order):
+            if stage.hosts is not None:
+                self._hosts.add(stage.hosts, stage)
+
+            if stage.channels is None:
+                self._everywhere.append(stage)
+            else:
+                for channel_id in stage.channels:
+                    self._by_channel.setdefault(channel_id, []).append(stage)
+
+    async def dispatch(self, message: discord.Message) -> None:
+        candidates = self._by_channel.get(message.channel.id)
+        if candidates:
+            candidates = sorted(candidates + self._everywhere, key=lambda s: s.order)
+        else:
+            candidates = self._everywhere
+
+        if not candidates:
+            return
+
+        context = MessageContext(message)
+        stages = [stage for stage in candidates if stage.accepts(context)]
+
+        # URLs are only extracted if a stage cares about them, and stages
+        # interested in links don't run at all for messages without matching ones
+        routed = {}
+        if any(stage.hosts is not None for stage in stages):
+            routed = self._hosts.route(context.urls)
+
+        runs = []
+        for stage in stages:
+            if stage.hosts is None:
+                runs.append(self._run(stage, context))
+            elif stage in routed:
+                runs.append(self._run(stage, context.with_urls(routed[stage])))
+
+        if runs:
+            await asyncio.gather(*runs)
+
+    async def _run(self, stage: MessageStage, context: MessageContext) -> None:
+        start = time.perf_counter()
+        try:
+            await stage.callback(context)
+        except Exception:
+            logger.error(f"Message stage {stage.name} failed:\n{traceback.format_exc()}")
+        finally:
+            elapsed = time.perf_counter() - start
+            stage.calls += 1
+            stage.total_time += elapsed
+            stage.max_time = max(stage.max_time, elapsed)
+
+
+message_pipeline = MessagePipeline()
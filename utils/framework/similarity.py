@@ -0,0 +1,172 @@
+"""
+A streaming near-duplicate index: finds recent messages from other authors that are
+nearly the same as a new one.
+"""
+
+import random
+from collections import deque
+from typing import Any, Deque, Dict, Hashable, List, Tuple
+
+_HASH_MASK = (1 << 64) - 1
+
+
+class _Entry:
+    __slots__ = ("author", "timestamp", "signature", "keys", "item")
+
+    def __init__(self, author: Hashable, timestamp: float, signature: Tuple[int, ...], keys: Tuple[int, ...], item: Any):
+        self.author = author
+        self.timestamp = timestamp
+        self.signature = signature
+        self.keys = keys
+        self.item = item
+
+
+def _lsh_shape(num_perm: int, threshold: float) -> Tuple[int, int]:
+    """Split the signature into bands of rows. Two signatures become candidates when all rows
+    of one band match, which happens around a similarity of (1 / bands) ^ (1 / rows).
+    Pick the strictest split that still lets pairs at `threshold` through, since candidates
+    are verified against the whole signature anyway.
+    """
+
+    shapes = [(num_perm // rows, rows) for rows in range(1, num_perm + 1) if num_perm % rows == 0]
+    below = [shape for shape in shapes if (1 / shape[0]) ** (1 / shape[1]) <= threshold]
+    return max(below, key=lambda shape: shape[1]) if below else shapes[0]
+
+
+class NearDuplicateIndex:
+    """Remembers the messages of the last `per` seconds as MinHash signatures of their character shingles,
+    bucketed with locality sensitive hashing. Adding a message returns the recent messages from other
+    authors that are at least `threshold` similar to it (estimated Jaccard similarity of the shingles).
+
+    Each message costs one signature and a lookup of one bucket per band, and buckets hold at most
+    `max_bucket_size` messages, so adding a message takes constant time no matter how many messages
+    are in the window. At most `max_entries` messages are kept; the oldest ones are forgotten first.
+
+    Parameters
+    ----------
+    threshold : float
+        How similar two messages must be to count as near-duplicates, between 0 and 1
+    per : float
+        How long messages are remembered, in seconds
+    shingle_size : int
+        The length of the character shingles
+    num_perm : int
+        The length of the MinHash signatures. Longer signatures are more accurate but slower to compute
+    min_length : int
+        Shorter messages are ignored, as short replies are near-duplicates of each other all the time
+    max_entries : int
+        The most messages remembered at once
+    max_bucket_size : int
+        The most messages kept per bucket
+    max_text_length : int
+        Only the start of longer messages is looked at
+    """
+
+    def __init__(self, threshold: float = 0.7, per: float = 60.0, shingle_size: int = 5, num_perm: int = 32,
+                 min_length: int = 20, max_entries: int = 5000, max_bucket_size: int = 32, max_text_length: int = 1000):
+        self.threshold = threshold
+        self.per = per
+        self.shingle_size = shingle_size
+        self.num_perm = num_perm
+        self.min_length = min_length
+        self.max_entries = max_entries
+        self.max_bucket_size = max_bucket_size
+        self.max_text_length = max_text_length
+        self.bands, self.rows = _lsh_shape(num_perm, threshold)
+
+        # each "permutation" XORs the shingle hashes with a random mask, which is about as
+        # accurate as a universal hash for MinHash and several times cheaper in Python
+        generator = random.Random(0x6d696e68)
+        self._masks = [generator.getrandbits(64) for _ in range(num_perm)]
+
+        self._entries: Deque[_Entry] = deque()
+        self._buckets: Dict[int, Deque[_Entry]] = {}
+
+    def __len__(self):
+        return len(self._entries)
+
+    def signature(self, text: str) -> Tuple[int, ...]:
+        """The MinHash signature of the character shingles of `text`, with runs of whitespace collapsed."""
+
+        text = " ".join(text[:self.max_text_length].split())
+        size = self.shingle_size
+        shingles = {hash(text[i:i + size]) & _HASH_MASK for i in range(max(1, len(text) - size + 1))}
+        return tuple(min([shingle ^ mask for shingle in shingles]) for mask in self._masks)
+
+    def similarity(self, first: Tuple[int, ...], second: Tuple[int, ...]) -> float:
+        """Estimate the similarity of two texts from their signatures."""
+
+        return sum(x == y for x, y in zip(first, second)) / self.num_perm
+
+    def add(self, author: Hashable, text: str, current: float, item: Any = None) -> List[Any]:
+        """Add a message to the index.
+
+        Parameters
+        ----------
+        author : Hashable
+            Who sent the message, usually the user ID
+        text : str
+            The normalized text of the message
+        current : float
+            When the message was sent, as a timestamp
+        item : Any
+            What to return for this message when it is part of a cluster, for example the message itself
+
+        Returns
+        -------
+        List[Any]
+            The items of this message and of the latest near-duplicate from each other author in the window,
+            or an empty list if no other author sent a near-duplicate
+        """
+
+        self._expire(current)
+        if len(text) < self.min_length:
+            return []
+
+        signature = self.signature(text)
+        rows = self.rows
+        keys = tuple(hash((band, signature[band * rows:(band + 1) * rows])) for band in range(self.bands))
+
+        # the latest near-duplicate per author, from the messages sharing a band with this one
+        similar: Dict[Hashable, _Entry] = {}
+        seen = set()
+        for key in keys:
+            for entry in self._buckets.get(key, ()):
+                if entry.author == author or id(entry) in seen:
+                    continue
+                seen.add(id(entry))
+
+                if self.similarity(signature, entry.signature) >= self.threshold:
+                    latest = similar.get(entry.author)
+                    if latest is None or latest.timestamp <= entry.timestamp:
+                        similar[entry.author] = entry
+
+        entry = _Entry(author, current, signature, keys, item)
+        self._entries.append(entry)
+        for key in keys:
+            bucket = self._buckets.setdefault(key, deque())
+            bucket.append(entry)
+            if len(bucket) > self.max_bucket_size:
+                bucket.popleft()
+
+        if len(self._entries) > self.max_entries:
+            self._evict()
+
+        if not similar:
+            return []
+        return [entry.item for entry in similar.values()] + [item]
+
+    def _expire(self, current: float) -> None:
+        while self._entries and self._entries[0].timestamp <= current - self.per:
+            self._evict()
+
+    def _evict(self) -> None:
+        # entries leave in the order they were added, so the oldest entry is
+        # at the front of each of its buckets unless the bucket already dropped it
+        entry = self._entries.popleft()
+        for key in entry.keys:
+            bucket = self._buckets.get(key)
+            if bucket and bucket[0] is entry:
+                bucket.popleft()
+            if not bucket:
+                self._buckets.pop(key, None)
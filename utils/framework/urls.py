@@ -0,0 +1,83 @@
+import re
+from typing import Dict, Generic, Iterable, List, NamedTuple, Tuple, TypeVar
+
+# anything that looks like scheme://..., up to whitespace or the <> Discord uses to suppress embeds
+_URL_PATTERN = re.compile(r"[a-zA-Z][a-zA-Z0-9+.-]*://[^\s<>]+")
+
+# registering this host matches URLs on every host
+ANY_HOST = "*"
+
+T = TypeVar("T")
+
+
+class ParsedURL(NamedTuple):
+    """A URL found in a message, split into its canonical parts.
+
+    `raw` is the URL exactly as it appeared in the message. `scheme` and `host` are lowercased,
+    and `host` has the port and any user info removed. `path` includes the query and fragment.
+    """
+
+    raw: str
+    scheme: str
+    host: str
+    path: str
+
+    @classmethod
+    def parse(cls, raw: str) -> "ParsedURL":
+        scheme, _, rest = raw.partition("://")
+        slash = rest.find("/")
+        netloc, path = (rest, "") if slash == -1 else (rest[:slash], rest[slash:])
+        # the query or fragment can directly follow the host
+        for separator in "?#":
+            if separator in netloc:
+                netloc, tail = netloc.split(separator, 1)
+                path = separator + tail + path
+
+        host = netloc.rpartition("@")[2]
+        if not host.startswith("["):
+            host = host.partition(":")[0]
+        return cls(raw, scheme.lower(), host.lower().rstrip("."), path)
+
+
+def extract_urls(text: str) -> Tuple[ParsedURL, ...]:
+    """Find and parse every URL in `text`. Text without "://" is not searched at all."""
+
+    if not text or "://" not in text:
+        return ()
+    return tuple(ParsedURL.parse(raw) for raw in _URL_PATTERN.findall(text))
+
+
+class HostRouter(Generic[T]):
+    """Maps domains to the values interested in them. A URL is routed to a domain if its host
+    is that domain or a subdomain of it, so registering "tiktok.com" also matches "vm.tiktok.com".
+    """
+
+    def __init__(self):
+        self._by_domain: Dict[str, List[T]] = {}
+
+    def __bool__(self):
+        return bool(self._by_domain)
+
+    def add(self, domains: Iterable[str], value: T) -> None:
+        for domain in domains:
+            self._by_domain.setdefault(domain.lower(), []).append(value)
+
+    def match(self, host: str) -> List[T]:
+        """Return every value registered for `host`, one of its parent domains, or ANY_HOST."""
+
+        found = list(self._by_domain.get(ANY_HOST, ()))
+        while host:
+            found.extend(self._by_domain.get(host, ()))
+            host = host.partition(".")[2]
+        return found
+
+    def route(self, urls: Iterable[ParsedURL]) -> Dict[T, List[ParsedURL]]:
+        """Group `urls` by the values they are routed to, keeping the order of the message."""
+
+        routed: Dict[T, List[ParsedURL]] = {}
+        for url in urls:
+            for value in self.match(url.host):
+                matched = routed.setdefault(value, [])
+                if not matched or matched[-1] is not url:
+                    matched.append(url)
+        return routed
@@ -0,0 +1,110 @@
+"""
+The HTTP client shared by everything in the bot that talks to the web (APIs, webhooks, scraping),
+so connections are pooled and kept alive instead of opening a new session per request.
+"""
+
+import asyncio
+from typing import Dict, List, Optional
+
+import aiohttp
+
+
+class HostStats:
+    """How many requests went to a host, and how long they took."""
+
+    __slots__ = ("requests", "errors", "total_time", "max_time")
+
+    def __init__(self):
+        self.requests = 0
+        self.errors = 0
+        self.total_time = 0.0
+        self.max_time = 0.0
+
+    @property
+    def average_time(self) -> float:
+        return self.total_time / self.requests if self.requests else 0.0
+
+
+class HTTPClient:
+    """A process-wide aiohttp session with a keep-alive connection pool, a limit on the
+    connections per host, DNS caching and default timeouts. The session is created on first use
+    and closed by `close`, which the bot calls when it shuts down. The latency of every request
+    is recorded per host.
+
+    Use it like a session, for example `async with http_client.get(url) as resp: ...`.
+    Headers and timeouts can still be passed per request.
+    """
+
+    # the most connections open at once, in total and per host
+    LIMIT = 100
+    LIMIT_PER_HOST = 10
+    # how long resolved addresses are reused, in seconds
+    DNS_CACHE_TTL = 300
+    TIMEOUT = aiohttp.ClientTimeout(total=60, connect=10)
+
+    def __init__(self):
+        self._session: Optional[aiohttp.ClientSession] = None
+        self.hosts: Dict[str, HostStats] = {}
+
+    @property
+    def session(self) -> aiohttp.ClientSession:
+        """The shared session, for APIs that take one (like discord.Webhook.from_url)."""
+
+        if self._session is None or self._session.closed:
+            trace = aiohttp.TraceConfig()
+            trace.on_request_start.append(self._on_request_start)
+            trace.on_request_end.append(self._on_request_end)
+            trace.on_request_exception.append(self._on_request_exception)
+
+            connector = aiohttp.TCPConnector(limit=self.LIMIT, limit_per_host=self.LIMIT_PER_HOST,
+                                             ttl_dns_cache=self.DNS_CACHE_TTL, use_dns_cache=True)
+            self._session = aiohttp.ClientSession(connector=connector, timeout=self.TIMEOUT, trace_configs=[trace])
+        return self._session
+
+    def request(self, method: str, url: str, **kwargs):
+        return self.session.request(method, url, **kwargs)
+
+    def get(self, url: str, **kwargs):
+        return self.session.get(url, **kwargs)
+
+    def post(self, url: str, **kwargs):
+        return self.session.post(url, **kwargs)
+
+    def head(self, url: str, **kwargs):
+        return self.session.head(url, **kwargs)
+
+    async def close(self) -> None:
+        if self._session is not None and not self._session.closed:
+            await self._session.close()
+        self._session = None
+
+    def slowest_hosts(self, count: int = 5) -> List[tuple]:
+        """The hosts with the highest average latency, as (host, stats) pairs."""
+
+        return sorted(self.hosts.items(), key=lambda item: item[1].average_time, reverse=True)[:count]
+
+    async def _on_request_start(self, session, context, params):
+        context.start = asyncio.get_running_loop().time()
+
+    async def _on_request_end(self, session, context, params):
+        self._record(params.url.host, context, error=False)
+
+    async def _on_request_exception(self, session, context, params):
+        self._record(params.url.host, context, error=True)
+
+    def _record(self, host: Optional[str], context, error: bool) -> None:
+        start = getattr(context, "start", None)
+        if host is None or start is None:
+            return
+
+        elapsed = asyncio.get_running_loop().time() - start
+        stats = self.hosts.get(host)
+        if stats is None:
+            stats = self.hosts[host] = HostStats()
+        stats.requests += 1
+        stats.errors += error
+        stats.total_time += elapsed
+        stats.max_time = max(stats.max_time, elapsed)
+
+
+http_client = HTTPClient()
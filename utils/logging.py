@@ -1,13 +1,19 @@
 import argparse
 import asyncio
+import atexit
 import logging
 import os
 import sys
+import threading
+import traceback
+from collections import Counter
+from typing import List, Optional, Tuple
 
 import aiohttp
-import discord
 from dotenv.main import load_dotenv
 
+from .http import http_client
+
 load_dotenv()
 
 class Formatter(logging.Formatter):
@@ -67,9 +73,142 @@ class WebhookLogger(logging.Handler):
     def __init__(self):
         self.level = logging.INFO
         super().__init__(self.level)
-        self.webhook_url = os.environ.get("LOGGING_WEBHOOK_URL")
         self.record_formatter = logging.Formatter()
-        
+
+    def emit(self, record: logging.LogRecord):
+        log_shipper.submit(record.levelname, self.record_formatter.format(record))
+
+
+class WebhookLogShipper:
+    """Sends log records to the logging webhook from a background task, so logging never
+    waits on Discord.
+
+    Records are buffered, at most `MAX_BUFFERED` at once (later ones are dropped and counted),
+    and every `FLUSH_INTERVAL` seconds they are packed into as few messages as possible.
+    At most `MAX_MESSAGES_PER_FLUSH` messages are sent per flush; the records that don't fit
+    are summarized in one extra message instead. Rate limited and failed requests are retried.
+
+    The background task starts with the first record logged from the bot's event loop. Records
+    logged from other threads wait in the buffer for the next flush. `close` sends what is left
+    when the bot shuts down, and records logged without an event loop are sent when the process exits.
+
+    Parameters
+    ----------
+    webhook_url : Optional[str]
+        Where to send the records, nothing is sent if None
+    """
+
+    FLUSH_INTERVAL = 2.0
+    MAX_BUFFERED = 1000
+    MAX_MESSAGES_PER_FLUSH = 5
+    # leaves room for the code block and the owner ping within Discord's 2000 characters
+    MAX_MESSAGE_LENGTH = 1900
+    MAX_RETRIES = 3
+
+    def __init__(self, webhook_url: Optional[str]):
+        self.webhook_url = webhook_url
+        self._buffer: List[Tuple[str, str]] = []
+        self._dropped: Counter = Counter()
+        self._lock = threading.Lock()
+        self._task: Optional[asyncio.Task] = None
+        self._wake: Optional[asyncio.Event] = None
+        self._closed = False
+
+        self.sent = 0
+        self.failed = 0
+        self.dropped = 0
+        atexit.register(self._flush_at_exit)
+
+    def submit(self, levelname: str, formatted: str) -> None:
+        """Queue a formatted record. Never waits, and can be called from any thread."""
+
+        if self.webhook_url is None:
+            return
+
+        with self._lock:
+            if len(self._buffer) < self.MAX_BUFFERED:
+                self._buffer.append((levelname, formatted))
+            else:
+                self._dropped[levelname] += 1
+
+        if self._closed:
+            return
+        try:
+            loop = asyncio.get_running_loop()
+        except RuntimeError:
+            return
+        if self._task is None or self._task.done() or self._task.get_loop() is not loop:
+            self._wake = asyncio.Event()
+            self._task = loop.create_task(self._run())
+
+    async def flush(self, session: Optional[aiohttp.ClientSession] = None) -> None:
+        """Send everything buffered so far."""
+
+        with self._lock:
+            records, self._buffer = self._buffer, []
+            dropped, self._dropped = self._dropped, Counter()
+        if not records and not dropped:
+            return
+
+        messages = self.pack(records)
+        for _, _, counts in messages[self.MAX_MESSAGES_PER_FLUSH:]:
+            dropped.update(counts)
+        messages = [content for content, _, _ in messages[:self.MAX_MESSAGES_PER_FLUSH]]
+
+        if dropped:
+            self.dropped += sum(dropped.values())
+            summary = ", ".join(f"{count} {levelname}" for levelname, count in dropped.most_common())
+            messages.append(f"{self.prefixcalc('WARNING')}{sum(dropped.values())} log records were not sent ({summary}){self.suffixcalc('WARNING')}")
+
+        session = session or http_client.session
+        for content in messages:
+            await self._post(session, content)
+
+    async def close(self) -> None:
+        """Stop the background task and send what is left."""
+
+        self._closed = True
+        # let the background task finish the flush it may be in the middle of
+        if self._task is not None and not self._task.done() and self._task.get_loop() is asyncio.get_running_loop():
+            self._wake.set()
+            await self._task
+        self._task = None
+        await self.flush()
+
+    def pack(self, records: List[Tuple[str, str]]) -> List[Tuple[str, str, Counter]]:
+        """Join consecutive records of the same level into messages, splitting records that are too long.
+
+        Returns
+        -------
+        List[Tuple[str, str, Counter]]
+            The content of each message, its level, and how many records of each level start in it
+        """
+
+        messages = []
+        levelname, lines, length, counts = None, [], 0, Counter()
+
+        def finish():
+            if lines:
+                body = "\n".join(lines)
+                content = f"{self.prefixcalc(levelname)}{body}{self.suffixcalc(levelname)}"
+                if levelname == 'ERROR' or levelname == 'CRITICAL':
+                    content += f'<@{os.environ.get("OWNER_ID")}>'
+                messages.append((content, levelname, counts))
+
+        for record_levelname, formatted in records:
+            parts = [formatted[i:i + self.MAX_MESSAGE_LENGTH] for i in range(0, len(formatted), self.MAX_MESSAGE_LENGTH)] or [""]
+            for i, part in enumerate(parts):
+                if record_levelname != levelname or length + len(part) + 1 > self.MAX_MESSAGE_LENGTH:
+                    finish()
+                    levelname, lines, length, counts = record_levelname, [], 0, Counter()
+                lines.append(part)
+                length += len(part) + 1
+                if i == 0:
+                    counts[record_levelname] += 1
+        finish()
+
+        return messages
+
     def prefixcalc(self, levelname: str):
         if levelname == 'DEBUG':
             return '```bash#| '
@@ -92,39 +231,56 @@ class WebhookLogger(logging.Handler):
         else:
             return '```'
 
-    def emit(self, record: logging.LogRecord):
-        self.send(self.record_formatter.format(record), record)
-            
-    def send(self, formatted, record):
-        if self.webhook_url is None:
+    async def _run(self) -> None:
+        while not self._closed:
+            try:
+                await asyncio.wait_for(self._wake.wait(), self.FLUSH_INTERVAL)
+            except asyncio.TimeoutError:
+                pass
+            try:
+                await self.flush()
+            except Exception:
+                # logging the error would only queue another record for the same webhook
+                traceback.print_exc()
+
+    async def _post(self, session: aiohttp.ClientSession, content: str) -> None:
+        for attempt in range(self.MAX_RETRIES + 1):
+            try:
+                async with session.post(self.webhook_url, json={"content": content}) as resp:
+                    if resp.status == 429:
+                        await asyncio.sleep(float(resp.headers.get("Retry-After", 1)))
+                        continue
+                    if resp.status < 500:
+                        if resp.status < 400:
+                            self.sent += 1
+                        else:
+                            self.failed += 1
+                        return
+            except (aiohttp.ClientError, asyncio.TimeoutError):
+                pass
+            if attempt < self.MAX_RETRIES:
+                await asyncio.sleep(2 ** attempt)
+
+        self.failed += 1
+
+    def _flush_at_exit(self) -> None:
+        if not self._buffer and not self._dropped:
             return
 
-        parts = [formatted[i:i+1900] for i in range(0, len(formatted), 1900)]
-        for i, part in enumerate(parts):
-            content = f"{self.prefixcalc(record.levelname)}{part}{self.suffixcalc(record.levelname)}"
-            if i == len(parts) - 1:
-                if record.levelname == 'ERROR' or record.levelname == 'CRITICAL':
-                    content += f'<@{os.environ.get("OWNER_ID")}>'
-            message_body = {
-                "content": content
-            }
+        async def flush():
+            # the shared session belongs to the bot's event loop, which is gone by now
+            async with aiohttp.ClientSession() as session:
+                await self.flush(session)
 
-            try:
-                loop = asyncio.get_event_loop()
-                asyncio.ensure_future(post_content(self.webhook_url, message_body))
-            except RuntimeError:
-                loop = asyncio.new_event_loop()
-                asyncio.set_event_loop(loop)
-                loop.run_until_complete(post_content(self.webhook_url, message_body))
-
-async def post_content(webhook_url, message_body):
-    async with aiohttp.ClientSession() as session:
-        the_webhook: discord.Webhook = discord.Webhook.from_url(webhook_url, session=session)
         try:
-            await the_webhook.send(**message_body)
+            asyncio.run(flush())
         except Exception:
             pass
 
+
+log_shipper = WebhookLogShipper(os.environ.get("LOGGING_WEBHOOK_URL"))
+
+
 class Logger:
     def __init__(self):
         parser = argparse.ArgumentParser()
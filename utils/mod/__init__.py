@@ -1,3 +1,4 @@
 from .global_modactions import *
+from .lockdown import *
 from .mod_logs import *
-from .modactions_helpers import *
\ No newline at end of file
+from .modactions_helpers import *
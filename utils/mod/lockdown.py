@@ -0,0 +1,143 @@
+import asyncio
+import time
+from typing import Iterable, List, Optional, Tuple
+
+import discord
+from utils.config import cfg
+from utils.logging import logger
+
+# how many channels are edited at the same time (two requests each). Permission edits are rate
+# limited per channel, so different channels can be edited side by side; this keeps a large
+# lockdown well under the global rate limit. discord.py waits out any 429s on its own.
+LOCKDOWN_CONCURRENCY = 8
+
+
+class LockdownResult:
+    """The outcome of locking or unlocking a set of channels.
+
+    Attributes
+    ----------
+    changed : List[discord.abc.GuildChannel]
+        Channels whose overwrites were changed
+    unchanged : List[discord.abc.GuildChannel]
+        Channels that were already locked (or unlocked)
+    failed : List[discord.abc.GuildChannel]
+        Channels that couldn't be edited, usually because of missing permissions
+    elapsed : float
+        How long the whole lockdown took, in seconds
+    """
+
+    __slots__ = ("changed", "unchanged", "failed", "elapsed")
+
+    def __init__(self):
+        self.changed: List[discord.abc.GuildChannel] = []
+        self.unchanged: List[discord.abc.GuildChannel] = []
+        self.failed: List[discord.abc.GuildChannel] = []
+        self.elapsed = 0.0
+
+
+def lockdown_permissions(channel: discord.abc.GuildChannel, lock: bool) -> Optional[Tuple[discord.PermissionOverwrite, discord.PermissionOverwrite]]:
+    """Compute the overwrites of @everyone and Member+ for `channel` once it's locked or unlocked.
+    A locked channel denies @everyone and allows Member+ to send messages.
+
+    Parameters
+    ----------
+    channel : discord.abc.GuildChannel
+        "Channel to lock or unlock"
+    lock : bool
+        "Whether to lock or unlock the channel"
+
+    Returns
+    -------
+    Optional[Tuple[discord.PermissionOverwrite, discord.PermissionOverwrite]]
+        "The new overwrites of @everyone and Member+, or None if the channel is already in that state"
+    """
+
+    guild = channel.guild
+    default_perms = channel.overwrites_for(guild.default_role)
+    memberplus_perms = channel.overwrites_for(guild.get_role(cfg.roles.member_plus))
+
+    if lock and default_perms.send_messages is None and memberplus_perms.send_messages is None:
+        default_perms.send_messages = False
+        memberplus_perms.send_messages = True
+    elif not lock and (not default_perms.send_messages) and memberplus_perms.send_messages:
+        default_perms.send_messages = None
+        memberplus_perms.send_messages = None
+    else:
+        return None
+
+    return default_perms, memberplus_perms
+
+
+async def lockdown_channel(channel: discord.abc.GuildChannel, lock: bool) -> Optional[bool]:
+    """Lock or unlock a single channel. Only the overwrites of @everyone and Member+ are set,
+    with two concurrent requests, so other overwrites changed in the meantime are left alone
+    and only Manage Roles is needed.
+
+    Returns
+    -------
+    Optional[bool]
+        "True if the channel was changed, None if it already was in that state, False if editing it failed"
+    """
+
+    permissions = lockdown_permissions(channel, lock)
+    if permissions is None:
+        return None
+
+    default_perms, memberplus_perms = permissions
+    guild = channel.guild
+    reason = "Locked!" if lock else "Unlocked!"
+    results = await asyncio.gather(
+        channel.set_permissions(guild.default_role, overwrite=default_perms, reason=reason),
+        channel.set_permissions(guild.get_role(cfg.roles.member_plus), overwrite=memberplus_perms, reason=reason),
+        return_exceptions=True)
+
+    for result in results:
+        if isinstance(result, discord.HTTPException):
+            return False
+        if isinstance(result, BaseException):
+            raise result
+    return True
+
+
+async def lockdown_channels(guild: discord.Guild, channel_ids: Iterable[int], lock: bool) -> LockdownResult:
+    """Lock or unlock many channels at once, editing up to LOCKDOWN_CONCURRENCY channels concurrently.
+    Used to freeze and unfreeze the server during a raid.
+
+    Parameters
+    ----------
+    guild : discord.Guild
+        "Guild the channels are in"
+    channel_ids : Iterable[int]
+        "IDs of the channels to lock or unlock. Channels that don't exist anymore are skipped"
+    lock : bool
+        "Whether to lock or unlock the channels"
+
+    Returns
+    -------
+    LockdownResult
+        "Which channels were changed, and how long it took"
+    """
+
+    result = LockdownResult()
+    start = time.perf_counter()
+    semaphore = asyncio.Semaphore(LOCKDOWN_CONCURRENCY)
+
+    async def run(channel):
+        async with semaphore:
+            changed = await lockdown_channel(channel, lock)
+
+        if changed is None:
+            result.unchanged.append(channel)
+        elif changed:
+            result.changed.append(channel)
+        else:
+            result.failed.append(channel)
+
+    channels = [guild.get_channel(channel_id) for channel_id in channel_ids]
+    await asyncio.gather(*(run(channel) for channel in channels if channel is not None))
+
+    result.elapsed = time.perf_counter() - start
+    logger.info(f"{'Locked' if lock else 'Unlocked'} {len(result.changed)} channels in {result.elapsed:.2f}s "
+                f"({len(result.unchanged)} unchanged, {len(result.failed)} failed)")
+    return result
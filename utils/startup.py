@@ -0,0 +1,79 @@
+import asyncio
+import time
+import traceback
+from typing import Awaitable, Callable, Dict, List, Optional, Tuple
+
+from .logging import logger
+
+
+class WarmStart:
+    """Runs the loaders of the caches the bot needs once it's connected, concurrently,
+    and only once per process: `on_ready` fires again after every gateway reconnect,
+    but the caches are kept up to date by events in the meantime.
+
+    Loaders should first restore whatever they saved to disk, so the cache is usable right away,
+    and then reconcile it with Discord or the web. Each loader is timed, and a loader that fails
+    is tried again the next time `start` is called.
+    """
+
+    def __init__(self):
+        self._loaders: List[Tuple[str, Callable[[], Awaitable[None]]]] = []
+        self._finished = set()
+        self._task: Optional[asyncio.Task] = None
+
+        # phase name -> how long it took, in seconds
+        self.timings: Dict[str, float] = {}
+        self.total_time: Optional[float] = None
+
+    def add(self, name: str, loader: Callable[[], Awaitable[None]]) -> None:
+        """Register a loader, which is run the next time `start` is called.
+
+        Parameters
+        ----------
+        name : str
+            Name of the phase, used when logging how long it took
+        loader : Callable[[], Awaitable[None]]
+            Coroutine function that loads the cache
+        """
+
+        self._loaders.append((name, loader))
+
+    @property
+    def done(self) -> bool:
+        return len(self._finished) == len(self._loaders)
+
+    def start(self) -> None:
+        """Run every loader that hasn't finished yet in the background. Does nothing if
+        a run is still in progress or every loader already finished.
+        """
+
+        if self.done or (self._task is not None and not self._task.done()):
+            return
+        self._task = asyncio.get_running_loop().create_task(self._run())
+
+    async def wait(self) -> None:
+        """Wait for the current run to finish."""
+
+        if self._task is not None:
+            await asyncio.shield(self._task)
+
+    async def _run(self) -> None:
+        start = time.perf_counter()
+        await asyncio.gather(*(self._phase(name, loader) for name, loader in self._loaders if name not in self._finished))
+        self.total_time = time.perf_counter() - start
+
+        phases = ", ".join(f"{name} {self.timings[name]:.2f}s" for name, _ in self._loaders if name in self.timings)
+        logger.info(f"Warm start took {self.total_time:.2f}s ({phases})")
+
+    async def _phase(self, name: str, loader: Callable[[], Awaitable[None]]) -> None:
+        start = time.perf_counter()
+        try:
+            await loader()
+            self._finished.add(name)
+        except Exception:
+            logger.error(f"Warm start phase {name} failed:\n{traceback.format_exc()}")
+        finally:
+            self.timings[name] = time.perf_counter() - start
+
+
+warm_start = WarmStart()
@@ -1,5 +1,5 @@
 import re
-from itertools import groupby
+from itertools import islice
 from typing import List
 
 import discord
@@ -8,224 +8,136 @@ from data.model import Case
 from data.services import guild_service, user_service
 from discord import app_commands
 from discord.ext.commands import Command
-from utils import get_ios_cfw, transform_groups, canister_fetch_repos
+from utils import AutocompleteCache, AutocompleteIndex, canister_fetch_repos, cfg, get_appledb_index
 from utils.framework import MONTH_MAPPING, gatekeeper
 
 
-def sort_versions(version):
-    version = f'{version.get("osStr")} {version.get("version")}'
-    v = version.split(' ')
-    v[0] = list(map(int, v[1].split('.')))
-    return v
+def choices(index: AutocompleteIndex, current: str) -> List[app_commands.Choice[str]]:
+    return [app_commands.Choice(name=name, value=value) for name, value in index.search(current)]
+
+
+def alphanum_key(text: str) -> list:
+    def convert(text): return int(text) if text.isdigit() else text.lower()
+    return [convert(c) for c in re.split('([0-9]+)', text)]
+
+
+# the candidates of each autocomplete, rebuilt when what they are built from changes
+command_index = AutocompleteCache(lambda tree: AutocompleteIndex(
+    (name, name, (name,)) for name in (f"{command.parent.name} {command.name}" if command.parent is not None else command.name
+                                       for command in tree.walk_commands(guild=discord.Object(id=cfg.guild_id))
+                                       if not isinstance(command, app_commands.Group))))
+tag_index = AutocompleteCache(lambda _: AutocompleteIndex((name.lower(), name.lower(), (name,)) for name in guild_service.get_tag_names()))
+meme_index = AutocompleteCache(lambda _: AutocompleteIndex((name.lower(), name.lower(), (name,)) for name in guild_service.get_meme_names()))
+repo_index = AutocompleteCache(lambda repos: AutocompleteIndex((repo['slug'], repo['slug'], (repo['slug'],)) for repo in repos if repo.get("slug")))
+issue_index = AutocompleteCache(lambda issues: AutocompleteIndex((title, title, (title,)) for title in issues))
+rule_index = AutocompleteCache(lambda rules: AutocompleteIndex(
+    ((f"{title} - {rule.description or ''}"[:100], title, (title, rule.description or "")) for title, rule in rules.items()),
+    sort_key=lambda entry: alphanum_key(entry[1])))
+filter_word_index = AutocompleteCache(lambda snapshot: AutocompleteIndex(
+    ((word.word, word.word, (word.word,)) for word in snapshot.filter_words), prefix=True))
+timezone_index = AutocompleteCache(lambda _: AutocompleteIndex((tz, tz, (tz, tz.replace("_", " "))) for tz in pytz.common_timezones_set))
 
 
 async def command_list_autocomplete(interaction: discord.Interaction, current: str) -> List[app_commands.Choice[str]]:
-    tree: app_commands.CommandTree = interaction.client.tree
-    commands = []
-    for command in tree.walk_commands(guild=interaction.guild):
-        if isinstance(command, app_commands.Group):
-            continue
-        if command.parent is not None:
-            commands.append(f"{command.parent.name} {command.name}")
-        else:
-            commands.append(command.name)
-    commands.sort()
-    return [app_commands.Choice(name=cmd, value=cmd) for cmd in commands if current.lower() in cmd.lower()][:25]
+    return choices(command_index.get(interaction.client.tree), current)
 
 
 async def tags_autocomplete(_: discord.Interaction, current: str) -> List[app_commands.Choice[str]]:
-    tags = [tag.name.lower() for tag in guild_service.get_guild().tags]
-    tags.sort()
-    return [app_commands.Choice(name=tag, value=tag) for tag in tags if current.lower() in tag.lower()][:25]
+    return choices(tag_index.get(guild_service.tags_version), current)
 
 
 async def memes_autocomplete(_: discord.Interaction, current: str) -> List[app_commands.Choice[str]]:
-    meme = [meme.name.lower() for meme in guild_service.get_guild().memes]
-    meme.sort()
-    return [app_commands.Choice(name=meme, value=meme) for meme in meme if current.lower() in meme.lower()][:25]
+    return choices(meme_index.get(guild_service.memes_version), current)
 
 
 async def ios_version_autocomplete(_: discord.Interaction, current: str) -> List[app_commands.Choice[str]]:
-    versions = await get_ios_cfw()
-    if versions is None:
+    index = await get_appledb_index()
+    if index is None:
         return []
 
-    versions = versions.get("ios")
-
-    versions = filter(lambda x: x.get('osStr') in ["iOS", "iPadOS"], versions)
-    versions = filter(lambda x: x.get('build') is not None, versions)
-    versions = list(versions)
-
-    versions.sort(key=lambda x: str(x.get("released")
-                  or "1970-01-01"), reverse=True)
-    return [app_commands.Choice(name=f"{v['osStr']} {v['version']} ({v['build']})", value=v["uniqueBuild"]) for v in versions if (current.lower() in v['version'].lower() or current.lower() in v['build'].lower()) and not v['beta']][:25]
-
+    versions = (v for v in index.ios_releases if current.lower() in v['version'].lower() or current.lower() in v['build'].lower())
+    return [app_commands.Choice(name=f"{v['osStr']} {v['version']} ({v['build']})", value=v["uniqueBuild"]) for v in islice(versions, 25)]
 
 
 async def ios_beta_version_autocomplete(_: discord.Interaction, current: str) -> List[app_commands.Choice[str]]:
-    versions = await get_ios_cfw()
-    if versions is None:
+    index = await get_appledb_index()
+    if index is None:
         return []
 
-    versions = versions.get("ios")
-    versions = filter(lambda x: x.get('osStr') in ["iOS", "iPadOS"], versions)
-    versions = filter(lambda x: x.get('build') is not None, versions)
-    versions = list(versions)
-    # versions = [v for _, v in versions.items()]
-    versions.sort(key=lambda x: x.get("released")
-                  or "1970-01-01", reverse=True)
-    return [app_commands.Choice(name=f"{v['osStr']} {v['version']} ({v['build']})", value=v["uniqueBuild"]) for v in versions if (current.lower() in v['version'].lower() or current.lower() in v['build'].lower()) and v['beta']][:25]
+    versions = (v for v in index.ios_beta_releases if current.lower() in v['version'].lower() or current.lower() in v['build'].lower())
+    return [app_commands.Choice(name=f"{v['osStr']} {v['version']} ({v['build']})", value=v["uniqueBuild"]) for v in islice(versions, 25)]
 
 
 async def ios_on_device_autocomplete(interaction: discord.Interaction, current: str) -> List[app_commands.Choice[str]]:
-    cfw = await get_ios_cfw()
-    if cfw is None:
+    index = await get_appledb_index()
+    if index is None:
         return []
 
-    ios = cfw.get("ios")
-    # ios = [i for _, i in ios.items()]
-    devices = cfw.get("group")
-    transformed_devices = transform_groups(devices)
     selected_device = interaction.namespace["device"]
-
     if selected_device is None:
         return []
-    matching_devices = [
-        d for d in transformed_devices if selected_device.lower() == d.get('name').lower() or any(selected_device.lower() == x.lower() for x in d.get("devices"))]
 
-    if not matching_devices:
+    matching_device = index.find_group(selected_device)
+    if matching_device is None:
         return []
 
-    matching_device = matching_devices[0].get("devices")[0]
-    matching_ios = [version for version in ios if matching_device in version.get(
-        'devices') and current.lower() in version.get('version').lower()]
+    ios = index.firmwares_by_device.get(matching_device.get("devices")[0], [])
+    matching_ios = (version for version in ios if current.lower() in version.get('version').lower())
+    return [app_commands.Choice(name=f'{version.get("osStr")} {version.get("version")}', value=version.get("uniqueBuild") or version.get("build")) for version in islice(matching_ios, 25)]
 
-    matching_ios.sort(key=sort_versions, reverse=True)
 
-    return [app_commands.Choice(name=f'{version.get("osStr")} {version.get("version")}', value=version.get("uniqueBuild") or version.get("build")) for version in matching_ios][:25]
+def device_choices(groups: List[dict], current: str) -> List[app_commands.Choice[str]]:
+    devices = (d for d in groups if any(current.lower() in x.lower() for x in d.get('devices') or []) or current.lower() in d.get('name').lower())
+    return [app_commands.Choice(name=device.get('name'), value=device.get("devices")[0] if device.get("devices") else device.get("name")) for device in islice(devices, 25)]
 
 
 async def device_autocomplete(_: discord.Interaction, current: str) -> List[app_commands.Choice[str]]:
-    res = await get_ios_cfw()
-    if res is None:
+    index = await get_appledb_index()
+    if index is None:
         return []
 
-    all_devices = res.get("group")
-    transformed_devices = transform_groups(all_devices)
-    devices = [d for d in transformed_devices if (any(current.lower() in x.lower(
-    ) for x in d.get('devices')) or current.lower() in d.get('name').lower())]
-
-    devices.sort(key=lambda x: x.get('type') or "zzz")
-    devices_groups = groupby(devices, lambda x: x.get('type'))
-
-    devices = []
-    for _, group in devices_groups:
-        group = list(group)
-        group.sort(key=lambda x: x.get('order'), reverse=True)
-        devices.extend(group)
-
-    all_devices = res.get("device")
-    for device in devices:
-        ident = device.get("devices")[0]
-        # detailed = all_devices.get(ident)
-        detailed = [ td for td in all_devices if td.get('identifer') == ident ]
-        if detailed:
-            detailed = detailed[0]
-            released = detailed.get('released') or '-1'
-            if isinstance(released, list):
-                released = released[0]
-            device['released'] = str(released)
-        else:
-            device['released'] = "-1"
-
-    devices.sort(key=lambda x: x.get('released'), reverse=True)
-    return [app_commands.Choice(name=device.get('name'), value=device.get("devices")[0] if device.get("devices") else device.get("name")) for device in devices][:25]
+    return device_choices(index.groups_by_release, current)
 
 
 async def jailbreakable_device_autocomplete(_: discord.Interaction, current: str) -> List[app_commands.Choice[str]]:
-    res = await get_ios_cfw()
-    if res is None:
+    index = await get_appledb_index()
+    if index is None:
         return []
 
-    all_devices = res.get("group")
-    transformed_devices = transform_groups(all_devices)
-    devices = [d for d in transformed_devices if (any(current.lower() in x.lower(
-    ) for x in d.get('devices')) or current.lower() in d.get('name').lower())]
-
-    devices = [d for d in devices if any(x in d.get("type") for x in ['iPhone','iPod','iPad','Apple TV','Apple Watch','HomePod'])]
-
-    devices.sort(key=lambda x: x.get('type') or "zzz")
-    devices_groups = groupby(devices, lambda x: x.get('type'))
-
-    devices = []
-    for _, group in devices_groups:
-        group = list(group)
-        group.sort(key=lambda x: x.get('order'), reverse=True)
-        devices.extend(group)
-
-    all_devices = res.get("device")
-    for device in devices:
-        ident = device.get("devices")[0]
-        # detailed = all_devices.get(ident)
-        detailed = [ td for td in all_devices if td.get('identifer') == ident ]
-        if detailed:
-            detailed = detailed[0]
-            released = detailed.get('released') or '-1'
-            if isinstance(released, list):
-                released = released[0]
-            device['released'] = str(released)
-
-        else:
-            device['released'] = "-1"
-
-    devices.sort(key=lambda x: x.get('released'), reverse=True)
-    return [app_commands.Choice(name=device.get('name'), value=device.get("devices")[0] if device.get("devices") else device.get("name")) for device in devices][:25]
+    return device_choices(index.jailbreakable_groups, current)
 
 
 async def jb_autocomplete(_: discord.Interaction, current: str) -> List[app_commands.Choice[str]]:
-    apps = await get_ios_cfw()
-    if apps is None:
+    index = await get_appledb_index()
+    if index is None:
         return []
 
-    apps = apps.get("jailbreak")
-    # apps = [jb for _, jb in apps.items()]
-    apps.sort(key=lambda x: x["name"].lower())
-    return [app_commands.Choice(name=app["name"], value=app["name"]) for app in apps if app["name"].lower().startswith(current.lower())][:25]
+    apps = (app for app in index.jailbreaks if app["name"].lower().startswith(current.lower()))
+    return [app_commands.Choice(name=app["name"], value=app["name"]) for app in islice(apps, 25)]
 
 
 async def bypass_autocomplete(_: discord.Interaction, current: str) -> List[app_commands.Choice[str]]:
-    data = await get_ios_cfw()
-    apps = data.get("bypass")
-    # apps = [app for _, app in bypasses.items()]
-    apps.sort(key=lambda x: x.get("name").lower())
-    return [app_commands.Choice(name=app.get("name"), value=app.get("bundleId")) for app in apps if current.lower() in app.get("name").lower()][:25]
+    index = await get_appledb_index()
+    if index is None:
+        return []
+
+    apps = (app for app in index.bypasses if current.lower() in app.get("name").lower())
+    return [app_commands.Choice(name=app.get("name"), value=app.get("bundleId")) for app in islice(apps, 25)]
 
 
 async def repo_autocomplete(_: discord.Interaction, current: str) -> List[app_commands.Choice[str]]:
     repos = await canister_fetch_repos()
     if repos is None:
         return []
-    repos = [repo['slug'] for repo in repos if repo.get(
-        "slug") and repo.get("slug") is not None]
-    repos.sort()
-    return [app_commands.Choice(name=repo, value=repo) for repo in repos if current.lower() in repo.lower()][:25]
+    return choices(repo_index.get(repos), current)
 
 
 async def issue_autocomplete(interaction: discord.Interaction, current: str) -> List[app_commands.Choice[str]]:
-    issue_titles = [issue for issue in interaction.client.issue_cache.cache]
-    issue_titles.sort(key=lambda issue: issue.lower())
-    return [app_commands.Choice(name=issue_title, value=issue_title) for issue_title in issue_titles if current.lower() in issue_title.lower()][:25]
+    return choices(issue_index.get(interaction.client.issue_cache.cache), current)
 
 
 async def rule_autocomplete(interaction: discord.Interaction, current: str) -> List[app_commands.Choice[str]]:
-    rule_titles = [(issue_title, issue.description) for issue_title,
-                   issue in interaction.client.rule_cache.cache.items()]
-
-    def convert(text): return int(text) if text.isdigit() else text.lower()
-    def alphanum_key(key): return [convert(c)
-                                   for c in re.split('([0-9]+)', key[0])]
-    rule_titles.sort(key=alphanum_key)
-    return [app_commands.Choice(name=f"{title} - {description}"[:100], value=title) for title, description in rule_titles if current.lower() in title.lower() or current.lower() in description.lower()][:25]
+    return choices(rule_index.get(interaction.client.rule_cache.cache), current)
 
 
 async def time_suggestions(_: discord.Interaction, current: str) -> List[app_commands.Choice[str]]:
@@ -246,10 +158,7 @@ async def filterwords_autocomplete(interaction: discord.Interaction, current: st
     if not gatekeeper.has(interaction.guild, interaction.user, 5):
         return []
 
-    words = [word.word for word in await guild_service.get_filtered_words()]
-    words.sort()
-
-    return [app_commands.Choice(name=word, value=word) for word in words if str(word).startswith(str(current))][:25]
+    return choices(filter_word_index.get(guild_service.snapshot), current)
 
 
 async def warn_autocomplete(interaction: discord.Interaction, current: str) -> List[app_commands.Choice[str]]:
@@ -264,4 +173,4 @@ async def warn_autocomplete(interaction: discord.Interaction, current: str) -> L
 
 
 async def timezone_autocomplete(_: discord.Interaction, current: str) -> List[app_commands.Choice[str]]:
-    return [app_commands.Choice(name=tz, value=tz) for tz in pytz.common_timezones_set if current.lower() in tz.lower() or current.lower() in tz.replace("_", " ").lower()][:25]
+    return choices(timezone_index.get(), current)
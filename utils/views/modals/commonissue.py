@@ -89,22 +89,18 @@ class CommonIssueModal(discord.ui.Modal):
         await self.ctx.send_error(error, whisper=True)
 
 class EditCommonIssue(discord.ui.Modal):
-    def __init__(self, ctx: GIRContext, title, issue_message, author: discord.Member) -> None:
+    def __init__(self, ctx: GIRContext, title, issue, author: discord.Member) -> None:
         self.ctx = ctx
         self.bot = ctx.bot
         self.author = author
         self.edited = False
         self.title = title[:20] + "..." if len(title) >= 20 else title
-        self.description = issue_message.embeds[0].description
+        self.description = issue.embed.description
         self.callback_triggered = False
 
-        components = issue_message.components
         buttons = []
-        if components:
-            for component in components:
-                if isinstance(component, discord.ActionRow):
-                    for child in component.children:
-                        buttons.append((f"{str(child.emoji) + ' ' if child.emoji else ''}{child.label}", child.url))
+        for button in issue.buttons:
+            buttons.append((f"{button['emoji'] + ' ' if button['emoji'] else ''}{button['label']}", button["url"]))
 
         self.buttons = buttons
         super().__init__(title=f"Edit common issue {self.title}")